@@ -0,0 +1,74 @@
+"""Compare the redis and sqlite datastore backends on the access patterns of
+load (batched HSETNX), extract (HEXISTS checks, then HSETNX from --jobs
+worker processes at once) and export (HKEYS, then pipelined HMGETs).
+
+Values are the games of an API dump, repeated under new ids until there are
+--games of them.
+
+    python benchmarks/bench_backends.py --games 50000 --jobs 4 tests/testdata/dump.json
+"""
+import multiprocessing
+import tempfile
+
+import click
+
+from fafalytics import storage
+from fafalytics.loader import load_file
+from fafalytics.manyfiles import datastore
+from fafalytics.pyutils import Timer, chunked
+
+BATCH_SIZE = 100
+FEATURES = {'player1.mean_apm': {'overall': 123.4, 'first_3m': 56.7}, 'player2.mean_apm': {'overall': 98.7, 'first_3m': 65.4}}
+
+def load(games):
+    for batch in chunked(games, BATCH_SIZE):
+        datastore('load', batch)
+
+def extract_worker(ids):
+    for batch in chunked(ids, BATCH_SIZE):
+        pipeline = storage.get_client().pipeline(transaction=False)
+        for game_id in batch:
+            pipeline.hexists('extract', game_id)
+        pipeline.execute()
+        datastore('extract', [{'id': game_id, 'extracted': FEATURES} for game_id in batch])
+
+def extract(ids, jobs):
+    with multiprocessing.get_context('fork').Pool(jobs) as pool:
+        pool.map(extract_worker, [ids[index::jobs] for index in range(jobs)])
+
+def export(ids):
+    client = storage.get_client()
+    codec = storage.get_codec()
+    keys = set(client.hkeys('load')) & set(client.hkeys('extract'))
+    for chunk in chunked(sorted(keys), 1000):
+        pipeline = client.pipeline(transaction=False)
+        pipeline.hmget('load', chunk)
+        pipeline.hmget('extract', chunk)
+        for values in pipeline.execute():
+            for value in values:
+                codec.decode(value)
+
+@click.command()
+@click.option('--games', type=int, default=20000)
+@click.option('--jobs', type=int, default=4)
+@click.argument('dumps', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+def main(games, jobs, dumps):
+    templates = [game for dump in dumps for game in load_file(dump, only_valid=False, only_1v1=False, featured_mod=-1)]
+    objs = [dict(templates[index % len(templates)], id=str(index)) for index in range(games)]
+    ids = [obj['id'] for obj in objs]
+    for backend in storage.BACKENDS:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            storage.configure(tmpdir, backend=backend)
+            storage.start_store()
+            try:
+                for label, run in (('load', lambda: load(objs)), ('extract', lambda: extract(ids, jobs)), ('export', lambda: export(ids))):
+                    with Timer() as timer:
+                        run()
+                    click.echo('%-8s %-8s %7.2fs %10.0f games/s' % (backend, label, timer.elapsed, games / timer.elapsed))
+            finally:
+                storage.stop_store()
+                storage.get_client.cache_clear()
+                storage.get_codec.cache_clear()
+
+if __name__ == '__main__':
+    main()
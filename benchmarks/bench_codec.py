@@ -0,0 +1,43 @@
+"""Compare datastore value codecs on games from API dumps: bytes per game and
+encode/decode throughput. The dictionary is trained on a sample of the games.
+
+    python benchmarks/bench_codec.py --repeat 5 tests/testdata/dump.json /path/to/dumps/*.json
+"""
+import click
+import zstandard
+
+from fafalytics.codec import Codec, train_dictionary
+from fafalytics.loader import load_file
+from fafalytics.pyutils import Timer
+
+def timed(func, items, repeat):
+    with Timer() as timer:
+        for _ in range(repeat):
+            for item in items:
+                func(item)
+    return timer.elapsed
+
+@click.command()
+@click.option('--repeat', type=int, default=3)
+@click.option('--samples', type=int, default=1000, help='Games to train the dictionary on')
+@click.option('--dictionary-size', type=int, default=100*1024)
+@click.argument('infiles', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+def main(repeat, samples, dictionary_size, infiles):
+    games = [game for infile in infiles for game in load_file(infile, only_valid=False, only_1v1=False, featured_mod=-1)]
+    codecs = [('json', Codec('json')), ('msgpack', Codec('msgpack')), ('msgpack-zstd', Codec('msgpack-zstd'))]
+    try:
+        dictionary = train_dictionary(games[:samples], dictionary_size).as_bytes()
+        codecs.append(('msgpack-zstd+dict', Codec('msgpack-zstd', dictionary)))
+    except zstandard.ZstdError as error:
+        click.echo('not benchmarking a dictionary (%s); more games?' % error, err=True)
+    click.echo('%d games' % len(games))
+    for label, codec in codecs:
+        values = [codec.encode(game) for game in games]
+        size = sum(len(value) for value in values) / len(games)
+        encode = timed(codec.encode, games, repeat)
+        decode = timed(codec.decode, values, repeat)
+        click.echo('%-18s %8.0f bytes/game %10.0f encodes/s %10.0f decodes/s' % (
+            label, size, len(games) * repeat / encode, len(games) * repeat / decode))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""Compare peak memory of decompressing whole replays with streaming into a reused buffer.
+
+Memory is traced with tracemalloc, so only Python allocations are counted.
+Replays are decompressed in the given order, twice, as a worker would.
+
+    python benchmarks/bench_decompress_memory.py /path/to/replays/*.fafreplay
+"""
+import json
+import tracemalloc
+
+import click
+
+from fafalytics.parsing import decompress, extract_v1, extract_v2
+
+def whole(handle, version):
+    buf = handle.read()
+    return extract_v1(buf) if version == 1 else extract_v2(buf)
+
+def peak(func, infile):
+    with open(infile, 'rb') as handle:
+        version = json.loads(handle.readline()).get('version', 1)
+        tracemalloc.reset_peak()
+        start, _ = tracemalloc.get_traced_memory()
+        data = func(handle, version)
+        _, peak = tracemalloc.get_traced_memory()
+    return len(data), peak - start
+
+@click.command()
+@click.argument('infiles', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+def main(infiles):
+    tracemalloc.start()
+    for label, func in (('whole', whole), ('streamed', decompress)):
+        peaks = []
+        for infile in infiles * 2:
+            size, traced = peak(func, infile)
+            peaks.append(traced)
+            click.echo('%-8s %-40s %6.2fMB decompressed, %6.2fMB peak' % (label, infile, size / 2**20, traced / 2**20))
+        click.echo('%-8s max peak %.2fMB, mean %.2fMB' % (label, max(peaks) / 2**20, sum(peaks) / len(peaks) / 2**20))
+
+if __name__ == '__main__':
+    main()
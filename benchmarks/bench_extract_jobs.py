@@ -0,0 +1,43 @@
+"""Compare `extract --jobs N` with the `xargs -P` fan-out it replaces.
+
+Both runs use `--output print` (discarded), so no datastore is needed and
+only CLI startup, parsing and extraction are measured.
+
+    python benchmarks/bench_extract_jobs.py --jobs 8 /path/to/replays/*.fafreplay
+"""
+import math
+import subprocess
+import sys
+
+import click
+
+from fafalytics.pyutils import Timer
+
+FAFALYTICS = [sys.executable, '-c', 'import fafalytics; fafalytics.main()']
+EXTRACT = ['--loggers', 'console', 'extract', '--output', 'print']
+
+def run_xargs(infiles, jobs, files_per_process):
+    command = ['xargs', '-0', '-P', str(jobs), '-n', str(files_per_process)] + FAFALYTICS + EXTRACT
+    subprocess.run(command, input='\0'.join(infiles).encode(), stdout=subprocess.DEVNULL, check=True)
+
+def run_native(infiles, jobs):
+    command = FAFALYTICS + EXTRACT + ['--jobs', str(jobs)] + list(infiles)
+    subprocess.run(command, stdout=subprocess.DEVNULL, check=True)
+
+@click.command()
+@click.option('--jobs', type=int, default=4)
+@click.option('--files-per-process', type=int, help='xargs shard size (default: evenly split across jobs)')
+@click.argument('infiles', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+def main(jobs, files_per_process, infiles):
+    files_per_process = files_per_process or math.ceil(len(infiles) / jobs)
+    runs = (
+        ('xargs -P %d -n %d' % (jobs, files_per_process), lambda: run_xargs(infiles, jobs, files_per_process)),
+        ('extract --jobs %d' % jobs, lambda: run_native(infiles, jobs)),
+    )
+    for label, run in runs:
+        with Timer() as timer:
+            run()
+        click.echo('%-24s %7.2fs %8.2f replays/s' % (label, timer.elapsed, len(infiles) / timer.elapsed))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""Compare per-command (feed/emit) extraction with the vectorized engine.
+
+Replays are parsed once up front; only feature extraction is timed.
+
+    python benchmarks/bench_extractors.py --repeat 5 tests/testdata/*.pickle
+"""
+import click
+
+from fafalytics.parsing import get_parsed, commands_to_columns
+from fafalytics.extractors import run_extractors, run_vectorized_extractors, TimeToFirst, APM, Minute, CommandMix, Spatial
+from fafalytics.pyutils import Timer
+
+def build_extractors(replay):
+    size = replay['binary']['scenario']['size']
+    return (TimeToFirst(), APM({Minute(3): 'first_3m', Minute(5): 'first_5m'}), CommandMix(), Spatial(size[1], size[2]))
+
+def timed(func, replays, repeat):
+    with Timer() as timer:
+        for _ in range(repeat):
+            for replay, data in replays:
+                func(data, *build_extractors(replay))
+    return timer.elapsed
+
+@click.command()
+@click.option('--repeat', type=int, default=3)
+@click.argument('infiles', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+def main(repeat, infiles):
+    replays = [get_parsed(infile) for infile in infiles]
+    commands = [(replay, replay['commands']) for replay in replays]
+    columns = [(replay, commands_to_columns(replay['commands'])) for replay in replays]
+    total = sum(len(replay['commands']) for replay in replays) * repeat
+    per_command = timed(run_extractors, commands, repeat)
+    vectorized = timed(run_vectorized_extractors, columns, repeat)
+    for label, elapsed in (('per-command', per_command), ('vectorized', vectorized)):
+        click.echo('%-12s %8.3fs %12.0f commands/s' % (label, elapsed, total / elapsed))
+    click.echo('speedup: %.1fx' % (per_command / vectorized))
+
+if __name__ == '__main__':
+    main()
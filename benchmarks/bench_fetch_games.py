@@ -0,0 +1,39 @@
+"""Compare `fetch games` with one request at a time against concurrent requests.
+
+Runs against the fake API server from the test suite, which adds a fixed
+latency to every response, so only request concurrency is measured.
+
+    python benchmarks/bench_fetch_games.py --pages 100 --latency 0.05 --jobs 8
+"""
+from os import path
+import sys
+import tempfile
+
+import click
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), '..', 'tests'))
+import testutils
+
+from fafalytics.fetching import games
+from fafalytics.pyutils import Timer
+
+PAGE_SIZE = 10
+
+def run(api, jobs):
+    with tempfile.TemporaryDirectory() as output_directory, Timer() as timer:
+        games.main(['--api-base', api.url, '--page-size', str(PAGE_SIZE), '--run-type', 'wet',
+                    '--rate', '1000000', '--jobs', str(jobs), output_directory], standalone_mode=False)
+    return timer.elapsed
+
+@click.command()
+@click.option('--pages', type=int, default=100)
+@click.option('--latency', type=float, default=0.05, help='Seconds the server takes per response')
+@click.option('--jobs', type=int, default=8)
+def main(pages, latency, jobs):
+    with testutils.FakeAPI(total_records=pages*PAGE_SIZE, latency=latency) as api:
+        for label, concurrency in (('sequential', 1), ('--jobs %d' % jobs, jobs)):
+            elapsed = run(api, concurrency)
+            click.echo('%-12s %7.2fs %8.1f pages/s' % (label, elapsed, pages / elapsed))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Compare `fetch replays` with one download at a time, `--jobs N`, and `xargs -P N wget`.
+
+Replays are served by the fake content server from the test suite, which adds
+a fixed latency to every response; a temporary datastore holds their URLs.
+
+    python benchmarks/bench_fetch_replays.py --replays 200 --size 200000 --jobs 8
+"""
+from os import path
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import click
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), '..', 'tests'))
+import testutils
+
+from fafalytics import storage
+from fafalytics.fetching import replays
+from fafalytics.manyfiles import datastore
+from fafalytics.pyutils import Timer
+
+def run_native(urls, jobs, output_directory):
+    replays.main(['--jobs', str(jobs), output_directory], standalone_mode=False)
+
+def run_wget(urls, jobs, output_directory):
+    command = ['xargs', '-P', str(jobs), '-n', '1', 'wget', '-q', '-P', output_directory]
+    subprocess.run(command, input='\n'.join(urls).encode(), check=True)
+
+@click.command()
+@click.option('--replays', 'count', type=int, default=200)
+@click.option('--size', type=int, default=200000, help='Bytes per replay')
+@click.option('--latency', type=float, default=0.02, help='Seconds the server takes per response')
+@click.option('--jobs', type=int, default=8)
+def main(count, size, latency, jobs):
+    files = {'/replays/%d.fafreplay' % game_id: os.urandom(size) for game_id in range(count)}
+    runs = [('sequential', run_native, 1), ('--jobs %d' % jobs, run_native, jobs)]
+    if shutil.which('wget'):
+        runs.append(('xargs -P %d wget' % jobs, run_wget, jobs))
+    with tempfile.TemporaryDirectory() as tmpdir, testutils.FakeContent(files, latency=latency) as server:
+        storage.configure(path.join(tmpdir, 'datastore'))
+        storage.start_store()
+        try:
+            urls = [server.url + replay for replay in files]
+            datastore('load', [{'id': game_id, 'replayUrl': url} for game_id, url in enumerate(urls)])
+            for label, run, concurrency in runs:
+                output_directory = tempfile.mkdtemp(dir=tmpdir)
+                with Timer() as timer:
+                    run(urls, concurrency, output_directory)
+                click.echo('%-20s %7.2fs %8.1f replays/s %8.1fMB/s' % (
+                    label, timer.elapsed, count / timer.elapsed, count * size / 2**20 / timer.elapsed))
+        finally:
+            storage.stop_store()
+
+if __name__ == '__main__':
+    main()
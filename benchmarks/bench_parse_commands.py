@@ -0,0 +1,28 @@
+"""Compare parsing replays with all command types and with only those the extractors need.
+
+    python benchmarks/bench_parse_commands.py /path/to/replays/*.fafreplay
+"""
+import click
+
+from fafalytics.parsing import ALL_COMMANDS, parse_command_ids, read_header_and_body
+from fafalytics.extractors import EXTRACTORS, required_commands
+from fafalytics.pyutils import Timer
+
+@click.command()
+@click.argument('infiles', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+def main(infiles):
+    runs = (('all commands', ALL_COMMANDS), ('extractors only', parse_command_ids(required_commands(EXTRACTORS))))
+    totals = dict.fromkeys((label for label, _ in runs), 0.0)
+    for infile in infiles:
+        timings = []
+        for label, parse_commands in runs:
+            with Timer() as timer:
+                read_header_and_body(infile, parse_commands=parse_commands)
+            totals[label] += timer.elapsed
+            timings.append('%s %.3fs' % (label, timer.elapsed))
+        click.echo('%s: %s' % (infile, ', '.join(timings)))
+    for label, total in totals.items():
+        click.echo('%-16s %8.2fs %8.2f replays/s' % (label, total, len(infiles) / total))
+
+if __name__ == '__main__':
+    main()
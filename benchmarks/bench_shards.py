@@ -0,0 +1,48 @@
+"""Compare write throughput of one redis-server with a datastore sharded across
+several, with many processes writing at once (as `extract --jobs N` does).
+Every process also logs each batch to the datastore's log stream.
+
+    python benchmarks/bench_shards.py --games 200000 --writers 16 --shards 4
+"""
+import logging
+import multiprocessing
+import os
+import tempfile
+
+import click
+
+from fafalytics import storage
+from fafalytics.logs import DatastoreHandler
+from fafalytics.manyfiles import datastore
+from fafalytics.pyutils import Timer, chunked
+
+BATCH_SIZE = 100
+FEATURES = {'player1.mean_apm': {'overall': 123.4, 'first_3m': 56.7}, 'player2.mean_apm': {'overall': 98.7, 'first_3m': 65.4}}
+
+def write(ids):
+    logger = logging.getLogger('bench_shards')
+    logger.addHandler(DatastoreHandler())
+    for batch in chunked(ids, BATCH_SIZE):
+        datastore('extract', [{'id': game_id, 'extracted': FEATURES} for game_id in batch])
+        logger.warning('wrote %d games', len(batch))
+
+@click.command()
+@click.option('--games', type=int, default=100000)
+@click.option('--writers', type=int, default=os.cpu_count())
+@click.option('--shards', type=int, default=4)
+def main(games, writers, shards):
+    ids = list(range(games))
+    for count in (1, shards):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            storage.configure(tmpdir)
+            storage.start_store(persistence='none', shards=count)
+            try:
+                with Timer() as timer, multiprocessing.get_context('fork').Pool(writers) as pool:
+                    pool.map(write, [ids[index::writers] for index in range(writers)])
+                assert storage.get_client().hlen('extract') == games
+                click.echo('%d shard(s), %d writers %7.2fs %10.0f games/s' % (count, writers, timer.elapsed, games / timer.elapsed))
+            finally:
+                storage.stop_store()
+
+if __name__ == '__main__':
+    main()
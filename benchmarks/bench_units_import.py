@@ -0,0 +1,54 @@
+"""Time importing the unit database and resolving TimeToFirst's categories.
+
+Each run is a fresh interpreter, once loading the precompiled index and once
+building it from the unit database; the littletable search index that used to
+be built at import is timed in-process for comparison.
+
+    python benchmarks/bench_units_import.py --repeat 5
+"""
+import subprocess
+import sys
+
+import click
+
+from fafalytics.pyutils import Timer
+
+# the package is imported first, so the rest of its imports aren't timed
+IMPORT = '''
+import sys, time
+import fafalytics
+start = time.perf_counter()
+from fafalytics import units
+if sys.argv[1] == 'build':
+    units.CategoryIndex.from_json(units._UNITS).query('tech1 factory land')
+else:
+    units.id_by_categories('tech1 factory land')
+print(time.perf_counter() - start)
+'''
+
+def fresh_import(mode):
+    output = subprocess.run([sys.executable, '-c', IMPORT, mode], capture_output=True, check=True, text=True)
+    return float(output.stdout)
+
+def littletable_index():
+    from littletable import Table
+    from fafalytics.units import _UNITS
+    with Timer() as timer:
+        units = Table('units')
+        units.json_import(_UNITS)
+        units.create_index('id', unique=True)
+        units.create_search_index('categories')
+        units.search.categories('++TECH1 ++FACTORY ++LAND')
+    return timer.elapsed
+
+@click.command()
+@click.option('--repeat', type=int, default=5)
+def main(repeat):
+    runs = (('bitset, precompiled', [fresh_import('precompiled') for _ in range(repeat)]),
+            ('bitset, built', [fresh_import('build') for _ in range(repeat)]),
+            ('littletable', [littletable_index() for _ in range(repeat)]))
+    for label, timings in runs:
+        click.echo('%-20s %7.2fms (best of %d)' % (label, min(timings) * 1000, repeat))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Compare reading pickled and unpacked (memory-mapped) replays.
+
+Each input is converted to both formats in a temporary directory; reads are
+then timed for the commands as columns, and for the headers alone.
+
+    python benchmarks/bench_unpacked.py --repeat 20 tests/testdata/*.pickle
+"""
+import os
+import pickle
+import tempfile
+
+import click
+import zstd
+
+from fafalytics import unpacked
+from fafalytics.parsing import get_parsed
+from fafalytics.pyutils import Timer
+
+def header_from_pickle(filename):
+    with open(filename, 'rb') as handle:
+        obj = pickle.loads(zstd.decompress(handle.read()))
+    return obj['json']
+
+READERS = (
+    ('columns', lambda filename: get_parsed(filename, columnar=True)['columns']['offset_ms'].sum()),
+    ('headers', lambda filename: (unpacked.read_header if filename.endswith(unpacked.EXTENSION) else header_from_pickle)(filename)),
+)
+
+def convert(infiles, outdir):
+    pickles, unpacks = [], []
+    for index, infile in enumerate(infiles):
+        replay = get_parsed(infile)
+        pickles.append(os.path.join(outdir, '%d.pickle' % index))
+        with open(pickles[-1], 'wb') as handle:
+            handle.write(zstd.compress(pickle.dumps(replay)))
+        unpacks.append(os.path.join(outdir, '%d%s' % (index, unpacked.EXTENSION)))
+        unpacked.write(unpacks[-1], get_parsed(infile, columnar=True))
+    return pickles, unpacks
+
+@click.command()
+@click.option('--repeat', type=int, default=10)
+@click.argument('infiles', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+def main(repeat, infiles):
+    with tempfile.TemporaryDirectory() as outdir:
+        pickles, unpacks = convert(infiles, outdir)
+        for label, reader in READERS:
+            for fmt, filenames in (('pickle', pickles), ('unpacked', unpacks)):
+                with Timer() as timer:
+                    for _ in range(repeat):
+                        for filename in filenames:
+                            reader(filename)
+                click.echo('%-8s %-9s %8.2fms per replay' % (label, fmt, timer.elapsed * 1000 / (repeat * len(filenames))))
+
+if __name__ == '__main__':
+    main()
@@ -6,29 +6,29 @@ import sys
 
 import click
 
-from .storage import datastore, configure
-from .extractors import extract
-from .loader import load
-from .exports import export
-from .fetching import fetch
-from .pyutils import first
-from .logs import DatastoreHandler, handlers, setup, log
-from .parsing import unpack
-from .manual import manual
+from .storage import configure, BACKENDS, POOL_SIZE, POOL_TIMEOUT
+from .pyutils import first, LazyGroup
+from .logs import DatastoreHandler, handlers, setup
 
+# subcommands are imported only when invoked, so short invocations (e.g.,
+# `datastore stop`, `log view`) don't pay for pandas, pyarrow or the parser
+COMMANDS = {
+    'datastore': 'fafalytics.storage:datastore',
+    'load': 'fafalytics.loader:load',
+    'extract': 'fafalytics.extractors:extract',
+    'export': 'fafalytics.exports:export',
+    'fetch': 'fafalytics.fetching:fetch',
+    'log': 'fafalytics.logs:log',
+    'unpack': 'fafalytics.parsing:unpack',
+    'manual': 'fafalytics.manual:manual',
+}
 
-@click.group(context_settings={'auto_envvar_prefix': 'FAFAL'})
+@click.group(cls=LazyGroup, lazy_commands=COMMANDS, context_settings={'auto_envvar_prefix': 'FAFAL'})
 @click.option('--loggers', type=click.Choice(tuple(handlers)), multiple=True, default=[first(handlers)])
 @click.option('--loglevel', type=click.Choice(['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'], case_sensitive=False), default='WARNING')
-def main(loggers, loglevel):
-    configure()
+@click.option('--backend', type=click.Choice(BACKENDS), default='redis', help='Datastore backend')
+@click.option('--pool-size', type=click.IntRange(1), default=POOL_SIZE, help="Connections to each redis instance shared by a process' threads")
+@click.option('--pool-timeout', type=click.FloatRange(0), default=POOL_TIMEOUT, help='Seconds a thread waits for a pooled connection')
+def main(loggers, loglevel, backend, pool_size, pool_timeout):
+    configure(backend=backend, pool_size=pool_size, pool_timeout=pool_timeout)
     setup(loglevel, *loggers)
-
-main.add_command(datastore)
-main.add_command(load)
-main.add_command(extract)
-main.add_command(export)
-main.add_command(fetch)
-main.add_command(log)
-main.add_command(unpack)
-main.add_command(manual)
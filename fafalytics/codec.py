@@ -0,0 +1,93 @@
+"""Codecs for the values of datastore hashes.
+
+Values written before codecs existed are JSON text, which has no tag; other
+values start with a tag byte which can't start a JSON document:
+
+    TAG_MSGPACK       msgpack
+    TAG_MSGPACK_ZSTD  zstd compressed msgpack; when the zstd frame names a
+                      dictionary, it's in the DICTIONARIES hash under its id
+
+So any value decodes regardless of the codec currently used for encoding,
+which is configured in the datastore (the CONFIG hash).
+"""
+import json
+import threading
+
+import msgpack
+import zstandard
+
+CODECS = ('json', 'msgpack', 'msgpack-zstd')
+DEFAULT_CODEC = 'msgpack-zstd'
+TAG_MSGPACK = b'\x01'
+TAG_MSGPACK_ZSTD = b'\x02'
+ZSTD_LEVEL = 3
+# datastore keys; CONFIG has the codec's name and (optionally) the id of its dictionary
+CONFIG = 'codec'
+DICTIONARIES = 'codec-dictionaries'
+
+def json_keys(obj):
+    "Makes map keys strings the way JSON does, so values decode the same whatever their codec"
+    if isinstance(obj, dict):
+        return {key if isinstance(key, str) else json.dumps(key): json_keys(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [json_keys(value) for value in obj]
+    return obj
+
+def pack(obj):
+    return msgpack.packb(json_keys(obj), use_bin_type=True)
+
+def unpack(data):
+    return msgpack.unpackb(data, raw=False)
+
+def train_dictionary(objs, size):
+    "Returns a zstd dictionary for compressing objs (and similar objects) packed"
+    return zstandard.train_dictionary(size, [pack(obj) for obj in objs])
+
+class Codec:
+    """Encodes values with one codec, decodes values of any codec; load_dictionary
+    maps a dictionary id to its bytes, for decoding values compressed with it"""
+    def __init__(self, name=DEFAULT_CODEC, dictionary=None, load_dictionary=lambda dict_id: None):
+        if name not in CODECS:
+            raise ValueError('unknown codec %r' % name)
+        self.name = name
+        self.load_dictionary = load_dictionary
+        self.dictionary = None if dictionary is None else zstandard.ZstdCompressionDict(dictionary)
+        self.dictionaries = {0: None}
+        if self.dictionary is not None:
+            self.dictionaries[self.dictionary.dict_id()] = self.dictionary
+        # zstd contexts can't be used by several threads at once, so each thread gets its own
+        self.local = threading.local()
+    @classmethod
+    def from_datastore(cls, client):
+        config = {key.decode(): value.decode() for key, value in client.hgetall(CONFIG).items()}
+        dictionary = client.hget(DICTIONARIES, config['dictionary']) if 'dictionary' in config else None
+        return cls(config.get('name', DEFAULT_CODEC), dictionary, lambda dict_id: client.hget(DICTIONARIES, dict_id))
+    @property
+    def compressor(self):
+        if not hasattr(self.local, 'compressor'):
+            self.local.compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=self.dictionary)
+        return self.local.compressor
+    def decompressor(self, dict_id):
+        if dict_id not in self.dictionaries:
+            dictionary = self.load_dictionary(dict_id)
+            if dictionary is None:
+                raise ValueError('missing zstd dictionary %d' % dict_id)
+            self.dictionaries[dict_id] = zstandard.ZstdCompressionDict(dictionary)
+        decompressors = self.local.__dict__.setdefault('decompressors', {})
+        if dict_id not in decompressors:
+            decompressors[dict_id] = zstandard.ZstdDecompressor(dict_data=self.dictionaries[dict_id])
+        return decompressors[dict_id]
+    def encode(self, obj):
+        if self.name == 'json':
+            return json.dumps(obj).encode()
+        if self.name == 'msgpack':
+            return TAG_MSGPACK + pack(obj)
+        return TAG_MSGPACK_ZSTD + self.compressor.compress(pack(obj))
+    def decode(self, value):
+        tag, data = value[:1], memoryview(value)[1:]
+        if tag == TAG_MSGPACK:
+            return unpack(data)
+        if tag == TAG_MSGPACK_ZSTD:
+            dict_id = zstandard.get_frame_parameters(data).dict_id
+            return unpack(self.decompressor(dict_id).decompress(data))
+        return json.loads(value)
@@ -1,16 +1,18 @@
 import logging
-import json
 from datetime import datetime
 from codecs import decode
 from functools import partial
 
 import click
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
-from .storage import get_client
-from .pyutils import EchoTimer, Query, restructure_dict, Literal, null
+from .storage import get_client, get_codec
+from .pyutils import EchoTimer, Query, restructure_dict, Literal, null, chunked, Duration
 from .parsing import map_faction
 from .logs import log_invocation
+from .extractors import EXTRACTORS, extract_key, extractor_key, feature_names
 
 def parse_iso8601(datestr):
     assert datestr[-1] == 'Z'
@@ -22,10 +24,10 @@ def int_or_none(obj):
     except (TypeError, ValueError):
         return None
 
-def get_valid_game_ids(client):
+def get_valid_game_ids(client, horizon_ms=None):
     logging.info('loading game ids')
     load_keys = set(client.hkeys('load'))
-    extract_keys = set(client.hkeys('extract'))
+    extract_keys = set(client.hkeys(extract_key(horizon_ms)))
     missing_extracts = load_keys - extract_keys
     missing_loads = extract_keys - load_keys
     for keys, counterpart in ((missing_extracts, 'extract'), (missing_loads, 'load')):
@@ -36,13 +38,32 @@ def get_valid_game_ids(client):
             logging.debug('game %s has no %r', key, counterpart)
     return load_keys & extract_keys
 
-def yield_deserilized_values(client, keys):
-    for key in keys:
-        yield {
-            'id': key,
-            'load': json.loads(client.hget('load', key)),
-            'extract': json.loads(client.hget('extract', key)),
-        }
+def yield_deserilized_values(client, keys, chunk_size=1000, horizon_ms=None):
+    "Yields games' load and extract objects, with the features extracted up to horizon_ms"
+    feature_keys = [extractor_key(extractor, horizon_ms) for extractor in EXTRACTORS]
+    codec = get_codec()
+    for chunk in chunked(keys, chunk_size):
+        pipeline = client.pipeline(transaction=False)
+        pipeline.hmget('load', chunk)
+        pipeline.hmget(extract_key(horizon_ms), chunk)
+        for feature_key in feature_keys:
+            pipeline.hmget(feature_key, chunk)
+        loads, extracts, *features = pipeline.execute()
+        for key, load, extract, *results in zip(chunk, loads, extracts, *features):
+            extract = codec.decode(extract)
+            # games extracted before features were stored per extractor have them all in 'extract';
+            # features of another horizon (stored there before horizons were kept apart) are dropped
+            if extract['extracted'].get('horizon_ms') != horizon_ms:
+                extract['extracted'] = {}
+            extract['extracted']['horizon_ms'] = horizon_ms
+            for result in results:
+                if result is not None:
+                    extract['extracted'].update(codec.decode(result)['extracted'])
+            yield {
+                'id': key,
+                'load': codec.decode(load),
+                'extract': extract,
+            }
 
 class InvalidObject(ValueError):
     pass
@@ -83,6 +104,47 @@ PLAYER_STRUCTURE = {
     'player/army_faf_rating':            Q('army/PL', cast=int_or_none, missing=null),
 }
 
+# arrow types of the curated columns (features are all float), so a
+# streamed export is typed the same whichever games its first chunk has
+TIMESTAMP = pa.timestamp('us')
+BASE_TYPES = {
+    'meta/title':               pa.string(),
+    'meta/replay':              pa.string(),
+    'map/name':                 pa.string(),
+    'map/version':              pa.string(),
+    'map/width':                pa.int64(),
+    'map/height':               pa.int64(),
+    'durations/database.start': TIMESTAMP,
+    'durations/database.end':   TIMESTAMP,
+    'durations/header.start':   TIMESTAMP,
+    'durations/header.end':     TIMESTAMP,
+    'durations/ticks':          pa.int64(),
+}
+PLAYER_TYPES = {
+    'player/id':                         pa.string(),
+    'player/login':                      pa.string(),
+    'player/playing_since':              TIMESTAMP,
+    'player/trueskill_mean_before':      pa.float64(),
+    'player/trueskill_deviation_before': pa.float64(),
+    'player/trueskill_mean_after':       pa.float64(),
+    'player/trueskill_deviation_after':  pa.float64(),
+    'player/result':                     pa.string(),
+    'player/score':                      pa.int64(),
+    'army/name':                         pa.string(),
+    'army/faction':                      pa.string(),
+    'army/start_spot':                   pa.string(),
+    'army/color':                        pa.string(),
+    'player/army_num_games':             pa.int64(),
+    'player/army_faf_rating':            pa.int64(),
+}
+
+def curated_schema():
+    "The columns of a curated export (as flattened by to_dataframe) and their types"
+    fields = [(path.replace('/', '.'), type) for path, type in BASE_TYPES.items()]
+    fields += [('features.%s' % name, pa.float64()) for name in feature_names()]
+    fields += [('%s.%s' % (player, path.replace('/', '.')), type) for player in ('player1', 'player2') for path, type in PLAYER_TYPES.items()]
+    return pa.schema(fields + [('id', pa.string())])
+
 def match_player_stats_to_armies(obj):
     human_armies = {k: v for k, v in obj['extract']['headers']['binary']['armies'].items() if v['Human']}
     if len(human_armies) != 2:
@@ -114,56 +176,139 @@ def build_curated_dict(obj):
         result[player_key] = restructure_dict(player_data, PLAYER_STRUCTURE)
     return result
 
+class UnknownColumns(ValueError):
+    pass
+
+class StreamWriter:
+    "Appends dataframe chunks to a file; every chunk is conformed to the columns of schema (an arrow schema ending with the 'id' index)"
+    def __init__(self, outfile, schema):
+        self.outfile = outfile
+        self.schema = schema
+        self.columns = pd.Index(schema.names[:-1])
+    def conform(self, df):
+        unknown = df.columns.difference(self.columns)
+        if len(unknown):
+            raise UnknownColumns('%d columns missing from the schema: %s' % (len(unknown), ','.join(unknown)))
+        df = df.reindex(columns=self.columns)
+        # a column of only nulls is float; as objects, they convert to any type
+        for name in df.columns[df.isna().all()]:
+            df[name] = pd.Series(None, index=df.index, dtype=object)
+        return df
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        self.close()
+
+class ParquetStreamWriter(StreamWriter):
+    "Writes each chunk as a Parquet row group"
+    def __init__(self, outfile, schema):
+        super().__init__(outfile, schema)
+        self.writer = None
+    def write(self, df):
+        df = self.conform(df)
+        if self.writer is None:
+            # pandas metadata, so reading the file restores the 'id' index
+            self.schema = self.schema.with_metadata(pa.Schema.from_pandas(df, preserve_index=True).metadata)
+            self.writer = pq.ParquetWriter(self.outfile, self.schema)
+        self.writer.write_table(pa.Table.from_pandas(df, schema=self.schema, preserve_index=True))
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+class CSVStreamWriter(StreamWriter):
+    def __init__(self, outfile, schema):
+        super().__init__(outfile, schema)
+        self.handle = open(outfile, 'w', newline='')
+        self.header = True
+    def write(self, df):
+        self.conform(df).to_csv(self.handle, header=self.header)
+        self.header = False
+    def close(self):
+        self.handle.close()
+
+STREAM_WRITERS = {'parquet': ParquetStreamWriter, 'csv': CSVStreamWriter}
+# the exports whose columns are known before reading any game, which --stream needs
+STREAM_SCHEMAS = {'curated': curated_schema}
+
 @click.group()
 @log_invocation
 @click.option('--format', type=click.Choice(['parquet', 'csv']), default='parquet')
 @click.option('--game-ids', multiple=True, type=int)
+@click.option('--chunk-size', type=click.IntRange(1), default=1000, help='Number of games read from the datastore at once')
+@click.option('--horizon', type=Duration(), help='Export the features extracted with this --horizon, rather than full extracts')
+@click.option('--stream/--no-stream', default=False,
+              help='Write every chunk as it is read, so memory use depends on chunk size rather than dataset size')
 @click.argument('outfile', type=click.Path(dir_okay=False, writable=True))
 @click.pass_context
-def export(ctx, format, game_ids, outfile):
+def export(ctx, format, game_ids, chunk_size, horizon, stream, outfile):
     "Dump datastore into a CSV/Parquet file"
+    if stream and ctx.invoked_subcommand not in STREAM_SCHEMAS:
+        raise click.UsageError("--stream needs an export's columns in advance; %s exports can't stream" % ctx.invoked_subcommand)
     client = get_client()
     game_ids = [str(game_id).encode() for game_id in game_ids]
     if not game_ids:
-        game_ids = get_valid_game_ids(client)
-    ctx.obj = (client, game_ids)
+        game_ids = get_valid_game_ids(client, horizon)
+    ctx.obj = (client, game_ids, chunk_size, horizon)
+
+def to_dataframe(objects):
+    return pd.json_normalize(objects).set_index('id')
 
 @export.result_callback()
-def export_callback(retval, format, game_ids, outfile):
-    objects, invalid = retval
+def export_callback(chunks, format, game_ids, chunk_size, horizon, stream, outfile):
+    if stream:
+        return stream_callback(chunks, format, outfile, STREAM_SCHEMAS[click.get_current_context().invoked_subcommand]())
+    objects, invalid = [], 0
+    for chunk_objects, chunk_invalid in chunks:
+        objects.extend(chunk_objects)
+        invalid += chunk_invalid
     if not objects:
         click.secho('(nothing to write)')
         return
     with EchoTimer('Adding %d objects to dataframe (%d invalid/skipped)' % (len(objects), invalid)):
-        df = pd.json_normalize(objects).set_index('id')
+        df = to_dataframe(objects)
     with EchoTimer('Writing %dkb dataframe to %s' % (df.memory_usage(index=True).sum()/1024, format)):
         if format == 'csv':
             df.to_csv(outfile)
         else:
             df.to_parquet(outfile)
 
+def stream_callback(chunks, format, outfile, schema):
+    written = invalid = 0
+    with STREAM_WRITERS[format](outfile, schema) as writer:
+        for objects, chunk_invalid in chunks:
+            invalid += chunk_invalid
+            if not objects:
+                continue
+            writer.write(to_dataframe(objects))
+            written += len(objects)
+    if not written:
+        click.secho('(nothing to write)')
+        return
+    click.echo('Wrote %d objects to %s (%d invalid/skipped)' % (written, format, invalid))
+
 @export.command()
 @click.pass_context
 def flattened(ctx):
     "Dump everything in the datastore using flattened JSONs (not recommended, messy)"
-    client, game_ids = ctx.obj
+    client, game_ids, chunk_size, horizon = ctx.obj
     with click.progressbar(game_ids, label='Reading datastore') as bar:
-        objects = list(yield_deserilized_values(client, bar))
-    return objects, invalid
+        for objects in chunked(yield_deserilized_values(client, bar, chunk_size, horizon), chunk_size):
+            yield objects, 0
 
 @export.command()
 @click.pass_context
 def curated(ctx):
     "Dump specific fields from the datastore to a nice CSV/Parquet file (recommended)"
-    client, game_ids = ctx.obj
-    objects = []
-    invalid = 0
+    client, game_ids, chunk_size, horizon = ctx.obj
     with click.progressbar(game_ids, label='Reading datastore') as bar:
-        for obj in yield_deserilized_values(client, bar):
-            try:
-                objects.append(build_curated_dict(obj))
-            except InvalidObject as error:
-                invalid += 1
-                logging.warning('skipping %s: %s' % (obj['id'], error))
-                continue
-    return objects, invalid
+        for chunk in chunked(yield_deserilized_values(client, bar, chunk_size, horizon), chunk_size):
+            objects = []
+            invalid = 0
+            for obj in chunk:
+                try:
+                    objects.append(build_curated_dict(obj))
+                except InvalidObject as error:
+                    invalid += 1
+                    logging.warning('skipping %s: %s' % (obj['id'], error))
+                    continue
+            yield objects, invalid
@@ -2,11 +2,17 @@
 
 https://en.wikipedia.org/wiki/Feature_extraction
 """
+import collections
+import functools
+import logging
+
 import click
 
-from ..parsing import get_parsed
-from ..manyfiles import file_processor, yield_processed_files, yields_outputs
+from ..parsing import get_parsed, read_headers, game_id
+from ..manyfiles import file_processor, yield_processed_files, yields_outputs, Redirect
 from ..logs import log_invocation
+from ..pyutils import Timer, Duration, chunked
+from ..storage import get_client
 
 from .apm import APM, Minute
 from .first import TimeToFirst
@@ -22,28 +28,145 @@ def run_extractors(commands, *extractors):
         result.update(extractor.emit())
     return result
 
-def extract_replay(filename):
-    replay = get_parsed(filename)
+def run_vectorized_extractors(columns, *extractors):
+    result = {}
+    for extractor in extractors:
+        result.update(extractor.extract(columns))
+    return result
+
+# the extractors extract_replay runs, to know which commands it needs parsed
+EXTRACTORS = (TimeToFirst, APM, CommandMix, Spatial)
+
+def required_commands(extractors):
+    "Names of the command types any of the given extractor classes looks at"
+    return frozenset().union(*(extractor.COMMANDS for extractor in extractors))
+
+# extracts limited to a horizon are kept apart from full ones (and those of other horizons)
+def horizon_suffix(horizon_ms):
+    return '' if horizon_ms is None else ':h%d' % horizon_ms
+
+def extract_key(horizon_ms=None):
+    "The datastore hash holding replays' headers, per game"
+    return 'extract' + horizon_suffix(horizon_ms)
+
+def extractor_key(extractor, horizon_ms=None):
+    "The datastore hash holding an extractor class's results, per game, at its current version"
+    return 'extract:%s:%s%s' % (extractor.__name__, extractor.VERSION, horizon_suffix(horizon_ms))
+
+def feature_names(extractors=EXTRACTORS):
+    "Every feature name extract_replay may store for a game"
+    return ['horizon_ms'] + [name for extractor in extractors for name in extractor.feature_names()]
+
+def build_extractors(replay, extractors=EXTRACTORS):
+    size = replay['binary']['scenario']['size']
+    instances = (
+        TimeToFirst(),
+        APM(),
+        CommandMix(),
+        Spatial(size[1], size[2]),
+    )
+    return [instance for instance in instances if type(instance) in extractors]
+
+def extract_replay(filename, horizon_ms=None, extractors=EXTRACTORS):
+    """Returns Redirects of the replay's headers to its extract_key, and of each extractor's
+    features to its extractor_key."""
+    with Timer() as parse_timer:
+        replay = get_parsed(filename, columnar=True, commands=required_commands(extractors), horizon_ms=horizon_ms)
+    game_id = replay['json']['uid']
     replay['binary']['last_tick'] = replay['remaining']['last_tick']
     desyncs = replay['remaining']['desync_ticks']
     replay['binary']['desync'] = {'count': len(desyncs),
                                   'ticks': ','.join(str(t) for t in desyncs)}
-    extracted = run_extractors(
-        replay['commands'],
-        TimeToFirst(),
-        APM({Minute(3): 'first_3m', Minute(5): 'first_5m'}),
-        CommandMix(),
-        Spatial(replay['binary']['scenario']['size'][1], replay['binary']['scenario']['size'][2]),
-    )
+    with Timer() as extract_timer:
+        outputs = [
+            Redirect(extractor_key(type(extractor), horizon_ms), {'id': game_id, 'extracted': extractor.extract(replay['columns'])})
+            for extractor in build_extractors(replay, extractors)
+        ]
+    logging.debug('%s: parsed in %.3fs, extracted in %.3fs', filename, parse_timer.elapsed, extract_timer.elapsed)
     replay['binary'].pop('players')
     replay['binary'].pop('scenario')
-    return {'id': replay['json']['uid'], 'headers': {'json': replay['json'], 'binary': replay['binary']}, 'extracted': extracted}
+    # features were computed from commands up to this offset (None meaning the whole replay)
+    extracted = {'horizon_ms': horizon_ms}
+    outputs.insert(0, Redirect(extract_key(horizon_ms), {'id': game_id, 'headers': {'json': replay['json'], 'binary': replay['binary']}, 'extracted': extracted}))
+    return outputs
+
+def extract_stale(item, horizon_ms=None):
+    filename, extractors = item
+    return extract_replay(filename, horizon_ms, extractors)
+
+def extract_headers(filename):
+    header, binary = read_headers(filename)
+    return [Redirect('headers', {'id': header['uid'], 'headers': {'json': header, 'binary': binary}})]
+
+def game_ids(chunk):
+    identifiers = [game_id(infile) for infile in chunk]
+    return identifiers, [identifier for identifier in identifiers if identifier is not None]
+
+def filter_extracted(infiles, prefix, chunk_size=1000):
+    "Returns the infiles whose games aren't in the datastore's prefix hash (or repeated), and why others were skipped"
+    remaining, skipped, seen = [], collections.Counter(), set()
+    for chunk in chunked(infiles, chunk_size):
+        identifiers, known = game_ids(chunk)
+        pipeline = get_client().pipeline(transaction=False)
+        for identifier in known:
+            pipeline.hexists(prefix, identifier)
+        exists = dict(zip(known, pipeline.execute()))
+        for infile, identifier in zip(chunk, identifiers):
+            if exists.get(identifier):
+                skipped['already in %r' % prefix] += 1
+            elif identifier is not None and identifier in seen:
+                skipped['same game as an earlier file'] += 1
+            else:
+                seen.add(identifier)
+                remaining.append(infile)
+    return remaining, skipped
+
+def find_stale(infiles, extractors=EXTRACTORS, chunk_size=1000, horizon_ms=None):
+    """Returns (infile, extractors) pairs for the extractors whose current version has no results
+    (up to horizon_ms) for infile's game, and why other infiles were skipped"""
+    stale, skipped = [], collections.Counter()
+    for chunk in chunked(infiles, chunk_size):
+        identifiers, known = game_ids(chunk)
+        pipeline = get_client().pipeline(transaction=False)
+        for identifier in known:
+            for extractor in extractors:
+                pipeline.hexists(extractor_key(extractor, horizon_ms), identifier)
+        exists = iter(pipeline.execute())
+        current = {identifier: [next(exists) for extractor in extractors] for identifier in known}
+        for infile, identifier in zip(chunk, identifiers):
+            if identifier is None:
+                outdated = tuple(extractors)
+            else:
+                outdated = tuple(extractor for extractor, exists in zip(extractors, current[identifier]) if not exists)
+            if outdated:
+                stale.append((infile, outdated))
+            else:
+                skipped['up to date'] += 1
+    return stale, skipped
+
+def echo_skipped(skipped):
+    summary = ', '.join('%d %s' % (count, reason) for reason, count in skipped.items()) or 'none'
+    logging.info('skipped files: %s', summary)
+    click.echo('skipped: %s' % summary, err=True)
 
 @click.command()
+@click.option('--incremental', is_flag=True, help='Skip replays whose games are already in the datastore, without parsing them')
+@click.option('--only-stale', is_flag=True, help="Only run extractors whose current version has no results for the replay's game (fastest with unpacked replays)")
+@click.option('--headers-only', is_flag=True, help="Only read the replays' headers, into the datastore's 'headers' rather than 'extract'")
+@click.option('--horizon', type=Duration(), help='Only extract features from commands issued up to this offset (e.g., 10m), stored apart from full extracts')
 @log_invocation
 @file_processor
 @yields_outputs
-def extract(ctx, max_errors, infiles):
+def extract(ctx, incremental, only_stale, headers_only, horizon, max_errors, jobs, infiles):
     "Read replay file and populate the datastore with features extracted from it."
+    callback = extract_headers if headers_only else functools.partial(extract_replay, horizon_ms=horizon)
+    if incremental:
+        infiles, skipped = filter_extracted(infiles, 'headers' if headers_only else extract_key(horizon))
+        echo_skipped(skipped)
+    if only_stale and not headers_only:
+        infiles, skipped = find_stale(infiles, horizon_ms=horizon)
+        echo_skipped(skipped)
+        callback = functools.partial(extract_stale, horizon_ms=horizon)
     with click.progressbar(infiles, label='Extracting') as bar:
-        yield from yield_processed_files(bar, extract_replay, max_errors)
+        for outputs in yield_processed_files(bar, callback, max_errors, jobs=jobs):
+            yield from outputs
@@ -1,4 +1,6 @@
-from .base import Extractor
+import numpy
+
+from .base import Extractor, type_mask
 
 class Milliseconds(int):
     @property
@@ -15,11 +17,18 @@ Minute = Milliseconds.from_minutes
 
 class APM(Extractor):
     ACTIONS = frozenset(('issue', 'command_count_increase', 'command_count_decrease', 'factory_issue'))
-    def __init__(self, thresholds):
+    COMMANDS = ACTIONS
+    VERSION = 1
+    THRESHOLDS = {Minute(3): 'first_3m', Minute(5): 'first_5m'}
+    def __init__(self, thresholds=None):
+        thresholds = thresholds or self.THRESHOLDS
         self.actions = {0: {'overall': 0}, 1: {'overall': 0}}
         self.initial_thresholds = thresholds
         self.thresholds = thresholds.copy()
         self.last_offset = Milliseconds(0)
+    @classmethod
+    def feature_names(cls):
+        return ['player%d.mean_apm.%s' % (player, label) for player in (1, 2) for label in ('overall',) + tuple(cls.THRESHOLDS.values())]
     def feed(self, command):
         if command['type'] not in self.ACTIONS:
             return
@@ -32,11 +41,27 @@ class APM(Extractor):
                 self.actions[player][label] = self.actions[player]['overall']
             self.thresholds.pop(threshold)
     def emit(self):
+        return self.format(self.actions, self.last_offset)
+    def format(self, actions, last_offset):
         def pkey(player, label):
             return 'player%d.mean_apm.%s' % (player + 1, label)
         results = {}
-        for player, stats in self.actions.items():
-            results[pkey(player, 'overall')] = self.last_offset.per_minute_or_none(stats['overall'])
+        for player, stats in actions.items():
+            results[pkey(player, 'overall')] = last_offset.per_minute_or_none(stats['overall'])
             for threshold, label in self.initial_thresholds.items():
                 results[pkey(player, label)] = threshold.per_minute_or_none(stats.get(label))
         return results
+    def extract(self, columns):
+        mask = type_mask(columns, self.ACTIONS)
+        offsets = columns['offset_ms'][mask]
+        players = columns['player'][mask]
+        actions = {player: {'overall': int(count)} for player, count in enumerate(numpy.bincount(players, minlength=2)[:2])}
+        for threshold, label in self.initial_thresholds.items():
+            index = numpy.searchsorted(offsets, threshold)
+            if index == len(offsets):
+                continue
+            # like feed(), count the action that crossed the threshold
+            for player, count in enumerate(numpy.bincount(players[:index+1], minlength=2)[:2]):
+                actions[player][label] = int(count)
+        last_offset = Milliseconds(offsets[-1] if len(offsets) else 0)
+        return self.format(actions, last_offset)
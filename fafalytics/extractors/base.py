@@ -1,9 +1,28 @@
+import numpy
+
+from ..parsing import COMMAND_TYPES, COMMAND_TYPE_IDS
+
 class Extractor:
+    # names of the command types the extractor looks at; the parser may skip the rest
+    COMMANDS = frozenset(COMMAND_TYPES)
+    # bump whenever the extractor's results change, so `extract --only-stale` recomputes them
+    VERSION = 1
     def __str__(self):
         return self.__class__.__name__
+    @classmethod
+    def feature_names(cls):
+        "Names of every feature the extractor emits, flattened as export does (e.g., player1.mean_apm.overall)"
+        raise NotImplementedError('%s does not list its features' % cls.__name__)
+    def extract(self, columns):
+        "Vectorized alternative to feed()/emit(), computing the same features from a replay's command columns"
+        raise NotImplementedError('%s has no vectorized implementation' % self)
 
 class ExtractByCommand(Extractor):
     def feed(self, command):
         if not hasattr(self, command['type']):
             return
         getattr(self, command['type'])(command)
+
+def type_mask(columns, types):
+    "Boolean mask of the commands in columns whose type is one of the given type names"
+    return numpy.isin(columns['type'], [COMMAND_TYPE_IDS[name] for name in types])
@@ -1,12 +1,16 @@
 from collections import Counter
 
-from .base import ExtractByCommand
+import numpy
+
+from .base import ExtractByCommand, type_mask
 from ..parsing import ISSUE_TYPE_ID_TO_NAME
 
 from replay_parser.constants import ActionType
 
 class CommandMix(ExtractByCommand):
     "A feature extractor focused on commands issued. 'How much reclaim', etc"
+    COMMANDS = frozenset(('issue',))
+    VERSION = 1
     # these are the top-9 commands as found by teolicy through sampling 1,000
     # 1v1 ladder games played between Jan and Mar 2021
     # see: https://faforever.zulipchat.com/#narrow/stream/203478-general/topic/Bulk.20data.20access/near/236097943
@@ -14,6 +18,11 @@ class CommandMix(ExtractByCommand):
         ActionType.Move, ActionType.BuildMobile, ActionType.BuildFactory, ActionType.Reclaim,
         ActionType.Attack, ActionType.Guard, ActionType.AggressiveMove, ActionType.Patrol,
         ActionType.Upgrade))
+    @classmethod
+    def feature_names(cls):
+        # format() only emits the command types issued, but any of these may be
+        names = ['Total'] + [ISSUE_TYPE_ID_TO_NAME[command_type] for command_type in sorted(cls.TOP_COMMANDS)] + [ISSUE_TYPE_ID_TO_NAME[-1]]
+        return ['player%d.command_ratio.%s.%s' % (player, mode, name) for player in (1, 2) for mode in ('first_5m', 'overall') for name in names]
     def __init__(self):
         self.result = {0: {'first_5m': Counter(), 'overall': Counter()},
                        1: {'first_5m': Counter(), 'overall': Counter()}}
@@ -25,8 +34,24 @@ class CommandMix(ExtractByCommand):
         if command['offset_ms'] < 5*60*1000:
             self.result[command['player']]['first_5m'][command_type] += 1
     def emit(self):
+        return self.format(self.result)
+    def extract(self, columns):
+        mask = type_mask(columns, ('issue',))
+        command_types = columns['command_type'][mask]
+        command_types = numpy.where(numpy.isin(command_types, tuple(self.TOP_COMMANDS)), command_types, -1)
+        players = columns['player'][mask]
+        first_5m = columns['offset_ms'][mask] < 5*60*1000
+        result = {}
+        for player in (0, 1):
+            result[player] = {}
+            for mode, selected in (('first_5m', first_5m), ('overall', True)):
+                values, counts = numpy.unique(command_types[(players == player) & selected], return_counts=True)
+                result[player][mode] = Counter(dict(zip(values.tolist(), counts.tolist())))
+        return self.format(result)
+    @staticmethod
+    def format(player_results):
         result = {}
-        for player, mode_to_counter in self.result.items():
+        for player, mode_to_counter in player_results.items():
             player_obj = result['player%d.command_ratio' % (player+1)] = {}
             for mode, counter in mode_to_counter.items():
                 mode_obj = player_obj[mode] = {}
@@ -1,8 +1,20 @@
-from .base import ExtractByCommand
+import numpy
+
+from .base import ExtractByCommand, type_mask
 from ..units import id_by_categories as C
 
+def invert(features):
+    "Maps every unit id to the tuple of features it triggers"
+    index = {}
+    for feature, unit_ids in features.items():
+        for unit_id in unit_ids:
+            index[unit_id] = index.get(unit_id, ()) + (feature,)
+    return index
+
 class TimeToFirst(ExtractByCommand):
     "A feature extractor focused on game timeline. 'Time to first T2 mexer', etc"
+    COMMANDS = frozenset(('issue',))
+    VERSION = 2
     FEATURES = {
         't1_land':      C('tech1 factory land'),
         't1_air':       C('tech1 factory air'),
@@ -20,13 +32,19 @@ class TimeToFirst(ExtractByCommand):
         't3_sacu':      C('builtbyquantumgate'),
         't4_exp':       C('experimental'),
     }
+    INDEX = invert(FEATURES)
+    @classmethod
+    def register(cls, feature, categories):
+        "Adds a feature for the units matching a category expression (see units.id_by_categories)"
+        cls.FEATURES = {**cls.FEATURES, feature: C(categories)}
+        cls.INDEX = invert(cls.FEATURES)
+    @classmethod
+    def feature_names(cls):
+        return ['player%d.first.%s' % (player, feature) for player in (1, 2) for feature in cls.FEATURES]
     def __init__(self):
-        self.features = self.FEATURES.copy()
         self.result = {0: {k: None for k in self.FEATURES},
                        1: {k: None for k in self.FEATURES}}
     def issue(self, command):
-        if not self.features:
-            return
         # casting offset_ms to int because the parser multiplied it by the
         # 'advance' arg of the 'Advance' command, and that was parsed as an
         # uncasted '1.0' float; I would change it only in parsing.py, but
@@ -34,15 +52,32 @@ class TimeToFirst(ExtractByCommand):
         self.update(command['cmd_data']['blueprint_id'],
                     command['player'], int(command['offset_ms']))
     def update(self, unit_id, player, offset):
-        for feature, unit_ids in tuple(self.features.items()):
-            if unit_id not in unit_ids:
-                continue
-            if self.result[player][feature]:
+        for feature in self.INDEX.get(unit_id, ()):
+            # 0 is a real offset: a command issued as the game starts
+            if self.result[player][feature] is not None:
                 continue
             self.result[player][feature] = offset
-            other_player = (player + 1) % 2
-            if self.result[other_player][feature]:
-                self.features.pop(feature)
     def emit(self):
+        return self.format(self.result)
+    def extract(self, columns):
+        mask = type_mask(columns, ('issue',))
+        blueprint_ids = columns['blueprint_id'][mask]
+        players = columns['player'][mask]
+        offsets = columns['offset_ms'][mask]
+        result = {0: {k: None for k in self.FEATURES},
+                  1: {k: None for k in self.FEATURES}}
+        unit_ids, codes = numpy.unique(blueprint_ids, return_inverse=True)
+        features = [self.INDEX.get(unit_id.decode(), ()) for unit_id in unit_ids.tolist()]
+        for player in result:
+            selected = players == player
+            # first occurrence of every unit id this player issued
+            player_codes, first = numpy.unique(codes[selected], return_index=True)
+            for code, offset in zip(player_codes.tolist(), offsets[selected][first].tolist()):
+                for feature in features[code]:
+                    if result[player][feature] is None or offset < result[player][feature]:
+                        result[player][feature] = offset
+        return self.format(result)
+    @staticmethod
+    def format(player_results):
         return {'player%d' % (player+1): {'first': features}
-                for player, features in self.result.items()}
+                for player, features in player_results.items()}
@@ -0,0 +1,72 @@
+"""Convex hulls maintained incrementally, keeping only the hull's vertices.
+
+Points are (x, y) tuples; batches of points are (n, 2) arrays.
+"""
+import numpy
+
+def cross(origin, a, b):
+    return (a[0]-origin[0])*(b[1]-origin[1]) - (a[1]-origin[1])*(b[0]-origin[0])
+
+def convex_hull(points):
+    "Andrew's monotone chain; returns the hull's vertices in counter-clockwise order"
+    points = sorted(set(points))
+    if len(points) <= 2:
+        return points
+    lower, upper = [], []
+    for point in points:
+        while len(lower) >= 2 and cross(lower[-2], lower[-1], point) <= 0:
+            lower.pop()
+        lower.append(point)
+    for point in reversed(points):
+        while len(upper) >= 2 and cross(upper[-2], upper[-1], point) <= 0:
+            upper.pop()
+        upper.append(point)
+    return lower[:-1] + upper[:-1]
+
+def polygon_area(vertices):
+    "Shoelace formula"
+    area = 0.0
+    for (x1, y1), (x2, y2) in zip(vertices, vertices[1:] + vertices[:1]):
+        area += x1*y2 - x2*y1
+    return abs(area) / 2
+
+def contains(vertices, points):
+    "Mask of the points inside (or on the boundary of) a counter-clockwise convex polygon"
+    mask = numpy.ones(len(points), dtype=bool)
+    for (x1, y1), (x2, y2) in zip(vertices, vertices[1:] + vertices[:1]):
+        mask &= (x2-x1)*(points[:, 1]-y1) - (y2-y1)*(points[:, 0]-x1) >= 0
+    return mask
+
+def extreme_points(points):
+    "Points with the smallest/largest x, y, x+y and x-y; their hull encloses most of the others"
+    x, y = points[:, 0], points[:, 1]
+    indices = {func(values) for values in (x, y, x+y, x-y) for func in (numpy.argmin, numpy.argmax)}
+    return [tuple(point) for point in points[sorted(indices)].tolist()]
+
+class IncrementalHull:
+    "A convex hull that discards points falling inside it, so memory is O(hull size)"
+    def __init__(self):
+        self.vertices = []
+    def add(self, point):
+        vertices = self.vertices
+        if len(vertices) >= 3:
+            # inlined point-in-polygon test; this runs for every command
+            x, y = point
+            x1, y1 = vertices[-1]
+            for x2, y2 in vertices:
+                if (x2-x1)*(y-y1) - (y2-y1)*(x-x1) < 0:
+                    break
+                x1, y1 = x2, y2
+            else:
+                return
+        self.vertices = convex_hull(vertices + [point])
+    def extend(self, points):
+        if not len(points):
+            return
+        inner = convex_hull(self.vertices + extreme_points(points))
+        if len(inner) >= 3:
+            points = points[~contains(inner, points)]
+        self.vertices = convex_hull(inner + [tuple(point) for point in points.tolist()])
+    @property
+    def area(self):
+        return polygon_area(self.vertices) if len(self.vertices) >= 3 else 0.0
@@ -1,22 +1,34 @@
-from shapely.geometry import Polygon, box
+import numpy
 
-from .base import ExtractByCommand
+from .base import ExtractByCommand, type_mask
+from .apm import Minute
+from .hull import IncrementalHull
 
 class Spatial(ExtractByCommand):
     "A feature extractor focused on spatial data (command coordinates on the map)"
-    def __init__(self, width, height):
-        self.area = box(0, 0, width, height).area
-        self.result = {0: {'first': {'1m': None, '3m': None, '5m': None}, 'overall': None},
-                       1: {'first': {'1m': None, '3m': None, '5m': None}, 'overall': None}}
-        self.coordinates = {0: [], 1: []}
-        self.minutes = {'1m': 1000*60, '3m': 1000*60*3, '5m': 1000*60*5}
+    COMMANDS = frozenset(('issue',))
+    VERSION = 1
+    WINDOWS = {'1m': Minute(1), '3m': Minute(3), '5m': Minute(5)}
+    @classmethod
+    def feature_names(cls):
+        return ['player%d.command_area.%s' % (player, name) for player in (1, 2)
+                for name in ['first.%s' % label for label in cls.WINDOWS] + ['overall']]
+    def __init__(self, width, height, windows=None):
+        self.area = width * height
+        # labelled time windows (in milliseconds) at which to report coverage
+        self.windows = dict(sorted((windows or self.WINDOWS).items(), key=lambda item: item[1]))
+        self.result = {0: {'first': {label: None for label in self.windows}, 'overall': None},
+                       1: {'first': {label: None for label in self.windows}, 'overall': None}}
+        self.hulls = {0: IncrementalHull(), 1: IncrementalHull()}
+        self.counts = {0: 0, 1: 0}
+        self.minutes = self.windows.copy()
     def extract_coordinates(self, command):
         # coordinates are ordered x (horizontal), z (altitude), y (veritcal)
         return ((command['cmd_data']['target']['position'] or (None, None, None))[0],
                 (command['cmd_data']['target']['position'] or (None, None, None))[2])
-    def hull_coverage(self, coordinates):
-        "Ratio of the area of the convex hull for the given coordinates relative to the entire map"
-        return Polygon(coordinates).convex_hull.area/self.area
+    def coverage(self, hull):
+        "Ratio of the area of the convex hull relative to the entire map"
+        return hull.area/self.area
     def issue(self, command):
         coordinates = self.extract_coordinates(command)
         if not all(coordinates):
@@ -27,18 +39,55 @@ class Spatial(ExtractByCommand):
                 continue
             if self.result[player]['first'][label] is not None:
                 continue
-            if len(self.coordinates[player]) < 3:
+            if self.counts[player] < 3:
                 return
-            self.result[player]['first'][label] = self.hull_coverage(self.coordinates[player])
+            self.result[player]['first'][label] = self.coverage(self.hulls[player])
             if self.result[(player+1)%2]['first'][label] is not None:
                 self.minutes.pop(label)
-        self.coordinates[player].append(coordinates)
+        self.hulls[player].add(coordinates)
+        self.counts[player] += 1
     def emit(self):
         result = {}
         for player, player_results in self.result.items():
             result['player%d.command_area' % (player+1)] = player_results
-            if len(self.coordinates[player])<3:
+            if self.counts[player] < 3:
                 player_results['overall'] = None
                 continue
-            player_results['overall'] = self.hull_coverage(self.coordinates[player])
+            player_results['overall'] = self.coverage(self.hulls[player])
+        return result
+    def extract(self, columns):
+        mask = type_mask(columns, ('issue',))
+        x, z = columns['x'][mask], columns['z'][mask]
+        # like feed(), skip commands with no position (or on a zero coordinate)
+        positioned = (x != 0) & (z != 0) & ~numpy.isnan(x) & ~numpy.isnan(z)
+        players = columns['player'][mask]
+        offsets = columns['offset_ms'][mask]
+        result = {}
+        for player in (0, 1):
+            selected = positioned & (players == player)
+            points = numpy.column_stack((x[selected], z[selected])).astype('f8')
+            player_offsets = offsets[selected]
+            hull = IncrementalHull()
+            count = len(points)
+            consumed = 0
+            first = {}
+            for label, milliseconds in self.windows.items():
+                index = numpy.searchsorted(player_offsets[:count], milliseconds)
+                if index == count:
+                    first[label] = None
+                    continue
+                if index < 3:
+                    # feed() stops collecting coordinates for a player who
+                    # crosses a threshold with less than 3 of them
+                    first[label] = None
+                    count = index
+                    continue
+                hull.extend(points[consumed:index])
+                consumed = index
+                first[label] = self.coverage(hull)
+            hull.extend(points[consumed:count])
+            result['player%d.command_area' % (player+1)] = {
+                'first': first,
+                'overall': self.coverage(hull) if count >= 3 else None,
+            }
         return result
@@ -1,16 +1,27 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from os import path
 import os
-import time
 import json
+import logging
 import datetime
+import tempfile
 import urlobject
 
 import requests
+from urllib3.util.retry import Retry
 import click
 
-from .storage import get_client
+from .storage import get_client, get_codec
+from .loader import REPLAY_URLS, SCAN_BATCH, index_replay_urls
+from .pyutils import TokenBucket
 
 API_BASE = urlobject.URLObject('https://api.faforever.com')
+CHECKPOINT = '.checkpoint.json' # hidden, so it isn't globbed with the dumps
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+PART_SUFFIX = '.part'
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# datastore hash of replay URLs whose download failed, to the error and number of attempts
+FAILURES = 'fetch-failures'
 
 def isoformat(date):
     return datetime.datetime.combine(date, datetime.time()).isoformat(timespec='seconds') + 'Z'
@@ -31,9 +42,64 @@ def build_url(api_base, page_size, max_pages, page_number, start_date, end_date,
     url = url.add_query_param('sort', '-startTime' if sort == 'DESC' else 'startTime')
     return url
 
+def write_atomically(filename, obj, **kwargs):
+    "Writes obj as JSON to filename, so that filename is either absent or complete"
+    with tempfile.NamedTemporaryFile('w', dir=path.dirname(filename) or '.', delete=False) as handle:
+        json.dump(obj, handle, **kwargs)
+    os.replace(handle.name, filename)
+
 def write_response(directory, index, obj):
-    with open(path.join(directory, 'dump%04d.json' % index), 'w') as handle:
-        json.dump(obj, handle, indent=4)
+    write_atomically(path.join(directory, 'dump%04d.json' % index), obj, indent=4)
+
+def make_session(pool_size, retries, backoff):
+    "A pooled session retrying on 429/5xx with exponential backoff, honouring Retry-After"
+    retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=RETRY_STATUSES,
+                  allowed_methods=('GET',), respect_retry_after_header=True)
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def fetch_page(session, bucket, url, timeout):
+    bucket.acquire()
+    response = session.get(str(url), timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+class Checkpoint:
+    """Pages of a query already written to a directory, so an interrupted fetch can resume.
+
+    Pages complete out of order, so the checkpoint keeps the number of pages
+    done without gaps plus the (few) pages done past the first missing one.
+    """
+    def __init__(self, directory, query):
+        self.filename = path.join(directory, CHECKPOINT)
+        self.query = query
+        self.total_pages = None
+        self.contiguous = 0
+        self.done = set()
+    def load(self):
+        if not path.exists(self.filename):
+            return
+        with open(self.filename) as handle:
+            obj = json.load(handle)
+        if obj['query'] != self.query:
+            raise click.ClickException('%s is for a different query (%s)' % (self.filename, obj['query']))
+        self.total_pages = obj['total_pages']
+        self.contiguous = obj['contiguous']
+        self.done = set(obj['done'])
+    def save(self):
+        obj = {'query': self.query, 'total_pages': self.total_pages, 'contiguous': self.contiguous, 'done': sorted(self.done)}
+        write_atomically(self.filename, obj)
+    def mark(self, page_number):
+        self.done.add(page_number)
+        while self.contiguous + 1 in self.done:
+            self.contiguous += 1
+            self.done.remove(self.contiguous)
+        self.save()
+    def missing(self, last_page):
+        return [page for page in range(self.contiguous+1, last_page+1) if page not in self.done]
 
 @click.group()
 def fetch():
@@ -45,36 +111,151 @@ def fetch():
 @click.option('--max-pages', type=int)
 @click.option('--start-date', type=click.DateTime(['%Y-%m-%d']), default=None)
 @click.option('--end-date', type=click.DateTime(['%Y-%m-%d']), default=None)
-@click.option('--sleep-interval', type=float, default=10)
+@click.option('--rate', type=click.FloatRange(0, min_open=True), default=0.1, help='Requests per second')
+@click.option('--burst', type=click.IntRange(1), default=1, help='Requests allowed at once after being idle')
+@click.option('--sleep-interval', type=click.FloatRange(0, min_open=True), help='Deprecated; same as --rate 1/SLEEP_INTERVAL')
+@click.option('--jobs', type=click.IntRange(1), default=4, help='Number of concurrent requests')
+@click.option('--retries', type=int, default=5)
+@click.option('--backoff', type=float, default=10, help='Retry backoff factor in seconds (unless the server sends Retry-After)')
+@click.option('--timeout', type=float, default=60)
 @click.option('--run-type', type=click.Choice(['dry', 'damp', 'wet']), default='dry',
-              help='Dry run prints the first URL and exists. Damp run fetches first URL and exists. Wet run fetches everything.')
+              help='Dry run prints the first URL and exists. Damp run fetches first URL and prints the rest. Wet run fetches everything.')
 @click.option('--sort', type=click.Choice(['ASC', 'DESC']), default='ASC')
-@click.argument('output_directory', type=click.Path())
-def games(api_base, page_size, max_pages, start_date, end_date, sleep_interval, run_type, sort, output_directory):
-    "Get JSON dumps of Game model objects from api.faforever.com"
+@click.argument('output_directory', type=click.Path(file_okay=False))
+def games(api_base, page_size, max_pages, start_date, end_date, rate, burst, sleep_interval, jobs, retries, backoff, timeout, run_type, sort, output_directory):
+    """Get JSON dumps of Game model objects from api.faforever.com
+
+    Progress is checkpointed in output_directory; rerunning the same query resumes at the first missing page."""
+    if sleep_interval is not None:
+        rate = 1 / sleep_interval
+        click.echo('--sleep-interval is deprecated; use --rate %g' % rate, err=True)
     first_url = build_url(api_base, page_size, max_pages, 1, start_date, end_date, sort)
     if run_type == 'dry':
         print(first_url)
         return
-    print('Fetching 1st page...')
-    first_response = requests.get(first_url).json()
-    if first_response['meta']['page']['totalRecords'] == 0:
-        print('(empty response)')
-        return
-    write_response(output_directory, 1, first_response)
-    total_pages = first_response['meta']['page']['totalPages']
+    session = make_session(jobs, retries, backoff)
+    bucket = TokenBucket(rate, burst)
+    checkpoint = Checkpoint(output_directory, str(first_url))
+    checkpoint.load()
+    if checkpoint.total_pages is None:
+        print('Fetching 1st page...')
+        first_response = fetch_page(session, bucket, first_url, timeout)
+        if first_response['meta']['page']['totalRecords'] == 0:
+            print('(empty response)')
+            return
+        write_response(output_directory, 1, first_response)
+        checkpoint.total_pages = first_response['meta']['page']['totalPages']
+        checkpoint.mark(1)
+    total_pages = checkpoint.total_pages
     will_fetch = total_pages if max_pages is None else min(total_pages, max_pages)
-    with click.progressbar(range(1, will_fetch+1), label='Fetching %d of %d pages' % (will_fetch, total_pages)) as bar:
-        bar.next() # account for first page already fetched
-        for page_number in bar:
-            if max_pages and page_number > max_pages:
-                break
-            time.sleep(sleep_interval)
-            url = build_url(api_base, page_size, max_pages, page_number, start_date, end_date, sort)
-            if run_type == 'damp':
-                print(url)
+    urls = {page_number: build_url(api_base, page_size, max_pages, page_number, start_date, end_date, sort)
+            for page_number in checkpoint.missing(will_fetch)}
+    if run_type == 'damp':
+        for url in urls.values():
+            print(url)
+        return
+    failed = []
+    label = 'Fetching %d of %d pages' % (len(urls), total_pages)
+    with ThreadPoolExecutor(jobs) as executor, click.progressbar(length=len(urls), label=label) as bar:
+        futures = {executor.submit(fetch_page, session, bucket, url, timeout): page_number for page_number, url in urls.items()}
+        for future in as_completed(futures):
+            page_number = futures[future]
+            bar.update(1)
+            try:
+                write_response(output_directory, page_number, future.result())
+            except requests.RequestException as error:
+                logging.error('fetching page %d raised %s:%s', page_number, error.__class__.__name__, error)
+                failed.append(page_number)
+                continue
+            checkpoint.mark(page_number)
+    if failed:
+        raise click.ClickException('failed fetching %d pages; rerun to resume' % len(failed))
+
+def known_replays(client):
+    "Yields (url, basename) of every replay known in the datastore"
+    if client.hlen(REPLAY_URLS) < client.hlen('load'):
+        logging.info('indexed %d replay URLs loaded before the index existed', index_replay_urls(client))
+    codec = get_codec()
+    for game_id, value in client.hscan_iter(REPLAY_URLS, count=SCAN_BATCH):
+        url = codec.decode(value)['url']
+        if url is None:
+            continue
+        url = urlobject.URLObject(url)
+        yield url, url.path.segments[-1]
+
+def list_directory(directory):
+    "Names in directory (or an empty set if it doesn't exist); one listing is far cheaper than a stat per file"
+    try:
+        return set(os.listdir(directory))
+    except FileNotFoundError:
+        return set()
+
+def failed_replays(client):
+    for url in client.hkeys(FAILURES):
+        url = urlobject.URLObject(url.decode())
+        yield url, url.path.segments[-1]
+
+def download(session, url, filename, timeout):
+    """Downloads url to filename through a .part file, resuming a partial download left by an
+    earlier attempt; filename appears only once complete. Returns the number of bytes received."""
+    part = filename + PART_SUFFIX
+    offset = path.getsize(part) if path.exists(part) else 0
+    headers = {'Range': 'bytes=%d-' % offset} if offset else {}
+    with session.get(str(url), headers=headers, stream=True, timeout=timeout) as response:
+        if offset and response.status_code == 416 and response.headers.get('Content-Range') == 'bytes */%d' % offset:
+            # an earlier attempt received everything, but didn't get to rename
+            os.replace(part, filename)
+            return 0
+        response.raise_for_status()
+        if response.status_code == 206 and not response.headers.get('Content-Range', '').startswith('bytes %d-' % offset):
+            raise requests.RequestException('unexpected Content-Range %r' % response.headers.get('Content-Range'))
+        received = 0
+        # the server may ignore Range and send everything
+        with open(part, 'ab' if response.status_code == 206 else 'wb') as handle:
+            for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                handle.write(chunk)
+                received += len(chunk)
+    os.replace(part, filename)
+    return received
+
+def record_failure(client, url, error):
+    previous = client.hget(FAILURES, url)
+    attempts = json.loads(previous)['attempts'] + 1 if previous else 1
+    client.hset(FAILURES, url, json.dumps({'error': '%s:%s' % (error.__class__.__name__, error), 'attempts': attempts}))
+
+@fetch.command()
+@click.option('--jobs', type=click.IntRange(1), default=8, help='Number of concurrent downloads')
+@click.option('--retries', type=int, default=5)
+@click.option('--backoff', type=float, default=1, help='Retry backoff factor in seconds (unless the server sends Retry-After)')
+@click.option('--timeout', type=float, default=60)
+@click.option('--only-failed', is_flag=True, help='Only retry downloads which failed before')
+@click.argument('output_directory', type=click.Path(exists=True, file_okay=False))
+def replays(jobs, retries, backoff, timeout, only_failed, output_directory):
+    """Download replays known in the datastore but not in output_directory
+
+    Failed downloads are recorded in the datastore and their partial downloads kept, so rerunning resumes them."""
+    client = get_client()
+    candidates = failed_replays(client) if only_failed else known_replays(client)
+    existing = list_directory(output_directory)
+    missing = {str(url): path.join(output_directory, basename) for url, basename in candidates if basename not in existing}
+    session = make_session(jobs, retries, backoff)
+    received, failed = 0, 0
+    with ThreadPoolExecutor(jobs) as executor, click.progressbar(length=len(missing), label='Downloading %d replays' % len(missing)) as bar:
+        futures = {executor.submit(download, session, url, filename, timeout): url for url, filename in missing.items()}
+        for future in as_completed(futures):
+            url = futures[future]
+            bar.update(1)
+            try:
+                received += future.result()
+            except requests.RequestException as error:
+                logging.error('downloading %s raised %s:%s', url, error.__class__.__name__, error)
+                record_failure(client, url, error)
+                failed += 1
                 continue
-            write_response(output_directory, page_number, requests.get(url).json())
+            client.hdel(FAILURES, url)
+    click.echo('downloaded %d replays (%.1fMB), %d failed' % (len(missing) - failed, received / 2**20, failed), err=True)
+    if failed:
+        raise click.ClickException('failed downloading %d replays; rerun to resume' % failed)
 
 @fetch.command()
 @click.option('--symlink-directory', type=click.Path())
@@ -82,15 +263,13 @@ def games(api_base, page_size, max_pages, start_date, end_date, sleep_interval,
 def replay_urls(symlink_directory, output_directory):
     "Print list of replay URLs known in the datastore but not in output_directory"
     client = get_client()
-    for game_id, json_blob in client.hgetall('load').items():
-        obj = json.loads(json_blob)
-        url = urlobject.URLObject(obj['replayUrl'])
-        basename = url.path.segments[-1]
+    existing = list_directory(output_directory)
+    symlinks = list_directory(symlink_directory) if symlink_directory else set()
+    for url, basename in known_replays(client):
         output_path = path.join(output_directory, basename)
-        if not path.exists(output_path):
+        if basename not in existing:
             print(url)
         if not symlink_directory:
             continue
-        symlink_path = path.join(symlink_directory, basename)
-        if not path.exists(symlink_path):
-            os.symlink(output_path, symlink_path)
+        if basename not in symlinks:
+            os.symlink(output_path, path.join(symlink_directory, basename))
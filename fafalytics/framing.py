@@ -0,0 +1,72 @@
+"""Cheap scans of decompressed replay data, without the replay parser.
+
+The binary header can be skipped without decoding it, as its variable length
+sections are length-prefixed. The body is a stream of commands, each a type
+byte and a little-endian uint16 size (which includes these 3 bytes) followed by
+the command's payload; Advance commands carry the number of ticks to advance.
+"""
+import struct
+
+ADVANCE = 0
+TICK_MILLISECONDS = 100
+UINT32 = struct.Struct('<I')
+COMMAND = struct.Struct('<BH')
+
+class Reader:
+    def __init__(self, data, offset=0):
+        self.data = data
+        self.offset = offset
+    def skip(self, size):
+        self.offset += size
+    def byte(self):
+        self.offset += 1
+        return self.data[self.offset-1]
+    def uint32(self):
+        value, = UINT32.unpack_from(self.data, self.offset)
+        self.offset += UINT32.size
+        return value
+    def string(self):
+        end = self.data.index(b'\0', self.offset)
+        value = bytes(self.data[self.offset:end])
+        self.offset = end + 1
+        return value
+
+def body_offset(data):
+    "Offset of the first command in decompressed replay data; raises ValueError if data ends before that"
+    try:
+        return skip_header(Reader(data))
+    except (IndexError, struct.error) as error:
+        raise ValueError('replay header is truncated') from error
+
+def skip_header(reader):
+    for _ in range(4): # game version, replay version and map name, and separators
+        reader.string()
+    reader.skip(reader.uint32()) # mods
+    reader.skip(reader.uint32()) # scenario
+    for _ in range(reader.byte()): # command sources
+        reader.string()
+        reader.uint32()
+    reader.skip(1) # cheats enabled
+    for _ in range(reader.byte()): # armies
+        reader.skip(reader.uint32())
+        if reader.byte() != 255: # the army's command source
+            reader.skip(1)
+    reader.uint32() # random seed
+    return reader.offset
+
+def scan_body(data, offset, horizon_ticks=None):
+    """Returns (end, ticks); end is where the body should be cut to keep only
+    commands issued up to horizon_ticks, ticks is the replay's total tick count."""
+    end = None
+    ticks = 0
+    length = len(data)
+    while offset < length:
+        command_type, size = COMMAND.unpack_from(data, offset)
+        if size < COMMAND.size:
+            raise ValueError('corrupt command at offset %d' % offset)
+        if command_type == ADVANCE:
+            ticks += UINT32.unpack_from(data, offset + COMMAND.size)[0]
+            if end is None and horizon_ticks is not None and ticks > horizon_ticks:
+                end = offset
+        offset += size
+    return (length if end is None else end), ticks
@@ -1,11 +1,17 @@
+import functools
 import json
 
-import zstd
+import zstandard
 import click
 
-from .storage import get_client
-from .manyfiles import yields_outputs
+from .storage import get_client, get_codec
+from .manyfiles import file_processor, yield_processed_files, yields_outputs, Redirect
 from .logs import log_invocation
+from .pyutils import chunked
+
+# secondary index of game ids to replay URLs, so listing them doesn't decode every game
+REPLAY_URLS = 'replay-urls'
+SCAN_BATCH = 1000
 
 class GameJsonResolver:
     inline_relationships = (
@@ -27,10 +33,9 @@ class GameJsonResolver:
             raise ValueError('expected game models from api.faforever.com/data/game')
     @classmethod
     def from_handle(cls, handle):
-        buf = handle.read()
         if handle.name.endswith('.zst'):
-            buf = zstd.decompress(buf)
-        instance = cls(json.loads(buf))
+            handle = zstandard.ZstdDecompressor().stream_reader(handle)
+        instance = cls(json.load(handle))
         instance.populate()
         return instance
     def populate(self):
@@ -74,18 +79,42 @@ def permit_game(game, only_valid=True, only_1v1=True, featured_mod=6):
         return False
     return True
 
+def replay_url_entry(game):
+    # games without a replay are indexed too (with no url), so the index stays as long as 'load'
+    return {'id': game['id'], 'url': game.get('replayUrl')}
+
+def index_replay_urls(client):
+    "Adds games loaded before the replay URL index existed to it; returns how many were added"
+    added = 0
+    codec = get_codec()
+    pipeline = client.pipeline(transaction=False)
+    for chunk in chunked(client.hscan_iter('load', count=SCAN_BATCH), SCAN_BATCH):
+        for game_id, value in chunk:
+            pipeline.hsetnx(REPLAY_URLS, game_id, codec.encode(replay_url_entry(codec.decode(value))))
+        added += sum(pipeline.execute())
+    return added
+
+def load_file(filename, only_valid=True, only_1v1=True, featured_mod=6):
+    "Returns the permitted games of a dump file, resolved"
+    with open(filename, 'rb') as handle:
+        resolver = GameJsonResolver.from_handle(handle)
+    return [game for game in resolver if permit_game(game, only_valid, only_1v1, featured_mod)]
+
 @click.command()
 @log_invocation
 @click.option('--only-valid/--all-games', default=True)
 @click.option('--only-1v1/--any-number-of-players', default=True)
 @click.option('--featured-mod', type=int, default=6)
-@click.argument('jsons', nargs=-1, type=click.File('rb'))
+@file_processor
 @yields_outputs
-def load(output, only_valid, only_1v1, featured_mod, jsons):
+def load(output, only_valid, only_1v1, featured_mod, max_errors, jobs, infiles):
     "Load Game model JSONs into datastore"
-    with click.progressbar(jsons, label='Loading') as bar:
-        for json in bar:
-            for game in GameJsonResolver.from_handle(json):
-                if not permit_game(game, only_valid, only_1v1, featured_mod):
-                    continue
+    callback = functools.partial(load_file, only_valid=only_valid, only_1v1=only_1v1, featured_mod=featured_mod)
+    # a malformed dump fails the load, unless --max-errors allows skipping it
+    max_errors = 0 if max_errors is None else max_errors
+    with click.progressbar(infiles, label='Loading') as bar:
+        for games in yield_processed_files(bar, callback, max_errors, jobs=jobs):
+            for game in games:
                 yield game
+                if output == 'datastore':
+                    yield Redirect(REPLAY_URLS, replay_url_entry(game))
@@ -7,9 +7,12 @@ import os
 import contextlib
 
 import redis
-from .storage import get_client
+from .storage import get_client, shard_clients
+from .sharding import last_stream_id
 
 LOG_STREAM_KEY = b'log'
+# with several shards, tail waits this long (ms) on each in turn
+TAIL_BLOCK = 100
 
 def log_invocation(func):
     @functools.wraps(func)
@@ -87,7 +90,7 @@ def log():
     "Datastore based logging"
 
 def get_messages(client, identifier=0, block=None):
-    response = get_client().xread({LOG_STREAM_KEY: identifier}, block=block)
+    response = client.xread({LOG_STREAM_KEY: identifier}, block=block)
     if not response:
         return
     stream, messages = response[0]
@@ -110,15 +113,17 @@ def view():
 @log.command()
 def tail():
     "Print log lines as they are emitted"
-    client = get_client()
+    # each process logs to one shard; follow each shard's stream from its own last entry
+    clients = shard_clients()
     start = time.time()
-    identifier = "$"
+    identifiers = ["$"] if len(clients) == 1 else [last_stream_id(client, LOG_STREAM_KEY) for client in clients]
+    block = 0 if len(clients) == 1 else TAIL_BLOCK
     with contextlib.suppress(KeyboardInterrupt):
         while True:
-            messages = get_messages(client, identifier, block=0)
-            for identifier, obj in messages:
-                formatted, color = format_log_message(obj, relative_time=start)
-                click.secho(formatted, fg=color)
+            for shard, client in enumerate(clients):
+                for identifiers[shard], obj in get_messages(client, identifiers[shard], block=block) or ():
+                    formatted, color = format_log_message(obj, relative_time=start)
+                    click.secho(formatted, fg=color)
 
 @log.command()
 def flush():
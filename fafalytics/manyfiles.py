@@ -1,57 +1,123 @@
 "Utilities related to processing many files given as CLI arguments."
+import collections
 import logging
 import functools
-import json
+import multiprocessing
+import typing
 
 import click
-import pandas as pd
 
-from .storage import get_client
+from .storage import get_client, get_codec
 from .pyutils import Timer
 
+# how many files per worker may be queued ahead of the oldest unfinished one;
+# results are yielded in order, so a slow file at the head of the queue stalls
+# idle workers once this backlog is used up
+POOL_BACKLOG = 4
+
 def file_processor(func):
     return (
         click.option('--max-errors', type=int)(
-            click.argument('infiles', nargs=-1, type=click.Path(exists=True, dir_okay=False))(func)
+            click.option('--jobs', type=click.IntRange(1), default=1, help='Number of worker processes')(
+                click.argument('infiles', nargs=-1, type=click.Path(exists=True, dir_okay=False))(func)
+            )
         )
     )
 
-def yield_processed_files(infiles, callback, max_errors=None, catch=(Exception,)):
+def timed_call(callback, catch, infile):
+    "Returns (result, error, elapsed) rather than raising, so errors can cross process boundaries"
+    with Timer() as timer:
+        try:
+            return callback(infile), None, timer.elapsed
+        except catch as error:
+            return None, error, timer.elapsed
+
+def yield_outcomes(infiles, callback, catch=(Exception,), jobs=1):
+    "Yields (infile, (result, error, elapsed)) in input order, processing on a pool if jobs > 1"
+    call = functools.partial(timed_call, callback, catch)
+    if jobs == 1:
+        for infile in infiles:
+            logging.debug('processing %s', infile)
+            yield infile, call(infile)
+        return
+    # fork explicitly, so workers inherit the parent's imports, configuration and logging
+    with multiprocessing.get_context('fork').Pool(jobs) as pool:
+        pending = collections.deque()
+        for infile in infiles:
+            logging.debug('queueing %s', infile)
+            pending.append((infile, pool.apply_async(call, (infile,))))
+            if len(pending) >= jobs * POOL_BACKLOG:
+                infile, outcome = pending.popleft()
+                yield infile, outcome.get()
+        while pending:
+            infile, outcome = pending.popleft()
+            yield infile, outcome.get()
+
+def yield_processed_files(infiles, callback, max_errors=None, catch=(Exception,), jobs=1):
     if max_errors is None:
         max_errors = float('inf')
     durations = []
-    for infile in infiles:
-        try:
-            logging.debug('processing %s', infile)
-            with Timer() as timer:
-                yield callback(infile)
-            durations.append(timer.elapsed)
-            logging.debug('processed %s in %.2f seconds', infile, timer.elapsed)
-        except catch as error:
-            if max_errors == 0:
-                raise
-            max_errors -= 1
-            logging.error('processing %s raised %s:%s', infile, error.__class__.__name__, error)
+    for infile, (result, error, elapsed) in yield_outcomes(infiles, callback, catch, jobs):
+        if error is None:
+            durations.append(elapsed)
+            logging.debug('processed %s in %.2f seconds', infile, elapsed)
+            yield result
+            continue
+        if max_errors == 0:
+            raise error
+        max_errors -= 1
+        logging.error('processing %s raised %s:%s', infile, error.__class__.__name__, error)
+    import pandas as pd # slow to import and only needed for this summary
     stats = dict(pd.Series(durations, dtype='float64').describe())
     stats['sum'] = sum(durations)
     logging.info('processed: %s', ','.join('%s=%.1f' % (k,v) for k,v in stats.items()))
 
-def process_all_files(infiles, callback, max_errors=None, catch=(Exception,)):
-    return tuple(yield_processed_files(infiles, callback, max_errors, catch))
+def process_all_files(infiles, callback, max_errors=None, catch=(Exception,), jobs=1):
+    return tuple(yield_processed_files(infiles, callback, max_errors, catch, jobs))
 
 def yields_outputs(func):
     @click.option('--output', type=click.Choice(tuple(OUTPUT_CALLBACKS)), default='datastore')
+    @click.option('--batch-size', type=int, default=100, help='Number of objects sent to the output at once')
     @functools.wraps(func)
-    def wrapper(output, *args, **kwargs):
-        for obj in func(output, *args, **kwargs):
-            OUTPUT_CALLBACKS[output](func.__name__, obj)
+    def wrapper(output, batch_size, *args, **kwargs):
+        callback = OUTPUT_CALLBACKS[output]
+        stats = collections.defaultdict(collections.Counter)
+        batches = collections.defaultdict(list)
+        def flush(prefix):
+            stats[prefix].update(callback(prefix, batches.pop(prefix)) or {})
+        try:
+            for obj in func(output, *args, **kwargs):
+                prefix, obj = obj if isinstance(obj, Redirect) else (func.__name__, obj)
+                batches[prefix].append(obj)
+                if len(batches[prefix]) >= batch_size:
+                    flush(prefix)
+        finally:
+            for prefix in tuple(batches):
+                flush(prefix)
+            for prefix, counts in stats.items():
+                if not counts:
+                    continue
+                summary = ', '.join('%d %s' % (count, key) for key, count in counts.items())
+                logging.info('%s output: %s', prefix, summary)
+                click.echo('%s: %s' % (prefix, summary), err=True)
     return wrapper
 
-OUTPUT_CALLBACKS = {'print': print}
+class Redirect(typing.NamedTuple):
+    "Yielded by a yields_outputs function to output obj under prefix, rather than under the function's name"
+    prefix: str
+    obj: dict
+
+# output callbacks get a prefix and a batch of objects, and may return a dict of counts to report
+OUTPUT_CALLBACKS = {'print': lambda prefix, objs: print(*objs, sep='\n')}
 def output(func):
     OUTPUT_CALLBACKS[func.__name__] = func
     return func
 
 @output
-def datastore(prefix, obj):
-    get_client().hsetnx(prefix, obj['id'], json.dumps(obj))
+def datastore(prefix, objs):
+    pipeline = get_client().pipeline(transaction=False)
+    codec = get_codec()
+    for obj in objs:
+        pipeline.hsetnx(prefix, obj['id'], codec.encode(obj))
+    written = sum(pipeline.execute())
+    return {'new': written, 'existing': len(objs) - written}
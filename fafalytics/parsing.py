@@ -1,20 +1,25 @@
 from os import path
 import base64
+import binascii
 import functools
 import json
 import logging
 import pickle
+import threading
 import zlib
 
 from typing import Iterable
 
 import click
+import numpy
 import replay_parser.replay
 import replay_parser.constants
+import zstandard
 import zstd
 
 from .pyutils import Timer
 from .manyfiles import file_processor, process_all_files
+from . import framing, unpacked
 
 ALL_COMMANDS = tuple(range(24))
 
@@ -24,6 +29,35 @@ ISSUE_TYPE_ID_TO_NAME = {
 }
 ISSUE_TYPE_ID_TO_NAME[-1] = 'OTHER' # special value used when aggregating several command types
 
+# opcodes of the replay command stream (the engine's ECmdStreamOp enum), named
+# the way the parser names them in each command's 'type'
+COMMAND_TYPES = (
+    'advance', 'set_command_source', 'command_source_terminated', 'verify_checksum',
+    'request_pause', 'resume', 'single_step', 'create_unit', 'create_prop',
+    'destroy_entity', 'warp_entity', 'process_info_pair', 'issue', 'factory_issue',
+    'command_count_increase', 'command_count_decrease', 'set_command_target',
+    'set_command_type', 'set_command_cells', 'remove_from_queue', 'debug_command',
+    'execute_lua_in_sim', 'lua_sim_callback', 'end_game',
+)
+COMMAND_TYPE_IDS = {name: identifier for identifier, name in enumerate(COMMAND_TYPES)}
+# always parsed: ticks, the issuing player and desync detection depend on them
+BASE_COMMANDS = frozenset(('advance', 'set_command_source', 'verify_checksum'))
+UNKNOWN_COMMAND_TYPE = 255
+UNIT_COMMAND_TYPES = frozenset(('issue', 'factory_issue'))
+
+# a columnar alternative to the list of dicts returned by get_command_timeseries;
+# fields that don't apply to a command are -1, '' or NaN
+COMMAND_DTYPE = numpy.dtype([
+    ('offset_ms', 'i8'),
+    ('player', 'i1'),
+    ('type', 'u1'),          # index into COMMAND_TYPES
+    ('command_type', 'i2'),  # ActionType of issue/factory_issue commands
+    ('blueprint_id', 'S16'),
+    ('x', 'f4'),
+    ('z', 'f4'),
+    ('units', 'i4'),         # number of units the command was issued to
+])
+
 # See Zulip discussion on the faction order, mapping factions isn't trivial:
 #  https://faforever.zulipchat.com/#narrow/stream/203478-general/topic/Faction.20Order/near/235006069
 # I went with Sheikah's approach:
@@ -42,69 +76,259 @@ def extract_v1(buf):
 def extract_v2(buf):
     return zstd.decompress(buf)
 
-def read_header_and_body(filename: str, store_body: bool=True, parse_commands: Iterable=ALL_COMMANDS):
+def parse_command_ids(names):
+    "The parse_commands argument that makes the parser handle only the given command types (and BASE_COMMANDS)"
+    return tuple(sorted(COMMAND_TYPE_IDS[name] for name in BASE_COMMANDS | frozenset(names)))
+
+HEADER_CHUNK_SIZE = 16 * 1024
+BODY_CHUNK_SIZE = 64 * 1024
+
+def iter_base64_decoded(handle, chunk_size):
+    "Like base64.decodebytes(handle.read()), but in chunks"
+    pending = b''
+    while raw := handle.read(chunk_size):
+        raw = pending + raw.translate(None, b' \t\r\n')
+        usable = len(raw) - len(raw) % 4
+        pending = raw[usable:]
+        yield binascii.a2b_base64(raw[:usable])
+    if pending:
+        yield binascii.a2b_base64(pending)
+
+def iter_decompressed(handle, version, chunk_size=HEADER_CHUNK_SIZE):
+    "Yields a replay's decompressed binary data in chunks, given a handle positioned after its JSON header"
+    if version == 1:
+        decompressor = zlib.decompressobj()
+        skip = 4 # bytes of zlib stream length
+        for buf in iter_base64_decoded(handle, chunk_size):
+            buf, skip = buf[skip:], max(0, skip - len(buf))
+            while buf:
+                yield decompressor.decompress(buf, chunk_size)
+                buf = decompressor.unconsumed_tail
+        yield decompressor.flush()
+    elif version == 2:
+        reader = zstandard.ZstdDecompressor().stream_reader(handle)
+        while chunk := reader.read(chunk_size):
+            yield chunk
+    else:
+        raise ValueError("unknown version %s" % version)
+
+def decompressed_size(handle, version):
+    "A replay's decompressed size as recorded in its compressed data (or -1), given a buffered handle positioned after its JSON header"
+    head = handle.peek(18)
+    if version == 1:
+        return int.from_bytes(binascii.a2b_base64(head[:8])[:4], 'big')
+    try:
+        return zstandard.frame_content_size(head[:18])
+    except zstandard.ZstdError:
+        return -1
+
+buffers = threading.local()
+EMPTY_BYTEARRAY_SIZE = bytearray().__sizeof__()
+# the recorded size comes from the file, so a corrupt one mustn't allocate more than this up front
+MAX_SIZE_HINT = 256 * 1024 * 1024
+
+def decompress(handle, version):
+    """Returns a replay's decompressed binary data, given a buffered handle positioned after its JSON header.
+
+    The result is only valid until the next call in the same thread: it's a
+    bytearray reused (and overwritten) by that call, so copy it to keep it.
+    It's trimmed to fit, which keeps its allocation unless it's more than halved.
+    It's allocated for the size recorded in the compressed data (up to
+    MAX_SIZE_HINT), and grows if the data turns out to be larger."""
+    size = min(decompressed_size(handle, version), MAX_SIZE_HINT)
+    buffer = getattr(buffers, 'buffer', None)
+    if buffer is None or buffer.__sizeof__() - EMPTY_BYTEARRAY_SIZE < size:
+        # a new buffer of the right size, rather than growing the old one, avoids realloc copies
+        buffers.buffer = buffer = None
+        buffer = buffers.buffer = bytearray(max(size, 0))
+    length = 0
+    for chunk in iter_decompressed(handle, version, BODY_CHUNK_SIZE):
+        buffer[length:length+len(chunk)] = chunk
+        length += len(chunk)
+    del buffer[length:]
+    return buffer
+
+def read_headers(filename: str):
+    "Returns a replay's JSON and binary headers, decompressing and parsing no more than needed for them"
     with open(filename, 'rb') as handle:
         header = json.loads(handle.readline().decode())
-        buf = handle.read()
-        version = header.get('version', 1)
-        if version == 1:
-            extracted = extract_v1(buf)
-        elif version == 2:
-            extracted = extract_v2(buf)
+        data = bytearray()
+        for chunk in iter_decompressed(handle, header.get('version', 1)):
+            data += chunk
+            try:
+                offset = framing.body_offset(data)
+                break
+            except ValueError:
+                continue
         else:
-            raise ValueError("unknown version %s" % version)
+            offset = framing.body_offset(data)
+    # the parser is handed the binary header alone, so it has no commands to parse
+    binary = replay_parser.replay.parse(bytes(data[:offset]), store_body=False)['header']
+    return header, binary
+
+def read_header_and_body(filename: str, store_body: bool=True, parse_commands: Iterable=ALL_COMMANDS, horizon_ms: int=None):
+    with open(filename, 'rb') as handle:
+        header = json.loads(handle.readline().decode())
+        extracted = decompress(handle, header.get('version', 1))
+    if horizon_ms is not None:
+        # only parse commands up to the horizon, but still count all ticks
+        end, last_tick = framing.scan_body(extracted, framing.body_offset(extracted), horizon_ms // framing.TICK_MILLISECONDS)
+        extracted = extracted[:end]
     with Timer() as timer:
         body = replay_parser.replay.parse(extracted, store_body=store_body, parse_commands=parse_commands)
         logging.debug('parsed in %.2f seconds', timer.elapsed)
+    if horizon_ms is not None:
+        body['last_tick'] = last_tick
     return header, body
 
-def get_command_timeseries(body):
-    "Given an iterable of raw replay commands, return higher level timestamped stream."
-    TICK_MILLISECONDS = 100
+def yield_timed_commands(body):
+    "Given an iterable of raw replay commands, yield (offset_ms, player, args) for each meaningful command."
     offset_ms = 0
-    result = []
     for atom in body:
         for player, commands in atom.items():
             for command, args in commands.items():
                 if command == 'Advance':
-                    offset_ms += TICK_MILLISECONDS * int(args['advance'])
+                    offset_ms += framing.TICK_MILLISECONDS * int(args['advance'])
                     continue
                 if command in ('VerifyChecksum', 'SetCommandSource'):
                     continue
-                assert 'offset_ms' not in args
-                assert 'player' not in args
-                args['offset_ms'] = offset_ms
-                args['player'] = player
-                result.append(args)
+                yield offset_ms, player, args
+
+def get_command_timeseries(body):
+    "Given an iterable of raw replay commands, return higher level timestamped stream."
+    result = []
+    for offset_ms, player, args in yield_timed_commands(body):
+        assert 'offset_ms' not in args
+        assert 'player' not in args
+        args['offset_ms'] = offset_ms
+        args['player'] = player
+        result.append(args)
     return result
 
-def get_parsed(filename):
-    with open(filename, 'rb') as handle:
-        raw = handle.read()
+def command_row(offset_ms, player, args):
+    cmd_data = args.get('cmd_data') or {}
+    position = (cmd_data.get('target') or {}).get('position') or (numpy.nan, None, numpy.nan)
+    entity_ids_set = args.get('entity_ids_set') or {}
+    return (offset_ms, player, COMMAND_TYPE_IDS.get(args['type'], UNKNOWN_COMMAND_TYPE),
+            cmd_data.get('command_type', -1), cmd_data.get('blueprint_id') or '',
+            position[0], position[2], entity_ids_set.get('units_number', -1))
+
+def get_command_columns(body, commands=None):
+    """Like get_command_timeseries, but returns a COMMAND_DTYPE array and leaves the parser's dicts alone.
+
+    If commands is given, only commands of those types are kept."""
+    timed = yield_timed_commands(body)
+    if commands is not None:
+        timed = (command for command in timed if command[2]['type'] in commands)
+    return numpy.array([command_row(*command) for command in timed], dtype=COMMAND_DTYPE)
+
+def commands_to_columns(commands):
+    "Converts the output of get_command_timeseries to a COMMAND_DTYPE array"
+    return numpy.array([command_row(c['offset_ms'], c['player'], c) for c in commands], dtype=COMMAND_DTYPE)
+
+def columns_to_commands(columns):
+    """Yields command dicts from a COMMAND_DTYPE array, for code that still consumes get_command_timeseries.
+
+    Only the fields kept in the columns are reconstructed."""
+    rows = zip(*(columns[name].tolist() for name in COMMAND_DTYPE.names))
+    for offset_ms, player, type_id, command_type, blueprint_id, x, z, units in rows:
+        command_name = COMMAND_TYPES[type_id] if type_id < len(COMMAND_TYPES) else 'unknown'
+        command = {'type': command_name, 'offset_ms': offset_ms, 'player': player}
+        if command_name in UNIT_COMMAND_TYPES:
+            position = None if numpy.isnan(x) else (x, None, z)
+            command['cmd_data'] = {'command_type': command_type, 'blueprint_id': blueprint_id.decode(),
+                                   'target': {'position': position}}
+        if units != -1:
+            command['entity_ids_set'] = {'units_number': units}
+        yield command
+
+def game_id(filename):
+    "A replay file's game id, from its name or JSON header, or None if it can't be found cheaply"
+    base = path.basename(filename).split('.')[0]
+    if base.isdigit():
+        return int(base)
+    try:
+        if filename.endswith(unpacked.EXTENSION):
+            return unpacked.read_header(filename)['json']['uid']
+        if not filename.endswith('pickle'):
+            with open(filename, 'rb') as handle:
+                return json.loads(handle.readline().decode())['uid']
+    except (ValueError, KeyError):
+        pass
+    return None
+
+def within_horizon(obj, horizon_ms):
+    "Drops commands issued after horizon_ms from an already parsed replay"
+    if 'commands' in obj:
+        obj['commands'] = [command for command in obj['commands'] if command['offset_ms'] <= horizon_ms]
+    else:
+        columns = obj['columns']
+        mask = columns['offset_ms'] <= horizon_ms
+        obj['columns'] = columns[mask] if hasattr(columns, 'dtype') else {name: column[mask] for name, column in columns.items()}
+    return obj
+
+def get_parsed(filename, columnar=False, commands=None, horizon_ms=None):
+    """Returns a parsed replay dict; commands are under 'columns' as a COMMAND_DTYPE
+    array (or, for unpacked files, a dict of its fields) if columnar is set, or under
+    'commands' as a list of dicts otherwise.
+
+    Replays can be parsed faster by passing commands, the names of the only command
+    types the caller needs; it's merely a hint, unpacked files aren't filtered.
+    Likewise, horizon_ms stops parsing commands issued after it (and drops them
+    from unpacked files); the header's last_tick still covers the whole replay."""
+    if filename.endswith(unpacked.EXTENSION):
+        obj = unpacked.read(filename)
+        if horizon_ms is not None:
+            within_horizon(obj, horizon_ms)
+        if not columnar:
+            obj['commands'] = list(columns_to_commands(obj.pop('columns')))
+        return obj
     if filename.endswith('pickle'):
-        return pickle.loads(zstd.decompress(raw))
-    header, body = read_header_and_body(filename)
-    return {
+        with open(filename, 'rb') as handle:
+            obj = pickle.loads(zstd.decompress(handle.read()))
+        if horizon_ms is not None:
+            within_horizon(obj, horizon_ms)
+        if columnar and 'commands' in obj:
+            obj['columns'] = commands_to_columns(obj.pop('commands'))
+        elif not columnar and 'columns' in obj:
+            obj['commands'] = list(columns_to_commands(obj.pop('columns')))
+        return obj
+    parse_commands = ALL_COMMANDS if commands is None else parse_command_ids(commands)
+    header, body = read_header_and_body(filename, parse_commands=parse_commands, horizon_ms=horizon_ms)
+    obj = {
         'json': header,
         'binary': body.pop('header'),
-        'commands': get_command_timeseries(body.pop('body')),
-        'remaining': body,
     }
+    if columnar:
+        obj['columns'] = get_command_columns(body.pop('body'), commands)
+    else:
+        obj['commands'] = get_command_timeseries(body.pop('body'))
+    obj['remaining'] = body
+    return obj
+
+def write_pickle(filename, replay):
+    with open(filename, 'wb') as handle:
+        handle.write(zstd.compress(pickle.dumps(get_parsed(replay))))
+
+def write_unpacked(filename, replay):
+    unpacked.write(filename, get_parsed(replay, columnar=True))
+
+UNPACK_FORMATS = {
+    'unpacked': (unpacked.EXTENSION, write_unpacked),
+    'pickle': ('.pickle', write_pickle),
+}
 
-def unpack_replay(outdir, replay):
-    json_header, body = read_header_and_body(replay)
-    binary_header = body.pop('header')
-    commands = get_command_timeseries(body.pop('body'))
-    blob = pickle.dumps({'json': json_header, 'binary': binary_header, 'remaining': body, 'commands': commands})
-    compressed = zstd.compress(blob)
+def unpack_replay(outdir, replay, format='unpacked'):
+    extension, writer = UNPACK_FORMATS[format]
     base, ext = path.splitext(path.basename(replay))
-    with open(path.join(outdir, base+'.pickle'), 'wb') as handle:
-        handle.write(compressed)
+    writer(path.join(outdir, base+extension), replay)
 
 @click.command()
 @click.option('--outdir', type=click.Path(exists=True, dir_okay=True, file_okay=False), default='.')
+@click.option('--format', type=click.Choice(tuple(UNPACK_FORMATS)), default='unpacked',
+              help='unpacked files are memory-mapped when read; pickle is the older, slower format')
 @file_processor
-def unpack(outdir, max_errors, infiles):
+def unpack(outdir, format, max_errors, jobs, infiles):
     "Unpack and pre-parse replay files, making them much faster to read on subsequent reads."
     with click.progressbar(infiles, label='Unpacking') as bar:
-        process_all_files(bar, functools.partial(unpack_replay, outdir), max_errors)
+        process_all_files(bar, functools.partial(unpack_replay, outdir, format=format), max_errors, jobs=jobs)
@@ -1,6 +1,11 @@
 import time
 import click
 import contextlib
+import functools
+import importlib
+import itertools
+import re
+import threading
 from typing import Callable, Iterable
 
 def wait(iterations: int, interval: float, error: Exception=TimeoutError(), predicate: Callable[[], bool]=lambda: False) -> Iterable[int]:
@@ -22,6 +27,23 @@ def negate(f: Callable[[], bool]) -> bool:
 def first(iterable):
     return next(iter(iterable))
 
+def locked_cache(func):
+    "functools.cache, called under a lock so that concurrent first calls compute the value once"
+    cached = functools.cache(func)
+    lock = threading.Lock()
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with lock:
+            return cached(*args, **kwargs)
+    wrapper.cache_clear = cached.cache_clear
+    return wrapper
+
+def chunked(iterable, size):
+    "Yields lists of up to size consecutive items from iterable"
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
 class Timer:
     def __init__(self):
         self.start = None
@@ -41,6 +63,29 @@ class Timer:
         end = self.end or time.time()
         return end-self.start
 
+class TokenBucket:
+    "Allows rate acquisitions per second on average, in bursts of up to capacity; thread safe"
+    def __init__(self, rate, capacity=1, clock=time.monotonic, sleep=time.sleep):
+        if rate <= 0:
+            raise ValueError('rate must be positive, not %r' % rate)
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+    def acquire(self):
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # tokens can go negative; that's a reservation for a token not yet refilled
+            self.tokens -= 1
+            delay = -self.tokens / self.rate
+        if delay > 0:
+            self.sleep(delay)
+
 class EchoTimer(Timer):
     def __init__(self, message):
         super().__init__()
@@ -104,3 +149,28 @@ def shell(ns={}):
     except ImportError:
         import code
         code.interact(local=ns)
+
+class LazyGroup(click.Group):
+    "A click.Group importing its lazy_commands ({name: 'module:attribute'}) only when they're used"
+    def __init__(self, *args, lazy_commands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = dict(lazy_commands or {})
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_commands))
+    def get_command(self, ctx, name):
+        if name in self.lazy_commands and name not in self.commands:
+            module, attribute = self.lazy_commands[name].split(':')
+            self.add_command(getattr(importlib.import_module(module), attribute), name)
+        return super().get_command(ctx, name)
+
+class Duration(click.ParamType):
+    "A duration like 500ms, 90s, 10m or 1.5h, converted to milliseconds"
+    name = 'duration'
+    UNITS = {'ms': 1, 's': 1000, 'm': 60*1000, 'h': 60*60*1000}
+    def convert(self, value, param, ctx):
+        if isinstance(value, int):
+            return value
+        match = re.fullmatch(r'(\d+(?:\.\d+)?)(ms|s|m|h)', value.strip())
+        if not match:
+            self.fail('%r is not a duration like 90s, 10m or 1h' % value, param, ctx)
+        return int(float(match.group(1)) * self.UNITS[match.group(2)])
@@ -0,0 +1,176 @@
+"""A datastore sharded across several redis instances.
+
+Hash fields (e.g., game ids) are routed to shards by consistent hashing, so
+each game's values in every hash are on the same shard; commands on whole
+hashes (HKEYS, HLEN, HGETALL, HSCAN) fan out to every shard and merge the
+results. Each process appends to the streams (the log) of one shard, picked by
+its pid; reads merge every shard's entries in the order of their ids.
+"""
+import bisect
+import collections
+import functools
+import itertools
+import os
+import time
+import zlib
+
+from .sqlitestore import encode
+
+# points per shard on the ring; more points spread keys more evenly
+REPLICAS = 64
+# how often a blocking stream read polls the shards
+BLOCK_INTERVAL = 0.05
+COMMANDS = frozenset(('hsetnx', 'hget', 'hexists', 'hset', 'hdel', 'hmget', 'hlen', 'hkeys', 'hgetall', 'delete', 'ping', 'xadd', 'xread'))
+
+class HashRing:
+    def __init__(self, nodes, replicas=REPLICAS):
+        points = sorted((zlib.crc32(b'%d:%d' % (node, replica)), node) for node in range(nodes) for replica in range(replicas))
+        self.hashes = [point for point, node in points]
+        self.nodes = [node for point, node in points]
+    def node(self, key):
+        index = bisect.bisect(self.hashes, zlib.crc32(encode(key))) % len(self.hashes)
+        return self.nodes[index]
+
+def first(results):
+    return results[0]
+
+def merge_lists(results):
+    return list(itertools.chain.from_iterable(results))
+
+def merge_dicts(results):
+    merged = {}
+    for result in results:
+        merged.update(result)
+    return merged
+
+def stream_order(message):
+    identifier, fields = message
+    return tuple(int(part) for part in identifier.split(b'-'))
+
+def merge_streams(results, count=None):
+    "Merges XREAD responses; stream ids start with the millisecond they were added, on the same clock for all shards"
+    merged = collections.defaultdict(list)
+    for result in results:
+        for name, messages in result or ():
+            merged[name].extend(messages)
+    return [[name, sorted(messages, key=stream_order)[:count]] for name, messages in merged.items()]
+
+def last_stream_id(client, name):
+    messages = client.xrevrange(name, count=1)
+    return messages[0][0] if messages else b'0-0'
+
+class ShardedClient:
+    """Routes the redis-py commands this package uses to shards; each command is
+    planned as (shard, method, args, kwargs) calls plus a function merging their results"""
+    def __init__(self, clients):
+        self.clients = clients
+        self.ring = HashRing(len(clients))
+    def shard(self, key):
+        return self.ring.node(key)
+    def group(self, keys):
+        "Returns {shard: [(position, key), ...]}"
+        groups = collections.defaultdict(list)
+        for position, key in enumerate(keys):
+            groups[self.shard(key)].append((position, key))
+        return groups
+    def everywhere(self, method, *args, merge=sum):
+        return [(shard, method, args, {}) for shard in range(len(self.clients))], merge
+    def plan_routed(self, method, name, key, *args):
+        return [(self.shard(key), method, (name, key) + args, {})], first
+    def plan_hset(self, name, key=None, value=None, mapping=None):
+        items = dict(mapping or {})
+        if key is not None:
+            items[key] = value
+        groups = collections.defaultdict(dict)
+        for key, value in items.items():
+            groups[self.shard(key)][key] = value
+        return [(shard, 'hset', (name,), {'mapping': mapping}) for shard, mapping in groups.items()], sum
+    def plan_hdel(self, name, *keys):
+        groups = self.group(keys)
+        return [(shard, 'hdel', (name,) + tuple(key for position, key in keyed), {}) for shard, keyed in groups.items()], sum
+    def plan_hmget(self, name, keys, *args):
+        keys = (list(keys) if isinstance(keys, (list, tuple)) else [keys]) + list(args)
+        groups = self.group(keys)
+        def merge(results):
+            values = [None] * len(keys)
+            for keyed, result in zip(groups.values(), results):
+                for (position, key), value in zip(keyed, result):
+                    values[position] = value
+            return values
+        return [(shard, 'hmget', (name, [key for position, key in keyed]), {}) for shard, keyed in groups.items()], merge
+    def plan_delete(self, *names):
+        shards = len(self.clients)
+        def merge(results):
+            # a name counts once, however many shards it was on
+            return sum(any(results[index:index+shards]) for index in range(0, len(results), shards))
+        return [(shard, 'delete', (name,), {}) for name in names for shard in range(shards)], merge
+    def plan(self, method, *args, **kwargs):
+        if method in ('hsetnx', 'hget', 'hexists'):
+            return self.plan_routed(method, *args)
+        if method in ('hset', 'hdel', 'hmget', 'delete'):
+            return getattr(self, 'plan_' + method)(*args, **kwargs)
+        if method == 'hlen':
+            return self.everywhere(method, *args)
+        if method == 'hkeys':
+            return self.everywhere(method, *args, merge=merge_lists)
+        if method == 'hgetall':
+            return self.everywhere(method, *args, merge=merge_dicts)
+        if method == 'ping':
+            return self.everywhere(method, merge=all)
+        if method == 'xadd':
+            return [(self.shard(os.getpid()), method, args, kwargs)], first
+        if method == 'xread':
+            calls = [(shard, method, args, kwargs) for shard in range(len(self.clients))]
+            return calls, functools.partial(merge_streams, count=kwargs.get('count'))
+        raise AssertionError(method)
+    def run(self, calls, merge):
+        return merge([getattr(self.clients[shard], method)(*args, **kwargs) for shard, method, args, kwargs in calls])
+    def __getattr__(self, method):
+        if method not in COMMANDS:
+            raise AttributeError('%s is not supported on a sharded datastore' % method)
+        return lambda *args, **kwargs: self.run(*self.plan(method, *args, **kwargs))
+    def xread(self, streams, count=None, block=None):
+        "Reads every shard's streams; a blocking read polls them, as no single shard can be blocked on"
+        if block is None:
+            return self.run(*self.plan('xread', streams, count=count))
+        # pin '$' to each shard's last entry, so entries added between polls aren't skipped
+        pinned = [{name: last_stream_id(client, name) if identifier in ('$', b'$') else identifier for name, identifier in streams.items()}
+                  for client in self.clients]
+        deadline = None if not block else time.monotonic() + block / 1000
+        while True:
+            response = merge_streams([client.xread(streams, count=count) for client, streams in zip(self.clients, pinned)], count)
+            if response or (deadline is not None and time.monotonic() > deadline):
+                return response
+            time.sleep(BLOCK_INTERVAL)
+    def hscan_iter(self, name, match=None, count=None):
+        for client in self.clients:
+            yield from client.hscan_iter(name, match=match, count=count)
+    def pipeline(self, transaction=False):
+        return ShardedPipeline(self)
+
+class ShardedPipeline:
+    "Queues commands, then executes them as one pipeline per shard"
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+    def __getattr__(self, method):
+        if method not in COMMANDS:
+            raise AttributeError('%s is not supported on a sharded datastore' % method)
+        def queue(*args, **kwargs):
+            self.commands.append(self.client.plan(method, *args, **kwargs))
+            return self
+        return queue
+    def execute(self):
+        commands, self.commands = self.commands, []
+        pipelines = {}
+        for calls, merge in commands:
+            for shard, method, args, kwargs in calls:
+                if shard not in pipelines:
+                    pipelines[shard] = self.client.clients[shard].pipeline(transaction=False)
+                getattr(pipelines[shard], method)(*args, **kwargs)
+        results = {shard: iter(pipeline.execute()) for shard, pipeline in pipelines.items()}
+        return [merge([next(results[shard]) for shard, method, args, kwargs in calls]) for calls, merge in commands]
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        self.commands = []
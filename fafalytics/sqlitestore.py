@@ -0,0 +1,201 @@
+"""An embedded, disk-backed datastore: a single SQLite file in WAL mode.
+
+SQLiteClient implements the subset of redis-py's client used by this package
+(hashes, a log stream and non-transactional pipelines) with the same argument
+and return types, so it can be returned by get_client() instead of a redis
+client. Many processes may write concurrently; SQLite serializes writers, and
+a pipeline's commands are committed as one transaction.
+"""
+import contextlib
+import os
+import sqlite3
+import threading
+import time
+
+import msgpack
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hashes (name BLOB, field BLOB, value BLOB, PRIMARY KEY (name, field)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS streams (id INTEGER PRIMARY KEY AUTOINCREMENT, name BLOB, fields BLOB);
+CREATE INDEX IF NOT EXISTS streams_by_name ON streams (name, id);
+"""
+# how long a writer waits for others to commit before giving up
+BUSY_TIMEOUT = 60
+# SQLite's default limit of bound parameters is 999 on older versions
+MAX_PARAMETERS = 900
+BLOCK_INTERVAL = 0.1
+# an approximately trimmed stream is trimmed once in this many ids, as trimming walks maxlen entries
+TRIM_INTERVAL = 1000
+
+def encode(value):
+    "Converts keys and values to bytes the way redis-py does"
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        return value.encode()
+    if isinstance(value, float):
+        return repr(value).encode()
+    return str(value).encode()
+
+def stream_id(identifier):
+    return b'%d-0' % identifier
+
+class Pipeline:
+    """Queues commands, then executes them in one transaction; like a redis pipeline without
+    a transaction, a failing command doesn't undo the others, and the first error is raised
+    once they all ran (or returned among the results, if raise_on_error is false)"""
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+        def queue(*args, **kwargs):
+            self.commands.append((method, args, kwargs))
+            return self
+        return queue
+    def execute(self, raise_on_error=True):
+        commands, self.commands = self.commands, []
+        results = []
+        with self.client.transaction():
+            for method, args, kwargs in commands:
+                try:
+                    results.append(method(*args, **kwargs))
+                except Exception as error:
+                    results.append(error)
+        if raise_on_error:
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+        return results
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        self.commands = []
+
+class SQLiteClient:
+    def __init__(self, filename):
+        self.filename = filename
+        self.local = threading.local()
+        self.connection.executescript(SCHEMA)
+    @property
+    def connection(self):
+        # sqlite connections can't be shared across threads or forks, so each gets its own
+        local = self.local
+        if getattr(local, 'pid', None) != os.getpid():
+            local.connection = sqlite3.connect(self.filename, timeout=BUSY_TIMEOUT, isolation_level=None)
+            local.connection.execute('PRAGMA journal_mode=WAL')
+            local.connection.execute('PRAGMA synchronous=NORMAL')
+            local.depth = 0
+            local.pid = os.getpid()
+        return local.connection
+    @contextlib.contextmanager
+    def transaction(self):
+        connection = self.connection
+        local = self.local
+        if local.depth == 0:
+            # IMMEDIATE takes the write lock up front, so concurrent writers wait rather than deadlock
+            connection.execute('BEGIN IMMEDIATE')
+        local.depth += 1
+        try:
+            yield connection
+        except BaseException:
+            local.depth -= 1
+            if local.depth == 0:
+                connection.execute('ROLLBACK')
+            raise
+        local.depth -= 1
+        if local.depth == 0:
+            connection.execute('COMMIT')
+    def execute(self, query, parameters=()):
+        return self.connection.execute(query, parameters)
+    def pipeline(self, transaction=False):
+        return Pipeline(self)
+    def ping(self):
+        return self.execute('SELECT 1').fetchone() == (1,)
+    def delete(self, *names):
+        deleted = 0
+        with self.transaction() as connection:
+            for name in map(encode, names):
+                fields = connection.execute('DELETE FROM hashes WHERE name = ?', (name,)).rowcount
+                messages = connection.execute('DELETE FROM streams WHERE name = ?', (name,)).rowcount
+                deleted += bool(fields or messages)
+        return deleted
+    def hsetnx(self, name, key, value):
+        cursor = self.execute('INSERT OR IGNORE INTO hashes VALUES (?, ?, ?)', (encode(name), encode(key), encode(value)))
+        return cursor.rowcount
+    def hset(self, name, key=None, value=None, mapping=None):
+        items = dict(mapping or {})
+        if key is not None:
+            items[key] = value
+        added = 0
+        with self.transaction() as connection:
+            for key, value in items.items():
+                parameters = (encode(name), encode(key))
+                added += connection.execute('SELECT 1 FROM hashes WHERE name = ? AND field = ?', parameters).fetchone() is None
+                connection.execute('INSERT OR REPLACE INTO hashes VALUES (?, ?, ?)', parameters + (encode(value),))
+        return added
+    def hget(self, name, key):
+        row = self.execute('SELECT value FROM hashes WHERE name = ? AND field = ?', (encode(name), encode(key))).fetchone()
+        return row and row[0]
+    def hmget(self, name, keys, *args):
+        keys = [encode(key) for key in (list(keys) if isinstance(keys, (list, tuple)) else [keys]) + list(args)]
+        values = {}
+        for start in range(0, len(keys), MAX_PARAMETERS):
+            chunk = keys[start:start+MAX_PARAMETERS]
+            query = 'SELECT field, value FROM hashes WHERE name = ? AND field IN (%s)' % ','.join('?' * len(chunk))
+            values.update(self.execute(query, [encode(name)] + chunk))
+        return [values.get(key) for key in keys]
+    def hexists(self, name, key):
+        return self.hget(name, key) is not None
+    def hdel(self, name, *keys):
+        with self.transaction() as connection:
+            return sum(connection.execute('DELETE FROM hashes WHERE name = ? AND field = ?', (encode(name), encode(key))).rowcount
+                       for key in keys)
+    def hlen(self, name):
+        return self.execute('SELECT COUNT(*) FROM hashes WHERE name = ?', (encode(name),)).fetchone()[0]
+    def hkeys(self, name):
+        return [field for field, in self.execute('SELECT field FROM hashes WHERE name = ?', (encode(name),))]
+    def hgetall(self, name):
+        return dict(self.execute('SELECT field, value FROM hashes WHERE name = ?', (encode(name),)))
+    def hscan_iter(self, name, match=None, count=None):
+        # pages by field rather than holding a cursor, so writers aren't kept waiting for the scan
+        count, last = count or 10, b''
+        # GLOB patterns are like redis' (*, ? and [...]), except that they have no backslash escapes
+        query = 'SELECT field, value FROM hashes WHERE name = ? AND field > ?%s ORDER BY field LIMIT ?' % (
+            '' if match is None else ' AND CAST(field AS TEXT) GLOB CAST(? AS TEXT)')
+        parameters = () if match is None else (encode(match),)
+        while True:
+            rows = self.execute(query, (encode(name), last) + parameters + (count,)).fetchall()
+            yield from rows
+            if len(rows) < count:
+                return
+            last = rows[-1][0]
+    def xadd(self, name, fields, id='*', maxlen=None, approximate=True):
+        fields = msgpack.packb({encode(key): encode(value) for key, value in fields.items()})
+        with self.transaction() as connection:
+            identifier = connection.execute('INSERT INTO streams (name, fields) VALUES (?, ?)', (encode(name), fields)).lastrowid
+            if maxlen is not None and (not approximate or identifier % TRIM_INTERVAL == 0):
+                # like redis, approximate trimming keeps at least maxlen entries
+                connection.execute('DELETE FROM streams WHERE name = ? AND id <= (SELECT id FROM streams WHERE name = ? ORDER BY id DESC LIMIT 1 OFFSET ?)',
+                                   (encode(name), encode(name), maxlen))
+        return stream_id(identifier)
+    def last_stream_id(self, name):
+        return self.execute('SELECT COALESCE(MAX(id), 0) FROM streams WHERE name = ?', (name,)).fetchone()[0]
+    def xread(self, streams, count=None, block=None):
+        after = {}
+        for name, identifier in streams.items():
+            name = encode(name)
+            identifier = encode(identifier)
+            after[name] = self.last_stream_id(name) if identifier == b'$' else int(identifier.split(b'-')[0])
+        deadline = None if not block else time.monotonic() + block / 1000
+        while True:
+            response = []
+            for name, identifier in after.items():
+                query = 'SELECT id, fields FROM streams WHERE name = ? AND id > ? ORDER BY id' + (' LIMIT %d' % count if count else '')
+                messages = [(stream_id(identifier), msgpack.unpackb(fields))
+                            for identifier, fields in self.execute(query, (name, identifier))]
+                if messages:
+                    response.append([name, messages])
+            if response or block is None or (deadline is not None and time.monotonic() > deadline):
+                return response
+            time.sleep(BLOCK_INTERVAL)
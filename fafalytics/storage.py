@@ -1,32 +1,80 @@
-from contextlib import suppress
-import functools
+from contextlib import closing, suppress
 from subprocess import PIPE
+import itertools
 import os
+import shutil
 import signal
+import sqlite3
 import subprocess
 import time
-import threading
 
 import click
 import redis
 import py
+import zstandard
 
-from .pyutils import block_wait, negate
+from .codec import Codec, CODECS, CONFIG, DICTIONARIES, train_dictionary
+from .sqlitestore import SQLiteClient
+from .sharding import ShardedClient
+from .pyutils import block_wait, locked_cache, negate
 
 
-settings = threading.local()
-def configure(tmpdir='/tmp/.fafalytics.d'):
-    global settings
-    tmpdir = py.path.local(tmpdir)
-    settings.tmpdir = tmpdir
-    settings.pidfile = tmpdir / '/redis.pid'
-    settings.sockpath = tmpdir / '/redis.sock'
+# redis runs as a server process; sqlite is embedded, a file opened by every process
+BACKENDS = ('redis', 'sqlite')
+
+DEFAULT_TMPDIR = '/tmp/.fafalytics.d'
+# connections per redis instance shared by a process' threads; more threads wait up to POOL_TIMEOUT for one
+POOL_SIZE = 16
+POOL_TIMEOUT = 20
+
+class Settings:
+    "The datastore's configuration, shared by every thread of the process (and inherited by forks)"
+    def __init__(self):
+        self.configure()
+    def configure(self, tmpdir=DEFAULT_TMPDIR, backend='redis', pool_size=POOL_SIZE, pool_timeout=POOL_TIMEOUT):
+        self.tmpdir = py.path.local(tmpdir)
+        self.backend = backend
+        self.pool_size = pool_size
+        self.pool_timeout = pool_timeout
+    @property
+    def pidfile(self):
+        return self.tmpdir / '/redis.pid'
+    @property
+    def sockpath(self):
+        return self.tmpdir / '/redis.sock'
+    @property
+    def dbpath(self):
+        return self.tmpdir / '/datastore.sqlite'
+
+settings = Settings()
+def configure(tmpdir=DEFAULT_TMPDIR, backend='redis', pool_size=POOL_SIZE, pool_timeout=POOL_TIMEOUT):
+    settings.configure(tmpdir, backend, pool_size, pool_timeout)
+    # clients made with the previous configuration would outlive it
+    get_client.cache_clear()
+    get_codec.cache_clear()
 REDIS_BINARY = 'redis-server'
 REDIS_CONF = """
 port 0
-unixsocket %s
+unixsocket %(sockpath)s
 unixsocketperm 755
+dir "%(tmpdir)s"
+dbfilename %(rdb)s
+appendfilename %(aof)s
 """
+RDB_FILENAME = 'dump.rdb'
+AOF_FILENAME = 'appendonly.aof'
+AOF_DIRECTORY = 'appendonlydir' # where redis 7 and later keep the AOF
+SHARDS_FILENAME = 'shards'
+PERSISTENCE_FILENAME = 'persistence'
+# whatever is persisted in tmpdir is loaded on start; rdb also snapshots on shutdown
+PERSISTENCE = {
+    'none': 'save ""\nappendonly no\n',
+    'rdb': 'save 900 1\nsave 300 100\nsave 60 10000\nappendonly no\n',
+    'aof': 'save ""\nappendonly yes\nappendfsync everysec\n',
+}
+# loading or snapshotting a large dataset can take a while
+START_TIMEOUT = 300
+STOP_TIMEOUT = 300
 PROC = py.path.local('/proc')
 
 class DatastoreError(Exception):
@@ -36,24 +84,76 @@ class NotRunning(DatastoreError):
 class UnexpectedRunning(DatastoreError):
     pass
 
-@functools.cache
+def shard_directory(shard):
+    "Where a shard keeps its files; the first shard's is tmpdir itself, as for an unsharded datastore"
+    return settings.tmpdir if shard == 0 else settings.tmpdir / ('shard%d' % shard)
+
+def shard_socket(shard):
+    return settings.sockpath if shard == 0 else settings.tmpdir / ('redis.%d.sock' % shard)
+
+def snapshot_path(path, shard):
+    return path if shard == 0 else '%s.%d' % (path, shard)
+
+def read_shards() -> int:
+    "The number of shards the datastore was last started with"
+    try:
+        with open(settings.tmpdir / SHARDS_FILENAME) as handle:
+            return int(handle.read())
+    except FileNotFoundError:
+        return 1
+
+def write_shards(shards: int) -> None:
+    with open(settings.tmpdir / SHARDS_FILENAME, 'w') as handle:
+        handle.write(str(shards))
+
+def read_persistence() -> str:
+    "The persistence the datastore was last started with"
+    try:
+        with open(settings.tmpdir / PERSISTENCE_FILENAME) as handle:
+            return handle.read()
+    except FileNotFoundError:
+        return 'rdb'
+
+def write_persistence(persistence: str) -> None:
+    with open(settings.tmpdir / PERSISTENCE_FILENAME, 'w') as handle:
+        handle.write(persistence)
+
+def connection_pool(shard):
+    "A pool safe to share across threads; redis-py discards a pool's connections in a forked child, which reconnects"
+    return redis.BlockingConnectionPool(connection_class=redis.UnixDomainSocketConnection, path=str(shard_socket(shard)),
+                                        max_connections=settings.pool_size, timeout=settings.pool_timeout)
+
+@locked_cache
 def get_client():
-    client = redis.Redis(unix_socket_path=str(settings.sockpath))
+    if settings.backend == 'sqlite':
+        settings.tmpdir.ensure_dir()
+        return SQLiteClient(str(settings.dbpath))
+    clients = [redis.Redis(connection_pool=connection_pool(shard)) for shard in range(read_shards())]
+    client = clients[0] if len(clients) == 1 else ShardedClient(clients)
     client.ping()
     return client
 
-def read_pid() -> int:
+@locked_cache
+def get_codec():
+    return Codec.from_datastore(get_client())
+
+def shard_clients():
+    "Each shard's own client, for server commands (which aren't routed)"
+    client = get_client()
+    return client.clients if isinstance(client, ShardedClient) else [client]
+
+def read_pids() -> list:
     try:
         with open(settings.pidfile) as handle:
-            return int(handle.read())
+            return [int(line) for line in handle]
     except FileNotFoundError:
         raise NotRunning("unable to read pidfile %s" % settings.pidfile)
     except ValueError:
         raise NotRunning("invalid pidfile %s" % settings.pidfile)
 
-def write_pid(pid: int) -> None:
+def write_pids(pids: list) -> None:
     with open(settings.pidfile, 'w') as handle:
-        handle.write(str(pid))
+        handle.write(''.join('%d\n' % pid for pid in pids))
 
 def is_alive() -> bool:
     try:
@@ -64,46 +164,171 @@ def is_alive() -> bool:
 
 def is_running() -> bool:
     try:
-        get_pid()
+        get_pids()
         return True
     except NotRunning:
         return False
 
-def get_pid() -> int:
-    pid = read_pid()
-    proc_path = PROC/str(pid)
-    if proc_path.exists():
-        return pid
-    raise NotRunning("missing %s" % proc_path)
+def get_pids() -> list:
+    "The pids of the datastore's processes which are still running"
+    pids = read_pids()
+    running = [pid for pid in pids if (PROC/str(pid)).exists()]
+    if running:
+        return running
+    raise NotRunning("missing %s" % ', '.join(str(PROC/str(pid)) for pid in pids))
+
+def has_aof(shard):
+    return (shard_directory(shard) / AOF_FILENAME).exists() or (shard_directory(shard) / AOF_DIRECTORY).exists()
+
+def has_persisted(shard):
+    return has_aof(shard) or (shard_directory(shard) / RDB_FILENAME).exists()
+
+def remove_aof(shard):
+    with suppress(FileNotFoundError):
+        os.remove(shard_directory(shard) / AOF_FILENAME)
+    shutil.rmtree(shard_directory(shard) / AOF_DIRECTORY, ignore_errors=True)
 
-def start_store():
+def aof_rewritten(client):
+    info = client.info('persistence')
+    return not (info['aof_rewrite_in_progress'] or info['aof_rewrite_scheduled'])
+
+def redis_conf(shard, persistence='rdb', maxmemory=None):
+    conf = REDIS_CONF % {'sockpath': shard_socket(shard), 'tmpdir': shard_directory(shard), 'rdb': RDB_FILENAME, 'aof': AOF_FILENAME}
+    # with appendonly, redis loads only the AOF; without one yet, load the snapshot and create the AOF from it
+    aof_pending = persistence == 'aof' and not has_aof(shard)
+    conf += PERSISTENCE['rdb' if aof_pending else persistence]
+    if maxmemory:
+        conf += 'maxmemory %s\nmaxmemory-policy noeviction\n' % maxmemory
+    return conf, aof_pending
+
+def start_store(persistence=None, maxmemory=None, shards=None):
+    if settings.backend == 'sqlite':
+        if shards not in (None, 1):
+            raise DatastoreError('the sqlite backend has no shards')
+        get_client() # creates the database; there's no process to start
+        return
     settings.tmpdir.ensure_dir()
     with suppress(NotRunning):
-        pid = get_pid()
-        raise UnexpectedRunning('already running at pid %d' % pid)
-    process = subprocess.Popen([REDIS_BINARY, '-'], stdin=PIPE, stdout=subprocess.DEVNULL)
-    process.stdin.write((REDIS_CONF % settings.sockpath).encode())
-    process.stdin.close()
-    write_pid(process.pid)
-    block_wait(100, 0.1, predicate=is_alive, error=NotRunning('pid %d failed ping' % process.pid))
+        pids = get_pids()
+        raise UnexpectedRunning('already running at pid %s' % ','.join(str(pid) for pid in pids))
+    previous = read_shards()
+    shards = shards or previous
+    if shards != previous and any(has_persisted(shard) for shard in range(previous)):
+        # games are routed by a hash of their id, which depends on the number of shards
+        raise DatastoreError('data is persisted in %d shards; start with --shards %d, or remove %s' % (previous, previous, settings.tmpdir))
+    write_shards(shards)
+    persistence = persistence or read_persistence()
+    write_persistence(persistence)
+    processes = []
+    for shard in range(shards):
+        shard_directory(shard).ensure_dir()
+        conf, aof_pending = redis_conf(shard, persistence, maxmemory)
+        process = subprocess.Popen([REDIS_BINARY, '-'], stdin=PIPE, stdout=subprocess.DEVNULL)
+        process.stdin.write(conf.encode())
+        process.stdin.close()
+        processes.append((process, aof_pending))
+    write_pids([process.pid for process, aof_pending in processes])
+    def started():
+        for process, aof_pending in processes:
+            if process.poll() is not None:
+                raise NotRunning('pid %d exited with %d' % (process.pid, process.returncode))
+        return is_alive()
+    block_wait(int(START_TIMEOUT / 0.1), 0.1, predicate=started, error=NotRunning('datastore failed ping'))
+    for client, (process, aof_pending) in zip(shard_clients(), processes):
+        if aof_pending:
+            client.config_set('save', '')
+            client.config_set('appendonly', 'yes')
+            # until the AOF is written, the data is in neither file
+            block_wait(int(START_TIMEOUT / 0.1), 0.1, predicate=lambda: aof_rewritten(client), error=NotRunning('AOF rewrite timed out'))
 
 def stop_store():
-    pid = get_pid()
-    os.kill(pid, signal.SIGTERM)
-    with suppress(ChildProcessError):
-        os.wait()
-    block_wait(10, 0.1, error=UnexpectedRunning('pid %d failed to exit' % pid), predicate=negate(is_running))
+    get_client.cache_clear()
+    get_codec.cache_clear()
+    if settings.backend == 'sqlite':
+        return
+    pids = get_pids()
+    for pid in pids:
+        os.kill(pid, signal.SIGTERM)
+    for pid in pids:
+        with suppress(ChildProcessError):
+            os.waitpid(pid, 0)
+    block_wait(int(STOP_TIMEOUT / 0.1), 0.1, error=UnexpectedRunning('pid %s failed to exit' % ','.join(str(pid) for pid in pids)),
+               predicate=negate(is_running))
+
+def flush_store():
+    "Removes the data persisted in tmpdir, so the next start is empty"
+    if settings.backend == 'sqlite':
+        get_client.cache_clear()
+        get_codec.cache_clear()
+        for path in (settings.dbpath, '%s-wal' % settings.dbpath, '%s-shm' % settings.dbpath):
+            with suppress(FileNotFoundError):
+                os.remove(path)
+        return
+    with suppress(NotRunning):
+        pids = get_pids()
+        raise UnexpectedRunning('still running at pid %s' % ','.join(str(pid) for pid in pids))
+    for shard in range(read_shards()):
+        with suppress(FileNotFoundError):
+            os.remove(shard_directory(shard) / RDB_FILENAME)
+        remove_aof(shard)
+
+def save_store(destination=None):
+    """Snapshots the datastore (to tmpdir, where start loads it from), and copies the snapshot to
+    destination; other shards' snapshots are copied next to it, suffixed by the shard's number"""
+    if settings.backend == 'sqlite':
+        if destination is None:
+            raise DatastoreError('the sqlite datastore is always on disk; save needs a destination')
+        with closing(sqlite3.connect(str(destination))) as target:
+            get_client().connection.backup(target)
+        return
+    for shard, client in enumerate(shard_clients()):
+        # SAVE blocks other clients until written; BGSAVE has no simple way to wait for completion
+        client.save()
+        if destination is not None:
+            shutil.copyfile(shard_directory(shard) / RDB_FILENAME, snapshot_path(destination, shard))
+
+def restore_store(source=None, persistence=None, maxmemory=None):
+    "Restarts the datastore from source (or the last snapshot in tmpdir), discarding its current data"
+    if settings.backend == 'sqlite':
+        if source is None:
+            raise DatastoreError('the sqlite datastore is always on disk; restore needs a source')
+        with closing(sqlite3.connect(str(source))) as origin:
+            origin.backup(get_client().connection)
+        return
+    if is_running():
+        stop_store()
+    for shard in range(read_shards()):
+        snapshot = shard_directory(shard) / RDB_FILENAME
+        if source is not None:
+            shutil.copyfile(snapshot_path(source, shard), snapshot)
+        elif not snapshot.exists():
+            raise DatastoreError('no snapshot in %s' % shard_directory(shard))
+        # the AOF would take precedence over the snapshot; it's recreated from it
+        remove_aof(shard)
+    start_store(persistence, maxmemory)
 
 @click.group()
 def datastore():
     "Datastore management commands"
 
+def store_options(func):
+    func = click.option('--maxmemory', help="redis' memory limit per shard, e.g. 8gb (writes fail when exceeded)")(func)
+    func = click.option('--persistence', type=click.Choice(tuple(PERSISTENCE)),
+                        help='Snapshot on shutdown and periodically (rdb), log every write (aof), or neither '
+                             '(default: as last started, or rdb)')(func)
+    return func
+
+def shards_option(func):
+    return click.option('--shards', type=click.IntRange(1), help='Number of redis-server instances, each with its share of games (default: as last started, or 1)')(func)
+
 @datastore.command()
-def start():
-    "Starts the datastore and wait for it to ping healthy"
+@store_options
+@shards_option
+def start(persistence, maxmemory, shards):
+    "Starts the datastore (loading data persisted in its directory) and wait for it to ping healthy"
     try:
-        start_store()
-    except (NotRunning, UnexpectedRunning) as error:
+        start_store(persistence, maxmemory, shards)
+    except DatastoreError as error:
         click.echo("start failed: %s" % error, err=True)
 
 @datastore.command()
@@ -115,9 +340,67 @@ def stop():
         click.echo('stop failed: %s' % error, err=True)
 
 @datastore.command()
+@store_options
+@shards_option
+@click.option('--flush', is_flag=True, help='Discard all data, persisted or not, before starting')
 @click.pass_context
-def restart(ctx):
-    "Stop the datastore if running, then start it (flushing memory)"
+def restart(ctx, persistence, maxmemory, shards, flush):
+    "Stop the datastore if running, then start it (keeping only persisted data)"
     if is_running():
         ctx.invoke(stop)
-    ctx.invoke(start)
+    if flush:
+        try:
+            flush_store()
+        except DatastoreError as error:
+            raise click.ClickException(str(error))
+    ctx.invoke(start, persistence=persistence, maxmemory=maxmemory, shards=shards)
+
+@datastore.command()
+@click.argument('destination', type=click.Path(dir_okay=False), required=False)
+def save(destination):
+    "Snapshot the datastore now, optionally copying the snapshot to destination"
+    try:
+        save_store(destination)
+    except DatastoreError as error:
+        raise click.ClickException(str(error))
+
+@datastore.command()
+@store_options
+@click.argument('source', type=click.Path(exists=True, dir_okay=False), required=False)
+def restore(persistence, maxmemory, source):
+    "Replace the datastore's data with a snapshot (by default, the last one taken)"
+    try:
+        restore_store(source, persistence, maxmemory)
+    except DatastoreError as error:
+        raise click.ClickException(str(error))
+
+@datastore.command('codec')
+@click.argument('name', type=click.Choice(CODECS), required=False)
+def set_codec(name):
+    "Show the codec used to store values, or set it (already stored values are still readable)"
+    client = get_client()
+    if name is None:
+        click.echo(get_codec().name)
+        return
+    client.hset(CONFIG, 'name', name)
+
+@datastore.command()
+@click.option('--samples', type=int, default=1000, help='Number of values sampled from each hash')
+@click.option('--size', type=int, default=100*1024, help='Dictionary size in bytes')
+@click.argument('prefixes', nargs=-1, required=True)
+def train_codec(samples, size, prefixes):
+    "Train a zstd dictionary on values of the given hashes, and store new values compressed with it"
+    client = get_client()
+    codec = get_codec()
+    # values are spread across shards; sample each one's share of them
+    shards = shard_clients()
+    per_shard = -(-samples // len(shards))
+    objs = [codec.decode(value) for prefix in prefixes for shard in shards
+            for key, value in itertools.islice(shard.hscan_iter(prefix, count=per_shard), per_shard)]
+    try:
+        dictionary = train_dictionary(objs, size)
+    except zstandard.ZstdError as error:
+        raise click.ClickException('training on %d values failed: %s' % (len(objs), error))
+    client.hset(DICTIONARIES, dictionary.dict_id(), dictionary.as_bytes())
+    client.hset(CONFIG, mapping={'name': 'msgpack-zstd', 'dictionary': dictionary.dict_id()})
+    click.echo('trained dictionary %d on %d values' % (dictionary.dict_id(), len(objs)))
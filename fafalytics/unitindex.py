@@ -0,0 +1,183 @@
+# generated by `python -m fafalytics.units` from units._UNITS; do not edit
+VERSION = 3719
+IDS = ('ueb0101', 'ueb3101', 'uel0105', 'uea0101', 'ueb0102', 'ueb3102', 'uel0101', 'ues0203', 'uea0102', 'ueb0103', 'uel0106', 'ues0103', 'uea0103', 'ueb1103', 'uel0201', 'uea0107', 'uel0104', 'ueb1106', 'uel0103', 'ueb1101', 'ueb1102', 'ueb1105', 'uea0003', 'xea3204', 'ueb2101', 'ueb2104', 'ueb2109', 'ueb5101', 'ueb5202', 'uel0208', 'xel0209', 'dea0202', 'del0204', 'uea0204', 'uel0202', 'xes0102', 'uel0203', 'uea0203', 'ues0201', 'ues0202', 'uea0104', 'ueb1202', 'ueb0201', 'ueb1104', 'zeb9501', 'ueb0202', 'xes0205', 'zeb9502', 'ueb0203', 'ueb1201', 'zeb9503', 'uel0205', 'uel0111', 'ueb2301', 'uel0307', 'ueb2204', 'ueb2205', 'ueb2303', 'ueb2108', 'ueb4201', 'ueb4202', 'ueb3201', 'ueb3202', 'ueb4203', 'xeb0104', 'uel0309', 'uel0301', 'ues0304', 'uea0302', 'uel0303', 'ues0302', 'xes0307', 'delk002', 'uea0303', 'uel0304', 'xel0305', 'xel0306', 'uea0304', 'ueb0301', 'ueb1302', 'zeb9601', 'uea0305', 'ueb0302', 'ueb1303', 'zeb9602', 'ueb0303', 'xea0306', 'zeb9603', 'ueb1301', 'xeb2306', 'ueb2304', 'ueb2302', 'ueb2305', 'ueb4302', 'ueb4301', 'ues0305', 'ueb3104', 'xeb0204', 'ueb0304', 'uel0401', 'xea0002', 'ues0401', 'xeb2402', 'uel0001', 'ueb2401', 'urb0101', 'url0105', 'ura0101', 'urb0102', 'url0101', 'ura0102', 'urb0103', 'url0106', 'urs0203', 'ura0103', 'urb1103', 'url0107', 'urs0103', 'xra0105', 'ura0107', 'url0104', 'urb1106', 'url0103', 'urb1101', 'urb1102', 'urb1105', 'urb2101', 'urb2104', 'urb2109', 'urb3101', 'urb3102', 'urb5101', 'urb5202', 'url0208', 'xrl0004', 'dra0202', 'drl0204', 'ura0204', 'url0202', 'xrs0204', 'url0203', 'urs0201', 'ura0203', 'url0205', 'urs0202', 'ura0104', 'urb1202', 'url0111', 'xrs0205', 'urb0201', 'urb1104', 'zrb9501', 'urb0202', 'url0306', 'zrb9502', 'urb0203', 'urb1201', 'zrb9503', 'xrl0302', 'urb2301', 'urb2204', 'urb2205', 'urb2303', 'urb2108', 'urb4201', 'urb4202', 'urb4204', 'urb4205', 'urb3201', 'urb3202', 'urb4203', 'xrb0104', 'xrb0204', 'xrb0304', 'url0309', 'xrl0002', 'xrl0003', 'xrl0005', 'url0301', 'ura0302', 'url0303', 'urs0304', 'xrl0305', 'drlk001', 'ura0303', 'url0304', 'urs0302', 'ura0304', 'urb0301', 'urb1302', 'urs0303', 'zrb9601', 'urb0302', 'urb1303', 'xra0305', 'zrb9602', 'urb0303', 'zrb9603', 'urb1301', 'urb2304', 'xrb2308', 'urb2302', 'urb2305', 'urb4206', 'urb4207', 'urb4302', 'urs0305', 'urb3104', 'xrb3301', 'urb0304', 'url0401', 'url0402', 'xrl0403', 'ura0401', 'url0001', 'uab0101', 'ual0105', 'uaa0101', 'uab0102', 'ual0101', 'uaa0102', 'uab0103', 'ual0106', 'uas0203', 'uaa0103', 'uab1103', 'ual0201', 'uas0102', 'uas0103', 'uaa0107', 'uab1106', 'ual0104', 'uab1101', 'ual0103', 'uab1102', 'uab1105', 'uab2101', 'uab2104', 'uab2109', 'uab5101', 'uab3101', 'uab3102', 'uab5202', 'ual0208', 'xaa0202', 'xas0204', 'uaa0204', 'ual0202', 'xal0203', 'ual0205', 'uaa0203', 'ual0111', 'uas0201', 'daa0206', 'uaa0104', 'uab1202', 'uas0202', 'uab0201', 'uab1104', 'ual0307', 'zab9501', 'uab0202', 'zab9502', 'uab0203', 'uab1201', 'zab9503', 'uab2301', 'uab2204', 'uab2205', 'uab2303', 'uab2108', 'uab4201', 'uab4202', 'uab3201', 'uab3202', 'uab4203', 'ual0309', 'ual0301', 'uas0304', 'xal0305', 'uas0302', 'uaa0302', 'ual0303', 'xas0306', 'dalk003', 'uaa0303', 'ual0304', 'uas0303', 'xaa0306', 'dal0310', 'uaa0304', 'uab0301', 'uab1302', 'zab9601', 'uab0302', 'uab1303', 'xaa0305', 'zab9602', 'uab0303', 'zab9603', 'uab1301', 'uab2304', 'uab2302', 'uab2305', 'uab4302', 'uab4301', 'uas0305', 'uab3104', 'xab3301', 'uab0304', 'ual0401', 'ual0001', 'uaa0310', 'uas0401', 'xab1401', 'xab2307', 'xsb0101', 'xsl0105', 'xsa0101', 'xsb0102', 'xsl0101', 'xsl0201', 'xsa0102', 'xsb0103', 'xss0203', 'xsa0103', 'xsb1103', 'xss0103', 'xsa0107', 'xsl0104', 'xsb1106', 'xsl0103', 'xsb1101', 'xsb1102', 'xsb1105', 'xsb2101', 'xsb2104', 'xsb2109', 'xsb5101', 'xsb3101', 'xsb3102', 'xsb5202', 'xsl0208', 'xsa0202', 'xsa0204', 'xsl0202', 'xsa0203', 'xsl0203', 'xss0201', 'xss0202', 'xsl0205', 'xsa0104', 'xsb1202', 'xsl0111', 'xsb0201', 'xsb1104', 'zsb9501', 'xsb0202', 'zsb9502', 'xsb0203', 'xsb1201', 'zsb9503', 'xsb2301', 'xsb2204', 'xsb2205', 'xsb2303', 'xsb2108', 'xsb4201', 'xsb4202', 'xsb3201', 'xsb3202', 'xsb4203', 'xsl0309', 'xsl0301', 'xss0304', 'xsa0302', 'xsl0303', 'xsl0305', 'xss0302', 'xsa0303', 'xss0303', 'dslk004', 'xsa0304', 'xsb0301', 'xsb1302', 'zsb9601', 'xsb0302', 'xsb1303', 'xsl0304', 'xsl0307', 'zsb9602', 'xsb0303', 'zsb9603', 'xsb1301', 'xsb2304', 'xsb2302', 'xsb2305', 'xsb4302', 'xsb4301', 'xsb3104', 'xsb0304', 'xsa0402', 'xsl0401', 'xsl0001', 'xsb2401', 'xnb0101', 'xnb3101', 'xnl0105', 'xna0101', 'xnb0102', 'xnb3102', 'xnl0101', 'xns0203', 'xna0102', 'xnb0103', 'xnl0106', 'xns0102', 'xns0103', 'xna0103', 'xnb1103', 'xnl0201', 'xna0105', 'xna0107', 'xnl0103', 'xnl0107', 'xnb1106', 'xnb1101', 'xnb1102', 'xnb1105', 'xnb2101', 'xnb2102', 'xnb2109', 'xnb5101', 'xnb5202', 'xnl0208', 'xnl0209', 'xna0202', 'xnl0202', 'xna0203', 'xnl0203', 'xns0201', 'xns0202', 'xna0104', 'xnb0203', 'xnb1202', 'znb9503', 'xnb1104', 'xnb0202', 'znb9502', 'xnb0201', 'xnb1201', 'znb9501', 'xnl0205', 'xnl0111', 'xnb2301', 'xnl0306', 'xnb2202', 'xnb2207', 'xnb2303', 'xnb2208', 'xnb4204', 'xnb4202', 'xnb4205', 'xnb3201', 'xnb3202', 'xnl0309', 'xnl0301', 'xns0304', 'xnl0305', 'xna0302', 'xnl0303', 'xns0302', 'xna0303', 'xnb0303', 'xnl0302', 'znb9603', 'xna0304', 'xnb1302', 'xnl0304', 'xns0303', 'xna0305', 'xnb0302', 'xnb1303', 'znb9602', 'xnb0301', 'xnb1301', 'znb9601', 'xno0001', 'xno2302', 'xnb4201', 'xnb3303', 'xnb2302', 'xnb2305', 'xnb4302', 'xnb4301', 'xnb4305', 'xnb3302', 'xnb3301', 'xnb0304', 'xnl0402', 'xnl0403', 'xna0401', 'xnl0001')
+CATEGORIES = {
+    'ABILITYBUTTON': 0x400000000000000000000000080000000000000000000000100000000000000000000000000000000000000000000000000000000000000000000000000000,
+    'AEON': 0xfffffffffffffffffffffffff800000000000000000000000000000000000000000000000000000,
+    'AIR': 0x20000b1120000184500064230200444880006085800124c100034522000060645000211620000d090800000502428000c45850005622100000a12280c09118,
+    'AIRSTAGINGPLATFORM': 0x800000000002000000000000100000000020000001000000800000000004000000000000400000000001001000000028000000000000000010000000,
+    'AMPHIBIOUS': 0x400000120000000000000004000000020000000000000001c0000004400000000300000000008000008040000000000000000,
+    'ANTIAIR': 0x300201858001100210408120060400380008006081020401002100b00008010210208810380080418000010001808081204008040003000088008082010100,
+    'ANTIMISSILE': 0x2000800010000008000000002000040080002000000000010000090080010000000000002000445000100001000000000000200000c00800000000000000,
+    'ANTINAVY': 0x20000408000100000000140100011020010030000010000100010604000801801000460000200003a0100020028000000800100004a04000080,
+    'ANTISHIELD': 0x2000000000000000000000000000000000000000000000000000000000000000000000000,
+    'ANTISUB': 0x1000000000000000000000000000000000000000000000000000000000000000,
+    'ARTILLERY': 0xc00400004200000008000000810000020000000080008004000400020000000020000040200020000040000000004000108080004000200000000040000,
+    'ASF': 0x10000000000000000000000080000000000000000000000200000000000000000000000010000000000000000000000000002000000000000000000,
+    'BATTLESHIP': 0x40000000000000002000000090000000000000000000000040000000000000000000000000000c00000000000000000,
+    'BENIGN': 0x1000000000000000000000004000000000000000000000000800000000000000000000000000800000000000000000000000008000000,
+    'BOMB': 0x1000004000000000000000000000000000000000000000,
+    'BOMBER': 0x100000000010000400020000400000000180002000000004000000002040000100000000080000000000028000040000000020000000000280001000,
+    'BOT': 0x4001002000000020002010040000014800000000000004018000000d000004000010000112000000008200000000100000400,
+    'BUBBLESHIELDSPILLOVERCHECK': 0x88004000040000000000000000,
+    'BUILTBYAIRTIER2FACTORY': 0x40000000,
+    'BUILTBYAIRTIER3FACTORY': 0x40000000,
+    'BUILTBYCOMMANDER': 0x1e40842200000000000000007904890000000000000000000f102248000000000080000000009c808920000000000000000000f082211,
+    'BUILTBYEXPERIMENTALSUB': 0x4000003000000000000000000000011020001880000000000000000010000000000000000000000000000800000000,
+    'BUILTBYLANDTIER2FACTORY': 0x40000000,
+    'BUILTBYLANDTIER3FACTORY': 0x40000000,
+    'BUILTBYNAVALTIER2FACTORY': 0x40000000,
+    'BUILTBYNAVALTIER3FACTORY': 0x40000000,
+    'BUILTBYQUANTUMGATE': 0x400000000000000000000002000000000000000000000002000000000000000000000000400000000000000000000000000040000000000000000,
+    'BUILTBYTIER1ENGINEER': 0x3fe084660000000000000003ff44890000000000000000007fd4224800000000000000000001ffa08920000000000000000001f3a2233,
+    'BUILTBYTIER1FACTORY': 0xba80001b7b9800000000002f400000ab760000000000002f20000029ddb000000000000002da0000005776c00000000000005b40000055dcc,
+    'BUILTBYTIER2COMMANDER': 0x1bf4d70021a0004400000000fff590038640000000000000fff5480070c400000000000000f3fb4c400163200000000000001ffa69a0010320022,
+    'BUILTBYTIER2ENGINEER': 0x1bf4d7003fe0846600000000fff59003ff44890000000000fff548007fd422480000000000f3fb4c4001ffa08920000000001ffa69a001f3a2233,
+    'BUILTBYTIER2FACTORY': 0x12020000b003f401b7b9800084800000027fc00ab760000448000000091ff8029ddb000011100000004219ffa005776c0000244000005840ffa0055dcc,
+    'BUILTBYTIER2LANDFACTORY': 0x8000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000,
+    'BUILTBYTIER2SUPPORTFACTORY': 0x48080000000000000000000142000000000000000000000a20000000000000000000000028800000000000000000000000009100000000000000000000,
+    'BUILTBYTIER3COMMANDER': 0x3f7e6c2801b749600200000457ff4b000fff59003860000f7ffab0000fff5480070000003fefeaa0000f3fb4c400103200016dff998001fb24980010000022,
+    'BUILTBYTIER3ENGINEER': 0x3f7e6c2801bf4d7003fe084677ff4b000fff59003ff4489f7ffab0000fff548007fd4224bfefeaa0000f3fb4c4001ffa08936dff998001ffa69a001f3a2233,
+    'BUILTBYTIER3FACTORY': 0x1d5fa00b003f401b7b98000307fd000027fc00ab760000107ffd000091ff8029ddb0000044ff840004219ffa005776c0000023ffa005840ffa0055dcc,
+    'BUILTBYTIER3LANDFACTORY': 0x8000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000,
+    'CANNOTUSEAIRSTAGING': 0x200000000000000400004000000000000000008000010001000000000000006000002000200000000000000002000000800000004000000000010000008000,
+    'CANTRANSPORTCOMMANDER': 0x200000000000000400000000000000000000008000000000000000000000004000000000000000000000000002000000000000004000000000010000000000,
+    'CAPTURE': 0x40000000060000000c000000880000003000000040000020800000003000000008000001400000000478000000002000000480000000060000000060c00004,
+    'CARRIER': 0x800000000002000000000000100000000000000003000000800000000000000000000000400000000000000000000020000000000000000000000000,
+    'COMMAND': 0x400000000000000000000000080000000000000000000000800000000000000000000000400000000000000000000000000080000000000000000000000000,
+    'CONSTRUCTION': 0x40005a0a06000ba80c000042a801c6803002f400400008b0800e68003002f20008000025d000399007f8002da00060000096ca00b540070005b40060000215,
+    'CONSTRUCTIONSORTDOWN': 0x5a0a00000ba8000000000001c6800002f40000000000000e68000002f20000000000000039900000002da000000000004000b540000005b40000000000,
+    'COUNTERINTELLIGENCE': 0x8000000040000000000000000000000800000000000100000000000800000000000008080104090804000210000000000000000000008000000000000800,
+    'CQUEMOV': 0x387e000001ef401000a00804561c0000077c01001b80400844e00000067c0080037002003c4f8000001b2f80040007c00801009e00000177a0020007002022,
+    'CRABEGG': 0x380000000004000000000000000000000000000000000,
+    'CRUISER': 0x200000000000000000000002000000000000000000000010000000000000000000000000001000000000000000000000000008000000000,
+    'CYBRAN': 0x7ffffffffffffffffffffffffffe00000000000000000000000000,
+    'DEFENSE': 0xe200000073400001e0000000642000019c00000780000003200000019c080000f00000003980000000f380000009c00000006600000019e040000f000000,
+    'DEFENSIVEBOAT': 0x100000000000000000000000000000000000000000000000000000000000000000010000000000000000000000000400000000000,
+    'DESTROYER': 0x8000000100000000000000000000001000000000000000000000001000000000000000000000000000200000000000000000000000004000000000,
+    'DIRECTFIRE': 0x58000100d400c003e02112880c0000270004001a00809303c0000205800401118010144858000004d00000c001350041330080020008e0002000d501004cc0,
+    'DRAGBUILD': 0x3ffe7e0a01ff4fe803f60046777fce8001fffc0027d4089f73fee80001fff60004f94024be3ffb9003b8ffbde00059ea00936c7fbd40011fa7bc001f2a0211,
+    'DUMMYGSRWEAPON': 0x20020000004000020000000000100000080200008000000000000000000200800000000000000001000048000000010000,
+    'ECONOMIC': 0x4000242000000450001e08000802090000010900007440048010900000010480000d420040004220000000104400003a0800800108800000020a00003a2000,
+    'ENERGYPRODUCTION': 0x4000200004000400000c0000080200002001000000300004801000002001000000050000400040000400001000000018000080010000040002000000180000,
+    'ENERGYSTORAGE': 0x100000000000000000000000400000000000000000000000080000000000000000000000000020000000000000000000000000200000,
+    'ENGINEER': 0x40000000060000000c000000880000003000000040000020800000003000000008000001400000000478000000002000000480000000060000000060c00004,
+    'ENGINEERSTATION': 0x38000000000000000002000000010000000000000000,
+    'EXCLUDEINDOMINATION': 0x180000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000,
+    'EXPERIMENTAL': 0x38000000000000000000000016000000000000000000000f4000000000000000000000003c0000000000000000000000000178000000000000000000000000,
+    'FACTORY': 0x4005a8a00000ba8000000422101c6900002f40000000893200e68800002f20000000024920039d00380002da000400000926c00b540000005b40000000211,
+    'FAVORSWATER': 0x200000000000000000000000000000000000,
+    'FIELDENGINEER': 0x8000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000040000000,
+    'FRIGATE': 0x200000000000000000000008000000000000000000000001000000000000000000000000000200000000000000000000000000800,
+    'GATE': 0x40000000000000000000000010000000000000000000000200000000000000000000000020000000000000000000000000004000000000000000000000000,
+    'GROUNDATTACK': 0x1000000000040002000000000000000000400000000000100000000000400000000200004000000000000400000400000000200000000002000000000,
+    'HIGHALTAIR': 0x100112000000010000421020000488000000180002441000005220000000050000112000000090800000000028000044810000022100000000280001108,
+    'HIGHPRIAIR': 0x2000000000000000000000000000000000000000000000000000000000000000,
+    'HOVER': 0x18000000420000008c000088800020001000004840080020000002001000080308000409000000000000000000000000000000000000000000001000000000,
+    'HYDROCARBON': 0x80000000000000000000000200000000000000000000000040000000000000000000000000010000000000000000000000000100000,
+    'INDIRECTFIRE': 0xc0040080c2002000081000008100200600220000800080040004840600008000200000402000220000c0008000004000108080014080610008000040000,
+    'INSIGNIFICANTUNIT': 0x80000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000,
+    'INTELLIGENCE': 0x3000090ad8200030080020d408000008e000000180081421c0000020e0000000300100209c00040080700020000060020282180000010e00000000004086a,
+    'LAND': 0x580050445600ba00ac019088ac0032a33000164a400a0330c0002a54b0001a0b88028449dc000092d7c00042a895600511268800015d260058141560054445,
+    'LIGHTBOAT': 0x800000000000000000000000000000000000000000000000800000000,
+    'LOWSELECTPRIO': 0x600000004000000000000034400000000000000000000003c4000000000000000000000000028800000000000000000000000,
+    'MASSEXTRACTION': 0x200000001000000800000001000000010000004000000010000000008000000200000000200000000004000000080000000080000000020000002000,
+    'MASSFABRICATION': 0x400004000400004000000000080008002000080000000004800080002000040000000000400002000400000040000000000080000800040000080000000000,
+    'MASSPRODUCTION': 0x4000042004000050000008000800090020000900000040048000900020000480000002004000022004000000440000000800800008800400000a0000002000,
+    'MASSSTORAGE': 0x20000000000000000000000040000000000000000000000004000000000000000000000000002000000000000000000000000020000,
+    'MOBILE': 0x790001d5fe00b007fc01f7b98e00307ff40002ffc00bb763c40107fff000097ff802bddb7c40044ffc4000421bffa005f76cb880423ffe005841ffe0c5ddcc,
+    'MOBILESONAR': 0x10000000000000000000000000000000400000000000000040000000000000000000000004000000000000000000000000000800000000000000000000000,
+    'NAVAL': 0x100008a8800002b00000350000180144002803000009802040c008940028110200018a000403044200000281128000022802080a000c8000540c800000a80,
+    'NAVALCARRIER': 0x800000000000000000000000100000000000000000000000800000000000000000000000400000000000000000000020000000000000000000000000,
+    'NEEDMOBILEBUILD': 0x3900000000000000000000000600000004000000000000034400000000000000000000003c4000000000000000000000000028800000000000000000000000,
+    'NOFORMATION': 0x180000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000,
+    'NOMADS': 0x7fffffffffffffffffffffffe00000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000,
+    'NUKE': 0x101000000000000000000000101000040000000000000000008000004000000000000000000400002000000000000000000000100020080000000000000000,
+    'NUKESUB': 0x4000000000000000000000004000000000000000000000000000000000000000000000000000080000000000000000,
+    'OMNI': 0x20000002000000000000000008000000000000000000000080000000000000000000000008000000000000000000000000011000000000000000000000000,
+    'OPTICS': 0x100000000000000000000000010000000000000000000000000000000000000000000000000000,
+    'ORBITALSYSTEM': 0x40000000000000000000000000,
+    'OVERLAYANTIAIR': 0x3002018580011002104001200604003c400800e081028401002100b000080142102088103800844d800001000380808120402804422340008801c082010900,
+    'OVERLAYANTINAVY': 0x2000000800010000000014010001002001003000000000010001020400080180100006000020000380100020028800000800100000804000080,
+    'OVERLAYCOUNTERINTEL': 0x8000000040000000000000000000000800000000000000000000000800000000000000084000000004000210000000000000000200048000000040000800,
+    'OVERLAYDEFENSE': 0xe000800070000008000000006020044190003000001002070000090180091020001000103800445000f00011280000000088604000c0184000c800000000,
+    'OVERLAYDIRECTFIRE': 0x58000100d400c003e02132880c0000272004009e00809302c0010205a00401158010144878000404d400008003750041730088024208e4002001f541004cc0,
+    'OVERLAYINDIRECTFIRE': 0x400c0040080c2002000081000808101100600220000800080040004840600008000200000c02000220000c0008000004000180080014080610008000040000,
+    'OVERLAYMISC': 0x80000000000200000000000010000000002000000100000080000000000400000001000040003800000100100000002a000000010000000010000000,
+    'OVERLAYOMNI': 0x42000000240000000000000008800000a000000000000000c80000022000000000000000408000000c00000000000000000091000000140000000000000000,
+    'OVERLAYRADAR': 0x2000090a08000031800060940800054820000308800a1430800048b020001100100110a0080004c0801000011208200242831000020d0200000c0c000184a,
+    'OVERLAYSONAR': 0x1000080a90200034080021500000014c4100031120090430400018944100110624010821841004428020200112a0500220820800000c8410000ca040008a8,
+    'PATROLHELPER': 0x40000000060000000c000000880000003000000040000020800000043000000008000001400000000478000000002000000480000000060000000060000004,
+    'PERSONALSHIELD': 0x1000000040000000000000000000000000000000000000000000000000000200000000000000000,
+    'POD': 0xc00000,
+    'PODSTAGINGPLATFORM': 0x82000000050000000000000000,
+    'PRODUCTDL': 0x200000000000000000000002100000002000000000000000008000000000018000000000000001000000000180000000,
+    'PRODUCTFA': 0x1fffffdffffffffffffffffc1001010880000001300000001101040043b8004010084000400052024018810000400840000000,
+    'PRODUCTSC1': 0x3effefce77fffffdecfffffffeefefbff3c47ffbfeff63fffbfffadfdbfe67effffbff63f3fffff,
+    'RADAR': 0x2000010a080000310000208400000008200000008008100000000020200000001001000000000000801000000000200202020000000102000000000000842,
+    'RALLYPOINT': 0x4005a0a00000ba8000000422101c6800002f40000000890200e68000002f20000000024820039900380002da000400000924400b540000005b40000000211,
+    'RECLAIM': 0x40000000060000000c000000880000003000000040000020800000043000000008000001400000000478000000002000000480000000060000000060c00004,
+    'RECLAIMABLE': 0x17fe7ffffbfffffffffffffff7ffffffdfffffffffffffff7fffffffdfffffffffffffffbffffffffbffffffffffffffffff7ffffffffbffffffffffffffff,
+    'REPAIR': 0x40000000060000000c000000880000003000000040000020800000043000000008000001400000000478000001002000100480000000060000000060c00004,
+    'RESEARCH': 0x12020000028800000000000084800000a40000000000000448000000a20000000000000011100000000920000000000000002440000001240000000000,
+    'RULEUTL_ADVANCED': 0x1fffffffe000000000000000fffffffc0000000000010000ffffbfff800000000000020003fffffbffff00000000000000001fffff7ffe0000000,
+    'RULEUTL_BASIC': 0x1ffffffe0000000000000003ffffff0040000000000040007ffffff800000000000000040000ffffffe4000000000000008001fffffff,
+    'RULEUTL_EXPERIMENTAL': 0x7800000000000000000000001e000000000000000000000fc000000000000000000000007c00000000000000000000000001a8000000000000000000000000,
+    'RULEUTL_SECRET': 0x7fffffffe0000000000000001fffffff0000000000000003bffeffff00000000000000003ffffdfffc0000000000000000017fffffffe0000000000000000,
+    'SATELLITE': 0x10000000000000000000000000,
+    'SCOUT': 0x900000000800000000000014000000002000000000000000a000000000800000000000000002800000000100000000000000048,
+    'SCUFACTORY': 0x40000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000,
+    'SELECTABLE': 0x7ffe7fffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffff,
+    'SERAPHIM': 0x1ffffffffffffffffffffff0000000000000000000000000000000000000000000000000000000000000000000000000000000,
+    'SHIELD': 0xc000000060000000000000004020000100000000000000020000000100080080000000001800000000e00000000000000000404000001040400000000000,
+    'SHOWATTACKRETICLE': 0x101c0050800c0000000004001e181054206000208000200380c0044840600020000001006406000a20000c4000408000040180180024480600008180000000,
+    'SHOWQUEUE': 0x44005a8a07800bb804000846e901c6903602f500580048b3a00e68803602f2800b000225d21839d007fbe02da40066000896ee00b540076005b60060802237,
+    'SILO': 0x503000000808200000000000183000042040020000000000018000004040000800000000002400002000080008000000000080300010080410008000000000,
+    'SIZE12': 0xd004000060040002080000105008000901000020200004028080000901000004040000011c02000004e01000001010000000520800009002000010100000,
+    'SIZE16': 0x87a0a00000ba800000042200bc6800002f40000000890005e68000002f20000000024800279900000002da000000000930009b540000005b40000000211,
+    'SIZE20': 0x40000000000000000000000010000000000000000000008300000000000000000000000020000000000000000000000000004000000000000000000000000,
+    'SIZE4': 0x3020020019f405000f608044084010002fc09001bd440000820100006fc0480037942000081802000031f80440007ea080001040080006fa00a00072a2022,
+    'SIZE8': 0x2400000000000000000000002000000000000000000000010000000000000000000000002000000000000000000000000000200000000000000000000000,
+    'SNIPEMODE': 0x7800000000000000000000000e081046403402b58288b00bc0410749c034005c605211c07c03040e200006800b6a81446701b80a4234c8033001ea85041c80,
+    'SNIPER': 0x20000000000000000000000008000000000000000100000000000000000000000000000000000000000000000000000,
+    'SONAR': 0x10000008902000340800204000000000400000010008000040000000400000002001000184000000802000000000400200000800000104000000000000820,
+    'SORTCONSTRUCTION': 0x5a0a00000ba8000000422001c6800002f40000000890000e68000002f20000000024800039900038002da000000000924200b540010005b40000000211,
+    'SORTDEFENSE': 0xe200000073400001e0000000640000019c00000780000003200000019c000000f00000003980000000f380000009c00000006600000019a000000f000000,
+    'SORTECONOMY': 0x242000000450001e08000002090000010900007440000010900000010480000d420000004220000000104400003a0800000108800000020a00003a2000,
+    'SORTINTEL': 0x30000000180000000000004408000000e000000180000001c0000000e0000000300000001c00000000700000000060000000180000000e000000000000022,
+    'SORTSTRATEGIC': 0x41c0000000c00000200000011180000006000002000000020c0000000600000040000000206000000000c0000001000000004180000000600000010000000,
+    'SPECIALHIGHPRI': 0x1000000000000000000000000000000000000000000000000000000000000000000000000000000,
+    'SPECIALLOWPRI': 0x40000000000000000000000004000000000000000000000000002000000000000000000000000020000,
+    'STATIONASSISTPOD': 0x38000000000000000000000000000000000000800000,
+    'STEALTH': 0x10000000000100000000000010000000000000000100090800020000000000000000000000000100000000000000,
+    'STEALTHFIELD': 0x800000000000000000000000800000000000000080000000004000210000000000000000000008000000000000000,
+    'STRATEGIC': 0x180000000c00000200000010180000006000002000000800c0000000600000040000000006000000000c0000001000000100180000000600000010000000,
+    'STRATEGICBOMBER': 0x400000000000000000000004000000000000000000000000080000000000000000000000000020000000000000000000,
+    'STRUCTURE': 0x6fe7e2a01ff4ff803fe084671ffcf800bfffd003ff4489c3bfef8000ffff68007fd422483bffbb003bfffbde4005ffa0893477fbdc001ffa7be001f3a2233,
+    'SUBCOMMANDER': 0x400000000000000000000002000000000000000000000002000000000000000000000000400000000000000000000000000040000000000000000,
+    'SUBMERSIBLE': 0x800000000000010000000004400001000001002000000004000000020000080000100002000000000080000020020000000080000000000000080,
+    'SUPPORTFACTORY': 0x48080000092000000000000142000002500000000000000a20000002500000000000000028800000002480000000000000009100000004900000000000,
+    'T1SUBMARINE': 0x10000000000000000000001000000000000000000000000080000000000000000000000000020000000000000000000000000080,
+    'T2SUBMARINE': 0x20000000000000000000000000080000000000000000000000000000000000,
+    'T3SUBMARINE': 0x800000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000,
+    'TACTICALMISSILEPLATFORM': 0x8000000000000000000000040000000000000000000000040000000000000000000000000080000000000000000000000000400000000000000,
+    'TANK': 0x50008000a0001000000000010000000800000200000002000000000180000400000000000000000000140000000000000000000000001400004000,
+    'TARGETCHASER': 0x1000000000000000000000000000000000000000000000000000000000000000000000000000000,
+    'TECH1': 0x3ffffffe0000000000000003ffffff0000000000000000007ffffff800000000000000000001ffffffe0000000000000000001fffffff,
+    'TECH2': 0x1fffffffc000000000000000fffffffc0000000000000000ffffffff800000000000000003fffffffffe00000000000000001ffffffffe0000000,
+    'TECH3': 0x7fe7ffffe0000000000000001fffffff0000000000000003ffffffff00000000000000003ffffffffc0000000000000000007fffffffe0000000000000000,
+    'TRANSPORTABLEEXP': 0x180000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000,
+    'TRANSPORTATION': 0x200000000000000400004000000000000000008000010000000000000000004000002000000000000000000002000000800000004000000000012000008000,
+    'TRANSPORTBUILTBYTIER1FACTORY': 0x4000000000000000000000010000000000000000000000002000000000000000000000000000800000000000000000000000008000,
+    'TRANSPORTBUILTBYTIER2FACTORY': 0x400004000000000000000008000010000000000000000006000002000000000000000000002000000800000000000000000010000008000,
+    'TRANSPORTBUILTBYTIER3FACTORY': 0x400004000000000000000008000010000000000000000006000002000000000000000000002000000800000004000000000010000008000,
+    'TRANSPORTFOCUS': 0x200000000000000400004000000000000000008000010000000000000000004000002000000000000000000002000000800000004000000000012000008000,
+    'UEF': 0x1ffffffffffffffffffffffffff,
+    'UNSTUNABLE': 0x200000000000000001000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000,
+    'UNTARGETABLE': 0x180000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000010000000000000000000000000,
+    'USEBUILDPRESETS': 0x400000000000000000000002000000000000000000000002000000000000000000000000400000000000000000000000000040000000000000000,
+    'VERIFYMISSILEUI': 0x80000002000000000000000000000000000000000000000000000000000000000000000000080000000000000000000000000,
+    'VISIBLETORECON': 0x7fffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffff,
+    'VOLATILE': 0x101208000001080000500004009080000001040000090000000442000000001040000028000000110800000002080000280000,
+    'WALL': 0x1000000000000000000000004000000000000000000000000800000000000000000000000000800000000000000000000000008000000,
+}
@@ -1,4 +1,11 @@
-from littletable import Table
+"""Unit database and a category index over it.
+
+The index maps every category to a bitset of unit indices. It's precompiled
+from _UNITS into unitindex.py (regenerate it with `python -m fafalytics.units`
+whenever _UNITS changes), loaded lazily and kept in memory."""
+import functools
+import json
+import os
 
 # data from https://faforever.github.io/spooky-db/data/65d4329c.index.json
 _VERSION = 3719
@@ -507,15 +514,75 @@ _UNITS = """
 {"id": "xna0401", "name": "Atlas", "faction": "Nomads", "tech": 4, "dimension": "air", "structure": false, "mobile": true, "description": "Experimental Air Transport", "categories": "SELECTABLE BUILTBYTIER3ENGINEER BUILTBYTIER3COMMANDER NOMADS DRAGBUILD MOBILE AIR NEEDMOBILEBUILD EXPERIMENTAL TRANSPORTATION TRANSPORTFOCUS CANTRANSPORTCOMMANDER ANTIAIR VISIBLETORECON OVERLAYANTIAIR CANNOTUSEAIRSTAGING UNSTUNABLE CQUEMOV SNIPEMODE RULEUTL_Experimental"}
 {"id": "xnl0001", "name": null, "faction": "Nomads", "tech": null, "dimension": "land", "structure": false, "mobile": true, "description": "Armored Command Unit", "categories": "SELECTABLE NOMADS MOBILE ECONOMIC COMMAND MASSPRODUCTION MASSFABRICATION ENERGYPRODUCTION REPAIR ENGINEER CONSTRUCTION RECLAIM CAPTURE DIRECTFIRE LAND VISIBLETORECON PATROLHELPER SILO SHOWQUEUE OVERLAYDIRECTFIRE OVERLAYINDIRECTFIRE OVERLAYOMNI ABILITYBUTTON SNIPEMODE RULEUTL_Experimental"}
 """
-units = Table('units')
-units.json_import(_UNITS)
-units.create_index('id', unique=True)
-units.create_search_index("categories")
+
+class CategoryIndex:
+    def __init__(self, ids, categories):
+        self.ids = ids
+        self.categories = categories
+        self.everything = (1 << len(ids)) - 1
+    @classmethod
+    def from_json(cls, lines):
+        ids = []
+        categories = {}
+        for index, line in enumerate(lines.strip().splitlines()):
+            unit = json.loads(line)
+            ids.append(unit['id'])
+            for category in unit['categories'].upper().split():
+                categories[category] = categories.get(category, 0) | (1 << index)
+        return cls(tuple(ids), categories)
+    def query(self, expression):
+        "Unit ids matching all categories in expression, except those prefixed with '-'"
+        bits = self.everything
+        for category in expression.upper().split():
+            if category.startswith('-'):
+                bits &= ~self.categories.get(category[1:], 0)
+            else:
+                bits &= self.categories.get(category, 0)
+        result = []
+        while bits:
+            lowest = bits & -bits
+            result.append(self.ids[lowest.bit_length() - 1])
+            bits ^= lowest
+        return frozenset(result)
+    def to_module(self):
+        "Python source of a module with the index, for loading it without parsing _UNITS"
+        lines = ['# generated by `python -m fafalytics.units` from units._UNITS; do not edit',
+                 'VERSION = %d' % _VERSION, 'IDS = %r' % (self.ids,), 'CATEGORIES = {']
+        lines += ['    %r: %#x,' % (category, bits) for category, bits in sorted(self.categories.items())]
+        return '\n'.join(lines + ['}', ''])
+
+INDEX_MODULE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'unitindex.py')
+
+@functools.cache
+def category_index():
+    from . import unitindex
+    if unitindex.VERSION != _VERSION:
+        # _UNITS was updated but unitindex.py wasn't regenerated
+        return CategoryIndex.from_json(_UNITS)
+    return CategoryIndex(unitindex.IDS, unitindex.CATEGORIES)
 
 def id_by_categories(categories):
-    fmt = lambda c: ('-'+c if c.startswith('-') else '++'+c).upper()
-    query = " ".join(fmt(c) for c in categories.split())
-    return frozenset(unit.id for unit, score in units.search.categories(query))
+    return category_index().query(categories)
+
+@functools.cache
+def units_table():
+    "A littletable Table of all units, for interactive exploration"
+    from littletable import Table
+    units = Table('units')
+    units.json_import(_UNITS)
+    units.create_index('id', unique=True)
+    return units
 
 def id_to_units(ids):
-    return units.where(id=Table.is_in(ids))
+    from littletable import Table
+    return units_table().where(id=Table.is_in(ids))
+
+def __getattr__(name):
+    # `units` used to be built at import time; keep it available, lazily
+    if name == 'units':
+        return units_table()
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+if __name__ == '__main__':
+    with open(INDEX_MODULE, 'w') as handle:
+        handle.write(CategoryIndex.from_json(_UNITS).to_module())
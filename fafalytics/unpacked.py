@@ -0,0 +1,90 @@
+"""Unpacked replays: pre-parsed replays stored so they can be read back zero-copy.
+
+    magic | version | header length | header | padding | column | padding | column ...
+
+The header is msgpack holding everything but the commands (the 'json', 'binary'
+and 'remaining' sections) plus a table of contents for the columns. Each
+column is one field of a COMMAND_DTYPE array, stored contiguously and aligned
+to ALIGNMENT bytes, so reading is an mmap and a numpy.frombuffer per column.
+"""
+import mmap
+import struct
+
+import msgpack
+import numpy
+
+MAGIC = b'FAFU'
+VERSION = 1
+EXTENSION = '.unpacked'
+ALIGNMENT = 64
+PREAMBLE = struct.Struct('<4sBI')
+# msgpack has no tuple type; the parser's output has tuples, so keep them as such
+TUPLE_EXT = 1
+
+def align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+def encode_tuple(obj):
+    if isinstance(obj, tuple):
+        return msgpack.ExtType(TUPLE_EXT, pack(list(obj)))
+    raise TypeError('cannot serialize %r' % (obj,))
+
+def decode_tuple(code, data):
+    if code != TUPLE_EXT:
+        return msgpack.ExtType(code, data)
+    return tuple(unpack(data))
+
+def pack(obj):
+    return msgpack.packb(obj, use_bin_type=True, strict_types=True, default=encode_tuple)
+
+def unpack(data):
+    # the replay's binary header has maps keyed by floats
+    return msgpack.unpackb(data, raw=False, strict_map_key=False, ext_hook=decode_tuple)
+
+def write(filename, obj):
+    "Writes a parsed replay whose commands are under 'columns' (a COMMAND_DTYPE array or a dict of arrays)"
+    obj = dict(obj)
+    columns = obj.pop('columns')
+    names = columns.dtype.names if hasattr(columns, 'dtype') else tuple(columns)
+    arrays = [numpy.ascontiguousarray(columns[name]) for name in names]
+    toc, size = [], 0
+    for name, array in zip(names, arrays):
+        toc.append((name, array.dtype.str, size, len(array)))
+        size = align(size + array.nbytes)
+    obj['columns'] = toc
+    header = pack(obj)
+    start = align(PREAMBLE.size + len(header))
+    with open(filename, 'wb') as handle:
+        handle.write(PREAMBLE.pack(MAGIC, VERSION, len(header)))
+        handle.write(header)
+        for (name, dtype, offset, length), array in zip(toc, arrays):
+            handle.seek(start + offset)
+            handle.write(array.tobytes())
+        # pad the last column too, so every offset (even of empty columns) is within the file
+        handle.truncate(start + size)
+
+def read_preamble(handle):
+    magic, version, length = PREAMBLE.unpack(handle.read(PREAMBLE.size))
+    if magic != MAGIC:
+        raise ValueError('%s is not an unpacked replay' % handle.name)
+    if version != VERSION:
+        raise ValueError('unknown unpacked replay version %s' % version)
+    return length
+
+def read_header(filename):
+    "Reads everything but the commands, leaving the column table of contents under 'columns'"
+    with open(filename, 'rb') as handle:
+        return unpack(handle.read(read_preamble(handle)))
+
+def read(filename):
+    "Reads an unpacked replay; 'columns' is a dict of read-only arrays backed by an mmap of the file"
+    with open(filename, 'rb') as handle:
+        length = read_preamble(handle)
+        obj = unpack(handle.read(length))
+        start = align(PREAMBLE.size + length)
+        buf = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    obj['columns'] = {
+        name: numpy.frombuffer(buf, dtype=dtype, count=length, offset=start+offset)
+        for name, dtype, offset, length in obj['columns']
+    }
+    return obj
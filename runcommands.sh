@@ -4,9 +4,16 @@ alias redis='redis-cli -s /tmp/.fafalytics.d/redis.sock'
 function newfafa {
     local data_dir="${1:-../data-dumps/dump-01}"
     [ -d $data_dir ] || { echo missing $data_dir ; return 1 ; }
-    fafalytics datastore restart
+    # the datastore keeps its data across restarts; start afresh when loading another dump
+    local loaded=/tmp/.fafalytics.d/data-dir
+    if [ "$(cat $loaded 2>/dev/null)" = "$(realpath $data_dir)" ] ; then
+        fafalytics datastore restart
+    else
+        fafalytics datastore restart --flush
+    fi
+    realpath $data_dir > $loaded
     fafalytics load $data_dir/jsons/*
-    fafalytics extract --max-errors 0 $data_dir/unpacked/*
+    fafalytics extract --incremental --max-errors 0 $data_dir/unpacked/*
     fafalytics export --format=parquet /tmp/fafatest.parquet curated
 }
 function bigfafa {
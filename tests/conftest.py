@@ -0,0 +1,48 @@
+import os
+import shutil
+
+import pytest
+import psutil
+
+from fafalytics import storage
+import testutils
+
+def redis_store(tmpdir, shards=None):
+    expected_children = psutil.Process().children()
+    assert shutil.which(storage.REDIS_BINARY) is not None, \
+        "can't find %s in PATH; apt install redis-server?" % storage.REDIS_BINARY
+    print(tmpdir)
+    storage.configure(tmpdir)
+    os.chdir(tmpdir)
+    storage.start_store(shards=shards)
+    yield
+    storage.get_client.cache_clear()
+    storage.get_codec.cache_clear()
+    storage.stop_store()
+    assert psutil.Process().children() == expected_children, "unexpected child processes; leaking redis instances?"
+
+@pytest.fixture
+def redis(tmpdir):
+    yield from redis_store(tmpdir)
+
+@pytest.fixture
+def sharded(tmpdir):
+    yield from redis_store(tmpdir, shards=3)
+
+@pytest.fixture
+def fake_api():
+    with testutils.FakeAPI(total_records=95) as server:
+        yield server
+
+@pytest.fixture
+def sqlite(tmpdir):
+    storage.configure(tmpdir, backend='sqlite')
+    yield
+    storage.get_client.cache_clear()
+    storage.get_codec.cache_clear()
+
+@pytest.fixture(params=storage.BACKENDS + ('sharded',))
+def client(request):
+    # the same assertions hold for redis, sqlite and sharded redis
+    request.getfixturevalue(request.param)
+    return storage.get_client()
@@ -0,0 +1,40 @@
+import subprocess
+import sys
+
+import pytest
+
+# modules only the heavier subcommands need; lightweight ones must not import them
+HEAVY_MODULES = ('pandas', 'pyarrow', 'numpy', 'replay_parser', 'littletable', 'requests', 'shapely', 'querycolumns')
+# summed `python -X importtime` self times; the eager CLI took ~0.9s, lazy ~0.25s
+IMPORT_BUDGET = 0.5
+
+def import_times(*args):
+    command = [sys.executable, '-X', 'importtime', '-c', 'import fafalytics; fafalytics.main()', '--loggers', 'console'] + list(args)
+    process = subprocess.run(command, capture_output=True, text=True)
+    assert process.returncode == 0, process.stderr
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        times[module.strip()] = int(self_us) / 10**6
+    return times
+
+@pytest.mark.parametrize('args', [('datastore', '--help'), ('log', '--help'), ('datastore', 'stop', '--help')])
+def test_lightweight_subcommand_imports(args):
+    times = import_times(*args)
+    heavy = sorted(module for module in times if module.split('.')[0] in HEAVY_MODULES)
+    assert not heavy
+    assert sum(times.values()) < IMPORT_BUDGET
+
+def test_lazy_subcommands_resolve():
+    from fafalytics import main, COMMANDS
+    assert main.list_commands(None) == sorted(COMMANDS)
+    assert main.get_command(None, 'log').name == 'log'
+    assert main.get_command(None, 'no-such-command') is None
+
+def test_pool_options_are_validated():
+    from click.testing import CliRunner
+    from fafalytics import main
+    assert CliRunner().invoke(main, ['--pool-timeout', '-1', 'log', '--help']).exit_code == 2
+    assert CliRunner().invoke(main, ['--pool-size', '0', 'log', '--help']).exit_code == 2
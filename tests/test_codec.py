@@ -0,0 +1,51 @@
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from fafalytics import codec, storage
+from fafalytics.manyfiles import datastore
+from fafalytics.storage import get_client, get_codec
+
+OBJ = {'id': '1', 'armies': {0: {'Human': True}, 1.5: None}, 'ticks': (1, 2), 'name': 'ünicode', 'rating': 1234.5}
+# what any codec decodes OBJ to; the same as JSON would
+DECODED = json.loads(json.dumps(OBJ))
+
+@pytest.mark.parametrize('name', codec.CODECS)
+def test_roundtrip(name):
+    assert codec.Codec(name).decode(codec.Codec(name).encode(OBJ)) == DECODED
+
+def test_decodes_any_codec():
+    decoder = codec.Codec('json')
+    for name in codec.CODECS:
+        assert decoder.decode(codec.Codec(name).encode(OBJ)) == DECODED
+    assert decoder.decode(json.dumps(OBJ).encode()) == DECODED
+
+def test_dictionary():
+    objs = [dict(OBJ, id=str(index), rating=index*1.5) for index in range(1000)]
+    dictionary = codec.train_dictionary(objs, 4096)
+    encoder = codec.Codec(dictionary=dictionary.as_bytes())
+    value = encoder.encode(objs[0])
+    assert len(value) < len(codec.Codec().encode(objs[0]))
+    assert codec.Codec(load_dictionary={dictionary.dict_id(): dictionary.as_bytes()}.get).decode(value) == json.loads(json.dumps(objs[0]))
+    with pytest.raises(ValueError):
+        codec.Codec().decode(value)
+
+def test_datastore_codec(redis):
+    datastore('load', [{'id': 1, 'value': 'old'}])
+    runner = CliRunner()
+    assert runner.invoke(storage.datastore, ['codec']).output.strip() == codec.DEFAULT_CODEC
+    assert runner.invoke(storage.datastore, ['codec', 'json']).exit_code == 0
+    get_codec.cache_clear()
+    datastore('load', [{'id': 2, 'value': 'legacy'}])
+    assert get_client().hget('load', 2) == b'{"id": 2, "value": "legacy"}'
+    datastore('load', [{'id': game_id, 'map': 'Open Palms', 'players': [game_id, game_id+1]} for game_id in range(3, 1000)])
+    result = runner.invoke(storage.datastore, ['train-codec', '--size', '4096', 'load'])
+    assert result.exit_code == 0, result.output
+    get_codec.cache_clear()
+    datastore('load', [{'id': 1000, 'map': 'Open Palms', 'players': [1000, 1001]}])
+    assert get_client().hget('load', 1000).startswith(codec.TAG_MSGPACK_ZSTD)
+    # a fresh process finds the dictionary in the datastore
+    decoder = codec.Codec.from_datastore(get_client())
+    values = dict(zip((1, 2, 1000), get_client().hmget('load', [1, 2, 1000])))
+    assert {key: decoder.decode(value)['id'] for key, value in values.items()} == {1: 1, 2: 2, 1000: 1000}
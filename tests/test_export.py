@@ -0,0 +1,89 @@
+import testutils
+
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+from click.testing import CliRunner
+
+from fafalytics import exports, loader
+from fafalytics.extractors import extract_replay, extract_key, extractor_key, find_stale, filter_extracted, APM, EXTRACTORS
+from fafalytics.manyfiles import datastore
+from fafalytics.storage import get_client
+
+def test_stream_writer_conforms_chunks(tmpdir):
+    outfile = str(tmpdir / 'out.parquet')
+    schema = pa.schema([('a', pa.int64()), ('b', pa.float64()), ('c', pa.timestamp('us')), ('id', pa.string())])
+    with exports.ParquetStreamWriter(outfile, schema) as writer:
+        # nulls in the first chunk don't decide the type of later values
+        writer.write(exports.to_dataframe([{'id': '1', 'a': 1, 'b': None}]))
+        writer.write(exports.to_dataframe([{'id': '2', 'b': 2.5, 'c': datetime(2021, 1, 1)}]))
+        with pytest.raises(exports.UnknownColumns):
+            writer.write(exports.to_dataframe([{'id': '3', 'd': 'unknown'}]))
+    df = pd.read_parquet(outfile)
+    assert list(df.columns) == ['a', 'b', 'c']
+    assert df.loc['2', 'b'] == 2.5
+    assert df.loc['2', 'c'] == datetime(2021, 1, 1)
+    assert pd.isna(df.loc['2', 'a'])
+
+def test_curated_schema_covers_structure():
+    assert set(exports.BASE_TYPES) == set(exports.BASE_STRUCTURE) - {'id', 'features'}
+    assert set(exports.PLAYER_TYPES) == set(exports.PLAYER_STRUCTURE)
+    assert exports.curated_schema().names[-1] == 'id'
+
+def test_flattened_export_cant_stream(redis, tmpdir):
+    result = CliRunner().invoke(exports.export, ['--stream', str(tmpdir / 'out.parquet'), 'flattened'])
+    assert result.exit_code == 2
+    assert "flattened exports can't stream" in result.output
+
+def test_export_rejects_empty_chunks(redis, tmpdir):
+    result = CliRunner().invoke(exports.export, ['--chunk-size', '0', str(tmpdir / 'out.csv'), 'curated'])
+    assert result.exit_code == 2, result.output
+    assert not tmpdir.join('out.csv').exists()
+
+def test_export_stream_matches_in_memory(redis, tmpdir):
+    with open(testutils.testdata / 'dump.json', 'rb') as handle:
+        datastore('load', list(loader.GameJsonResolver.from_handle(handle)))
+    for prefix, obj in extract_replay(str(testutils.testdata / '14395949.fafreplay')):
+        datastore(prefix, [obj])
+    runner = CliRunner()
+    frames = []
+    for mode in ('--stream', '--no-stream'):
+        outfile = str(tmpdir / ('export%s.parquet' % mode))
+        result = runner.invoke(exports.export, [mode, '--chunk-size', '1', outfile, 'curated'], catch_exceptions=False)
+        assert result.exit_code == 0, result.output
+        frames.append(pd.read_parquet(outfile))
+    streamed, in_memory = frames
+    assert len(streamed) == len(in_memory) == 1
+    # a streamed export has every column of the schema, including features this game doesn't have
+    assert set(in_memory.columns) <= set(streamed.columns)
+    assert streamed.drop(columns=in_memory.columns).isna().values.all()
+    # features are all float when streamed, so compare values only
+    pd.testing.assert_frame_equal(streamed[in_memory.columns], in_memory, check_dtype=False)
+
+def test_export_merges_current_extractor_versions(redis):
+    datastore('load', [{'id': 1}])
+    datastore('extract', [{'id': 1, 'extracted': {'player1.mean_apm': {'overall': 1}, 'stale': True}}])
+    datastore(extractor_key(APM), [{'id': 1, 'extracted': {'player1.mean_apm': {'overall': 2}}}])
+    obj, = exports.yield_deserilized_values(get_client(), [b'1'])
+    assert obj['extract']['extracted'] == {'player1.mean_apm': {'overall': 2}, 'stale': True, 'horizon_ms': None}
+
+def test_horizon_extracts_are_kept_apart(redis):
+    replay = str(testutils.testdata / '14011691.pickle')
+    datastore('load', [{'id': 14011691}])
+    for prefix, obj in extract_replay(replay):
+        datastore(prefix, [obj])
+    outputs = extract_replay(replay, horizon_ms=60000)
+    assert [prefix for prefix, obj in outputs] == [extract_key(60000)] + [extractor_key(extractor, 60000) for extractor in EXTRACTORS]
+    # full extracts don't count as done for a horizon
+    assert find_stale([replay], horizon_ms=60000) == ([(replay, EXTRACTORS)], {})
+    assert filter_extracted([replay], extract_key(60000))[0] == [replay]
+    for prefix, obj in outputs:
+        datastore(prefix, [obj])
+    assert find_stale([replay], horizon_ms=60000) == ([], {'up to date': 1})
+    full, = exports.yield_deserilized_values(get_client(), [b'14011691'])
+    limited, = exports.yield_deserilized_values(get_client(), [b'14011691'], horizon_ms=60000)
+    assert full['extract']['extracted']['horizon_ms'] is None
+    assert limited['extract']['extracted']['horizon_ms'] == 60000
+    assert full['extract']['extracted']['player1.mean_apm.overall'] != limited['extract']['extracted']['player1.mean_apm.overall']
@@ -1,9 +1,13 @@
 import testutils
 from unittest import TestCase
 
+import numpy
+import pandas as pd
 import pytest
+from click.testing import CliRunner
 
-from fafalytics.extractors import first, apm, run_extractors
+from fafalytics.extractors import first, apm, commandmix, spatial, hull, run_extractors, run_vectorized_extractors, feature_names, EXTRACTORS, required_commands, filter_extracted, extract, extract_replay, extract_stale, extractor_key, find_stale
+from fafalytics.manyfiles import datastore
 from fafalytics.pyutils import Query as Q
 from fafalytics import parsing
 
@@ -12,12 +16,120 @@ def test_extract_time_to_first(replay_14395949):
     assert Q('player1/first/t1_land')(obj) == 9200
     assert Q('player1/first/t1_air')(obj) == None
 
+def test_time_to_first_register(replay_14011691):
+    class Custom(first.TimeToFirst):
+        pass
+    Custom.register('t1_radar', 'tech1 radar')
+    commands = replay_14011691['commands']
+    obj = run_extractors(commands, Custom())
+    assert Q('player1/first/t1_radar')(obj) == 19800
+    assert Q('player1/first/t1_land')(obj) == Q('player1/first/t1_land')(run_extractors(commands, first.TimeToFirst()))
+    assert run_vectorized_extractors(parsing.commands_to_columns(commands), Custom()) == obj
+    assert 't1_radar' not in first.TimeToFirst.FEATURES
+
+def test_time_to_first_at_offset_zero():
+    land = min(first.TimeToFirst.FEATURES['t1_land'])
+    air = min(first.TimeToFirst.FEATURES['t1_air'])
+    commands = [{'type': 'issue', 'offset_ms': offset, 'player': 0, 'cmd_data': {'blueprint_id': unit_id}}
+                for offset, unit_id in ((0, land), (100, air), (200, land))]
+    obj = run_extractors(commands, first.TimeToFirst())
+    assert Q('player1/first/t1_land')(obj) == 0
+    assert Q('player1/first/t1_air')(obj) == 100
+    assert run_vectorized_extractors(parsing.commands_to_columns(commands), first.TimeToFirst()) == obj
+
 def test_extract_actions_per_minute(replay_14395949):
     obj = run_extractors(replay_14395949['commands'], apm.APM({apm.Minute(3): 'first_3m', apm.Minute(5): 'first_5m'}))
     TestCase().assertAlmostEqual(Q('player1.mean_apm.overall')(obj), 16.6859, places=2)
     TestCase().assertAlmostEqual(Q('player2.mean_apm.overall')(obj), 23.5266, places=2)
 
+def test_incremental_hull():
+    points = [(0, 0), (4, 0), (1, 1), (4, 4), (2, 3), (0, 4), (2, 2), (4, 2)]
+    incremental = hull.IncrementalHull()
+    for point in points:
+        incremental.add(point)
+    batched = hull.IncrementalHull()
+    batched.extend(numpy.array(points[:3], dtype='f8'))
+    batched.extend(numpy.array(points[3:], dtype='f8'))
+    for h in (incremental, batched):
+        assert h.area == 16
+        assert sorted(h.vertices) == [(0, 0), (0, 4), (4, 0), (4, 4)]
+
+def test_spatial_windows(replay_14011691):
+    windows = {'2m': apm.Minute(2), '10m': apm.Minute(10)}
+    commands = replay_14011691['commands']
+    obj = run_extractors(commands, spatial.Spatial(512, 512, windows))
+    assert set(Q('player1.command_area/first')(obj)) == {'2m', '10m'}
+    assert 0 < Q('player1.command_area/first/2m')(obj) < Q('player1.command_area/first/10m')(obj)
+    vectorized = run_vectorized_extractors(parsing.commands_to_columns(commands), spatial.Spatial(512, 512, windows))
+    assert flatten(vectorized) == pytest.approx(flatten(obj))
+
+def all_extractors():
+    return (first.TimeToFirst(), apm.APM({apm.Minute(3): 'first_3m', apm.Minute(5): 'first_5m'}),
+            commandmix.CommandMix(), spatial.Spatial(512, 512))
+
+def flatten(obj, prefix=''):
+    if not isinstance(obj, dict):
+        return {prefix: obj}
+    return {key: value for k, v in obj.items() for key, value in flatten(v, '%s/%s' % (prefix, k)).items()}
+
+def test_columns_adapter(replay_14011691):
+    columns = parsing.commands_to_columns(replay_14011691['commands'])
+    expected = run_extractors(replay_14011691['commands'], *all_extractors())
+    assert run_extractors(parsing.columns_to_commands(columns), *all_extractors()) == expected
+
+@pytest.mark.parametrize('replay_fixture', ['replay_14011691', 'replay_14395949'])
+def test_vectorized_parity(replay_fixture, request):
+    commands = request.getfixturevalue(replay_fixture)['commands']
+    expected = flatten(run_extractors(commands, *all_extractors()))
+    actual = flatten(run_vectorized_extractors(parsing.commands_to_columns(commands), *all_extractors()))
+    assert actual == pytest.approx(expected)
+
+def test_feature_names(replay_14011691):
+    columns = parsing.commands_to_columns(replay_14011691['commands'])
+    extracted = pd.json_normalize(run_vectorized_extractors(columns, *all_extractors()))
+    assert set(extracted.columns) <= set(feature_names())
+
+@pytest.fixture
+def replay_14011691():
+    replay = testutils.testdata / '14011691.pickle'
+    return parsing.get_parsed(str(replay))
+
 @pytest.fixture
 def replay_14395949():
     replay = testutils.testdata / '14395949.fafreplay'
     return parsing.get_parsed(str(replay))
+
+def test_required_commands():
+    commands = required_commands(EXTRACTORS)
+    assert commands == {'issue', 'factory_issue', 'command_count_increase', 'command_count_decrease'}
+    ids = parsing.parse_command_ids(commands)
+    assert [parsing.COMMAND_TYPES[i] for i in ids] == [
+        'advance', 'set_command_source', 'verify_checksum', 'issue', 'factory_issue',
+        'command_count_increase', 'command_count_decrease']
+
+def test_filter_extracted(redis, tmpdir):
+    datastore('extract', [{'id': 14011691}])
+    renamed = tmpdir / 'renamed.fafreplay'
+    testutils.testdata.join('14395949.fafreplay').copy(renamed)
+    infiles = [str(testutils.testdata / '14011691.fafreplay'), str(testutils.testdata / '14395949.fafreplay'),
+               str(renamed), str(testutils.testdata / '14011691.pickle'), str(tmpdir / 'unknown.pickle')]
+    remaining, skipped = filter_extracted(infiles, 'extract')
+    assert remaining == [infiles[1], infiles[4]]
+    assert skipped == {"already in 'extract'": 2, 'same game as an earlier file': 1}
+    result = CliRunner().invoke(extract, ['--incremental', '--output', 'print', infiles[0]], catch_exceptions=False)
+    assert result.exit_code == 0
+    assert "skipped: 1 already in 'extract'" in result.output
+
+def test_only_stale_extractors(redis, monkeypatch):
+    replay = str(testutils.testdata / '14011691.pickle')
+    outputs = extract_replay(replay)
+    assert [prefix for prefix, obj in outputs] == ['extract'] + [extractor_key(extractor) for extractor in EXTRACTORS]
+    for prefix, obj in outputs:
+        datastore(prefix, [obj])
+    assert find_stale([replay]) == ([], {'up to date': 1})
+    monkeypatch.setattr(spatial.Spatial, 'VERSION', spatial.Spatial.VERSION + 1)
+    stale, skipped = find_stale([replay])
+    assert stale == [(replay, (spatial.Spatial,))]
+    outputs = extract_stale(stale[0])
+    assert [prefix for prefix, obj in outputs] == ['extract', extractor_key(spatial.Spatial)]
+    assert set(outputs[1].obj['extracted']) == {'player1.command_area', 'player2.command_area'}
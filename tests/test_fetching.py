@@ -0,0 +1,139 @@
+import json
+import os
+
+import pytest
+from click.testing import CliRunner
+
+import testutils
+from fafalytics import fetching, loader
+from fafalytics.manyfiles import datastore
+from fafalytics.storage import get_client
+
+def fetch_games(fake_api, outdir, *args):
+    options = ['--api-base', fake_api.url, '--run-type', 'wet', '--rate', '1000', '--burst', '10', '--backoff', '0']
+    return CliRunner().invoke(fetching.games, options + list(args) + [str(outdir)])
+
+def test_checkpoint(tmpdir):
+    checkpoint = fetching.Checkpoint(str(tmpdir), 'query')
+    checkpoint.total_pages = 6
+    for page_number in (1, 3, 2, 5):
+        checkpoint.mark(page_number)
+    assert (checkpoint.contiguous, checkpoint.done) == (3, {5})
+    resumed = fetching.Checkpoint(str(tmpdir), 'query')
+    resumed.load()
+    assert resumed.missing(6) == [4, 6]
+
+def test_fetch_games_retries(fake_api, tmpdir):
+    fake_api.failures = {3: [429], 5: [503, 500]}
+    result = fetch_games(fake_api, tmpdir)
+    assert result.exit_code == 0, result.output
+    assert sorted(set(fake_api.requests)) == list(range(1, 11))
+    assert fake_api.requests.count(5) == 3
+    assert len(tmpdir.listdir('dump*.json')) == 10
+    assert json.loads(tmpdir.join('dump0010.json').read())['data'][-1]['id'] == '94'
+
+def test_fetch_games_sleep_interval(fake_api, tmpdir):
+    result = fetch_games(fake_api, tmpdir, '--sleep-interval', '0.001')
+    assert result.exit_code == 0, result.output
+    assert '--sleep-interval is deprecated; use --rate 1000' in result.output
+    assert len(tmpdir.listdir('dump*.json')) == 10
+
+@pytest.mark.parametrize('option', [('--rate', '0'), ('--rate', '-1'), ('--burst', '0'), ('--jobs', '0')])
+def test_fetch_games_rejects_invalid_options(fake_api, tmpdir, option):
+    result = fetch_games(fake_api, tmpdir, *option)
+    assert result.exit_code == 2, result.output
+    assert not fake_api.requests
+
+def test_fetch_games_resumes(fake_api, tmpdir):
+    fake_api.failures = {4: [500] * 3, 7: [502] * 3}
+    result = fetch_games(fake_api, tmpdir, '--retries', '1')
+    assert result.exit_code != 0
+    assert not tmpdir.join('dump0004.json').exists()
+    fake_api.requests.clear()
+    result = fetch_games(fake_api, tmpdir)
+    assert result.exit_code == 0, result.output
+    assert set(fake_api.requests) == {4, 7}
+    assert len(tmpdir.listdir('dump*.json')) == 10
+
+def test_fetch_games_rejects_other_query(fake_api, tmpdir):
+    assert fetch_games(fake_api, tmpdir, '--max-pages', '2').exit_code == 0
+    result = fetch_games(fake_api, tmpdir, '--sort', 'DESC')
+    assert result.exit_code != 0
+    assert 'different query' in result.output
+
+@pytest.fixture
+def fake_content(redis):
+    files = {'/replays/%d.fafreplay' % game_id: os.urandom(100000 + game_id) for game_id in range(10)}
+    with testutils.FakeContent(files) as server:
+        datastore('load', [{'id': game_id, 'replayUrl': server.url + path} for game_id, path in enumerate(files)])
+        yield server
+
+def fetch_replays(outdir, *args):
+    return CliRunner().invoke(fetching.replays, ['--backoff', '0'] + list(args) + [str(outdir)])
+
+def test_fetch_replays(fake_content, tmpdir):
+    fake_content.failures = {'/replays/3.fafreplay': [503]}
+    tmpdir.join('1.fafreplay').write_binary(fake_content.files['/replays/1.fafreplay'])
+    result = fetch_replays(tmpdir)
+    assert result.exit_code == 0, result.output
+    assert '/replays/1.fafreplay' not in fake_content.requests
+    assert fake_content.requests.count('/replays/3.fafreplay') == 2
+    for path, body in fake_content.files.items():
+        assert tmpdir.join(os.path.basename(path)).read_binary() == body
+    assert not tmpdir.listdir('*.part')
+
+def test_fetch_replays_rejects_no_jobs(fake_content, tmpdir):
+    result = fetch_replays(tmpdir, '--jobs', '0')
+    assert result.exit_code == 2, result.output
+    assert not fake_content.requests
+
+def test_fetch_replays_resumes_and_records_failures(fake_content, tmpdir):
+    fake_content.truncations = {'/replays/2.fafreplay': 70000}
+    fake_content.failures = {'/replays/5.fafreplay': [500] * 2}
+    result = fetch_replays(tmpdir, '--retries', '1')
+    assert result.exit_code != 0
+    # whatever was received in whole chunks is kept
+    assert tmpdir.join('2.fafreplay%s' % fetching.PART_SUFFIX).size() == fetching.DOWNLOAD_CHUNK_SIZE
+    failures = get_client().hgetall(fetching.FAILURES)
+    assert {key.decode().split('/')[-1] for key in failures} == {'2.fafreplay', '5.fafreplay'}
+    fake_content.requests.clear()
+    result = fetch_replays(tmpdir, '--only-failed')
+    assert result.exit_code == 0, result.output
+    assert sorted(fake_content.requests) == ['/replays/2.fafreplay', '/replays/5.fafreplay']
+    assert fake_content.ranges == [('/replays/2.fafreplay', 'bytes=%d-' % fetching.DOWNLOAD_CHUNK_SIZE)]
+    assert tmpdir.join('2.fafreplay').read_binary() == fake_content.files['/replays/2.fafreplay']
+    assert get_client().hlen(fetching.FAILURES) == 0
+
+def test_download_completes_renamed_part(fake_content, tmpdir):
+    filename = str(tmpdir.join('4.fafreplay'))
+    body = fake_content.files['/replays/4.fafreplay']
+    with open(filename + fetching.PART_SUFFIX, 'wb') as handle:
+        handle.write(body)
+    session = fetching.make_session(1, 0, 0)
+    assert fetching.download(session, fake_content.url + '/replays/4.fafreplay', filename, 10) == 0
+    assert tmpdir.join('4.fafreplay').read_binary() == body
+
+def test_replay_urls_uses_index(redis, tmpdir):
+    result = CliRunner().invoke(loader.load, ['--output', 'datastore', '--all-games', '--any-number-of-players',
+                                              '--featured-mod', '-1', str(testutils.testdata / 'dump.json')])
+    assert result.exit_code == 0, result.output
+    assert get_client().hlen(loader.REPLAY_URLS) == get_client().hlen('load') == 5
+    tmpdir.join('14395949.fafreplay').write('')
+    result = CliRunner().invoke(fetching.replay_urls, [str(tmpdir)])
+    assert result.exit_code == 0, result.output
+    urls = result.output.split()
+    assert len(urls) == 4
+    assert 'https://content.faforever.com/replays/0/14/39/58/14395861.fafreplay' in urls
+
+def test_index_replay_urls(redis):
+    datastore('load', [{'id': game_id, 'replayUrl': 'http://host/%d.fafreplay' % game_id} for game_id in range(3)] + [{'id': 3}])
+    datastore(loader.REPLAY_URLS, [{'id': 0, 'url': 'http://host/0.fafreplay'}])
+    assert loader.index_replay_urls(get_client()) == 3
+    assert sorted(basename for url, basename in fetching.known_replays(get_client())) == ['%d.fafreplay' % i for i in range(3)]
+
+def test_load_prints_only_games(tmpdir):
+    result = CliRunner().invoke(loader.load, ['--output', 'print', '--all-games', '--any-number-of-players',
+                                              '--featured-mod', '-1', str(testutils.testdata / 'dump.json')])
+    assert result.exit_code == 0, result.output
+    assert result.output.count("'replayUrl'") == 5
+    assert "'url'" not in result.output
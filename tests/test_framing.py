@@ -0,0 +1,32 @@
+import json
+import struct
+
+import pytest
+
+import testutils
+from fafalytics import framing
+from fafalytics.parsing import extract_v1
+
+@pytest.fixture
+def data_14011691():
+    with open(testutils.testdata / '14011691.fafreplay', 'rb') as handle:
+        assert json.loads(handle.readline()).get('version', 1) == 1
+        return extract_v1(handle.read())
+
+def test_body_offset(data_14011691):
+    # as reported by the replay parser
+    assert framing.body_offset(data_14011691) == 2213
+
+def test_scan_body(data_14011691):
+    offset = framing.body_offset(data_14011691)
+    assert framing.scan_body(data_14011691, offset) == (len(data_14011691), 26162)
+    end, ticks = framing.scan_body(data_14011691, offset, horizon_ticks=3000)
+    assert ticks == 26162
+    assert data_14011691[end] == framing.ADVANCE
+    kept, kept_ticks = framing.scan_body(data_14011691[:end], offset)
+    assert kept == end
+    assert kept_ticks <= 3000 < kept_ticks + struct.unpack_from('<I', data_14011691, end + 3)[0]
+
+def test_scan_body_corrupt():
+    with pytest.raises(ValueError):
+        framing.scan_body(b'\x00\x00\x00', 0)
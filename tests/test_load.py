@@ -1,6 +1,11 @@
 import testutils
 
+import functools
+
+from click.testing import CliRunner
+
 from fafalytics import loader
+from fafalytics.manyfiles import process_all_files
 from fafalytics.pyutils import Query as Q
 
 def load(path):
@@ -17,3 +22,19 @@ def test_load_zstd():
     games = load(testutils.testdata / 'dump.json.zst')
     game = games['14395861']
     assert Q('playerStats/0/id')(game) == '28030229'
+
+def test_load_files_in_parallel():
+    infiles = [str(testutils.testdata / 'dump.json'), str(testutils.testdata / 'dump.json.zst')] * 2
+    callback = functools.partial(loader.load_file, only_valid=False, only_1v1=False, featured_mod=-1)
+    serial = process_all_files(infiles, callback)
+    assert process_all_files(infiles, callback, jobs=2) == serial
+    assert all(games == serial[0] for games in serial)
+    assert '14395861' in {game['id'] for game in serial[0]}
+
+def test_load_fails_on_malformed_dump(tmpdir):
+    malformed = tmpdir / 'malformed.json'
+    malformed.write('{"data": []')
+    result = CliRunner().invoke(loader.load, ['--output', 'print', str(malformed)])
+    assert isinstance(result.exception, ValueError)
+    result = CliRunner().invoke(loader.load, ['--output', 'print', '--max-errors', '1', str(malformed)])
+    assert result.exit_code == 0
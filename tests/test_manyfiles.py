@@ -0,0 +1,43 @@
+import pytest
+
+from fafalytics.manyfiles import process_all_files, yields_outputs, datastore, Redirect
+from fafalytics.storage import get_client
+
+def square(number):
+    if number < 0:
+        raise ValueError(number)
+    return number * number
+
+def test_process_jobs_in_order():
+    numbers = range(50)
+    assert process_all_files(numbers, square, jobs=4) == tuple(square(n) for n in numbers)
+
+def test_max_errors_across_jobs():
+    numbers = [1, -1, 2, -2, 3]
+    assert process_all_files(numbers, square, max_errors=2, jobs=2) == (1, 4, 9)
+    with pytest.raises(ValueError):
+        process_all_files(numbers, square, max_errors=1, jobs=2)
+
+def test_datastore_output_counts(redis):
+    objs = [{'id': number} for number in range(3)]
+    assert datastore('test', objs[:2]) == {'new': 2, 'existing': 0}
+    assert datastore('test', objs) == {'new': 1, 'existing': 2}
+    assert get_client().hlen('test') == 3
+
+def test_yields_outputs_flushes_partial_batch(redis):
+    @yields_outputs
+    def test(output):
+        yield from ({'id': number} for number in range(5))
+        raise RuntimeError('flush what was yielded so far')
+    with pytest.raises(RuntimeError):
+        test(output='datastore', batch_size=2)
+    assert get_client().hlen('test') == 5
+
+def test_yields_outputs_redirect(redis):
+    @yields_outputs
+    def test(output):
+        for number in range(3):
+            yield {'id': number}
+            yield Redirect('other', {'id': number})
+    test(output='datastore', batch_size=2)
+    assert get_client().hlen('test') == get_client().hlen('other') == 3
@@ -1,6 +1,10 @@
-import testutils
+import json
+
+import numpy
+import pytest
 
-from fafalytics import parsing
+import testutils
+from fafalytics import parsing, unpacked
 from fafalytics.pyutils import Query as Q
 
 EXPECTED_KEYS = frozenset(('json', 'binary', 'commands', 'remaining'))
@@ -24,3 +28,79 @@ def test_parse_pickle():
     obj = parsing.get_parsed(str(replay))
     assert set(obj) == EXPECTED_KEYS
     assert Q('json/uid')(obj) == 14011691
+
+def test_parse_pickle_columnar():
+    replay = testutils.testdata / '14011691.pickle'
+    obj = parsing.get_parsed(str(replay), columnar=True)
+    assert set(obj) == EXPECTED_KEYS - {'commands'} | {'columns'}
+    columns = obj['columns']
+    assert columns.dtype == parsing.COMMAND_DTYPE
+    issues = columns[columns['type'] == parsing.COMMAND_TYPE_IDS['issue']]
+    assert issues[1]['blueprint_id'] == b'ueb0101'
+    assert issues[1]['x'] == 423.5
+
+def test_unpacked_roundtrip(tmpdir):
+    pickled = parsing.get_parsed(str(testutils.testdata / '14011691.pickle'), columnar=True)
+    filename = str(tmpdir / ('14011691' + unpacked.EXTENSION))
+    unpacked.write(filename, pickled)
+    obj = parsing.get_parsed(filename, columnar=True)
+    assert set(obj) == set(pickled)
+    for key in ('json', 'binary', 'remaining'):
+        assert obj[key] == pickled[key]
+    for name in parsing.COMMAND_DTYPE.names:
+        column = obj['columns'][name]
+        assert numpy.array_equal(column, pickled['columns'][name], equal_nan=column.dtype.kind == 'f')
+        assert column.ctypes.data % unpacked.ALIGNMENT == 0
+    assert unpacked.read_header(filename)['json'] == pickled['json']
+    commands = parsing.get_parsed(filename)['commands']
+    assert commands == list(parsing.columns_to_commands(pickled['columns']))
+
+def test_parse_pickle_horizon():
+    replay = str(testutils.testdata / '14011691.pickle')
+    obj = parsing.get_parsed(replay, columnar=True, horizon_ms=300000)
+    assert obj['columns']['offset_ms'].max() <= 300000
+    assert len(obj['columns']) < len(parsing.get_parsed(replay, columnar=True)['columns'])
+    assert Q('remaining/last_tick')(obj) == 26162
+
+@pytest.mark.parametrize('name', ['14011691', '14395949'])
+def test_iter_decompressed(name):
+    with open(testutils.testdata / (name + '.fafreplay'), 'rb') as handle:
+        version = json.loads(handle.readline()).get('version', 1)
+        position = handle.tell()
+        expected = (parsing.extract_v1 if version == 1 else parsing.extract_v2)(handle.read())
+        handle.seek(position)
+        chunks = list(parsing.iter_decompressed(handle, version, chunk_size=4096))
+    assert len(chunks) > 1
+    assert b''.join(chunks) == expected
+
+def test_read_headers():
+    replay = str(testutils.testdata / '14395949.fafreplay')
+    header, binary = parsing.read_headers(replay)
+    assert header['uid'] == 14395949
+    assert Q('armies/[1]/PlayerName')(binary) == 'SkyKeeper'
+    assert binary == parsing.get_parsed(replay)['binary']
+
+def test_decompress_reuses_buffer():
+    buffers = []
+    for name in ('14011691', '14011691', '14395949'):
+        with open(testutils.testdata / (name + '.fafreplay'), 'rb') as handle:
+            version = json.loads(handle.readline()).get('version', 1)
+            position = handle.tell()
+            expected = (parsing.extract_v1 if version == 1 else parsing.extract_v2)(handle.read())
+            handle.seek(position)
+            buffer = parsing.decompress(handle, version)
+        assert buffer == expected
+        buffers.append(buffer)
+    # the last replay is less than half the size of the first, so it's reallocated
+    assert buffers[0] is buffers[1]
+
+def test_decompress_caps_recorded_size(monkeypatch):
+    # a corrupt or hostile replay may claim any size
+    monkeypatch.setattr(parsing, 'decompressed_size', lambda handle, version: 2**64 - 1)
+    monkeypatch.setattr(parsing, 'MAX_SIZE_HINT', 1024)
+    with open(testutils.testdata / '14395949.fafreplay', 'rb') as handle:
+        version = json.loads(handle.readline()).get('version', 1)
+        position = handle.tell()
+        expected = (parsing.extract_v1 if version == 1 else parsing.extract_v2)(handle.read())
+        handle.seek(position)
+        assert parsing.decompress(handle, version) == expected
@@ -1,7 +1,11 @@
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+import click
 import pytest
 from unittest import TestCase
 
-from fafalytics.pyutils import negate, Query, restructure_dict, Literal
+from fafalytics.pyutils import negate, Query, restructure_dict, Literal, chunked, Duration, TokenBucket, locked_cache
 
 def test_negate():
     true = lambda: True
@@ -29,3 +33,41 @@ def test_restructure_dict():
     result = restructure_dict(src, queries)
     expected = {'shlaq': 'b', 'shliq': {'shlaq': 5}, 'shloq': 7}
     TestCase().assertDictEqual(expected, result)
+
+def test_chunked():
+    assert list(chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(chunked([], 2)) == []
+
+def test_duration():
+    duration = Duration()
+    assert duration.convert('10m', None, None) == 600000
+    assert duration.convert('1.5h', None, None) == 5400000
+    assert duration.convert('250ms', None, None) == 250
+    with pytest.raises(click.BadParameter):
+        duration.convert('10 minutes', None, None)
+
+def test_token_bucket():
+    now, sleeps = [0.0], []
+    bucket = TokenBucket(2, capacity=2, clock=lambda: now[0], sleep=sleeps.append)
+    for _ in range(4):
+        bucket.acquire()
+    assert sleeps == [0.5, 1.0]
+    now[0] = 10
+    bucket.acquire()
+    assert sleeps == [0.5, 1.0]
+    for rate in (0, -1):
+        with pytest.raises(ValueError):
+            TokenBucket(rate)
+
+def test_locked_cache():
+    calls = []
+    @locked_cache
+    def build():
+        calls.append(None)
+        time.sleep(0.05)
+        return object()
+    with ThreadPoolExecutor(8) as executor:
+        values = list(executor.map(lambda _: build(), range(8)))
+    assert len(calls) == 1 and len(set(map(id, values))) == 1
+    build.cache_clear()
+    assert build() is not values[0]
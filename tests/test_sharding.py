@@ -0,0 +1,82 @@
+import collections
+import multiprocessing
+import os
+
+from click.testing import CliRunner
+import pytest
+
+from fafalytics import exports, storage
+from fafalytics.extractors import filter_extracted
+from fafalytics.manyfiles import datastore
+from fafalytics.sharding import HashRing, ShardedClient, stream_order
+
+def test_hash_ring():
+    keys = range(10000)
+    three, four = HashRing(3), HashRing(4)
+    counts = collections.Counter(three.node(key) for key in keys)
+    assert set(counts) == {0, 1, 2}
+    assert min(counts.values()) > len(keys) / 3 * 0.7
+    # adding a shard moves only keys to it
+    moved = [key for key in keys if three.node(key) != four.node(key)]
+    assert {four.node(key) for key in moved} == {3}
+    assert three.node(b'123') == three.node('123') == three.node(123)
+
+def test_games_spread_across_shards(sharded):
+    client = storage.get_client()
+    assert isinstance(client, ShardedClient)
+    datastore('load', [{'id': game_id} for game_id in range(300)])
+    datastore('extract', [{'id': game_id} for game_id in range(0, 300, 2)])
+    lengths = [shard.hlen('load') for shard in storage.shard_clients()]
+    assert sum(lengths) == 300 and min(lengths) > 50
+    # each game's values in all hashes are on the same shard
+    for shard in storage.shard_clients():
+        assert set(shard.hkeys('extract')) <= set(shard.hkeys('load'))
+    assert len(exports.get_valid_game_ids(client)) == 150
+    pipeline = client.pipeline()
+    pipeline.hmget('load', [5, 'missing', 3])
+    pipeline.hlen('extract')
+    values, length = pipeline.execute()
+    assert [value and storage.get_codec().decode(value)['id'] for value in values] == [5, None, 3]
+    assert length == 150
+
+def test_filter_extracted_on_shards(sharded, tmpdir):
+    infiles = [str(tmpdir.join('%d.fafreplay' % game_id).ensure()) for game_id in range(20)]
+    datastore('extract', [{'id': game_id} for game_id in range(0, 20, 4)])
+    remaining, skipped = filter_extracted(infiles, 'extract')
+    assert len(remaining) == 15
+
+def test_shards_are_persisted(sharded):
+    datastore('load', [{'id': game_id} for game_id in range(100)])
+    storage.stop_store()
+    with pytest.raises(storage.DatastoreError):
+        storage.start_store(shards=2)
+    storage.start_store()
+    assert storage.get_client().hlen('load') == 100
+    assert len(storage.get_pids()) == 3
+    assert CliRunner().invoke(storage.datastore, ['restart', '--shards', '0']).exit_code == 2
+
+def append_log(line):
+    storage.get_client().xadd('log', {'line': line, 'process': os.getpid()})
+
+def test_log_streams_by_process(sharded):
+    client = storage.get_client()
+    with multiprocessing.get_context('fork').Pool(6) as pool:
+        pool.map(append_log, range(60), chunksize=1)
+    (stream, messages), = client.xread({'log': 0})
+    assert sorted(int(obj[b'line']) for identifier, obj in messages) == list(range(60))
+    assert messages == sorted(messages, key=stream_order)
+    # each process appended to its own shard's stream
+    for shard, shard_client in enumerate(storage.shard_clients()):
+        for stream, messages in shard_client.xread({'log': 0}):
+            assert {client.shard(int(obj[b'process'])) for identifier, obj in messages} == {shard}
+
+def test_train_codec_samples_every_shard(sharded, monkeypatch):
+    datastore('load', [{'id': game_id} for game_id in range(300)])
+    sampled = []
+    def train_dictionary(objs, size):
+        sampled.extend(objs)
+        raise storage.zstandard.ZstdError('not training')
+    monkeypatch.setattr(storage, 'train_dictionary', train_dictionary)
+    CliRunner().invoke(storage.datastore, ['train-codec', '--samples', '30', 'load'])
+    client = storage.get_client()
+    assert collections.Counter(client.shard(obj['id']) for obj in sampled) == {0: 10, 1: 10, 2: 10}
@@ -0,0 +1,87 @@
+import multiprocessing
+import threading
+
+import pytest
+
+from fafalytics import storage
+from fafalytics.manyfiles import datastore
+from fafalytics.sqlitestore import SQLiteClient
+
+def test_hashes(client):
+    assert client.hsetnx('h', 1, b'one') == 1
+    assert client.hsetnx('h', 1, b'uno') == 0
+    assert client.hset('h', mapping={2: 'two', 'three': 3.5}) == 2
+    assert client.hset('h', 2, 'dos') == 0
+    assert client.hget('h', 1) == b'one'
+    assert client.hget('h', 'missing') is None
+    assert client.hmget('h', [1, 2, 'missing', 'three']) == [b'one', b'dos', None, b'3.5']
+    assert client.hexists('h', 2) and not client.hexists('other', 2)
+    assert sorted(client.hkeys('h')) == [b'1', b'2', b'three']
+    assert client.hlen('h') == 3
+    assert client.hgetall('h') == {b'1': b'one', b'2': b'dos', b'three': b'3.5'}
+    assert sorted(client.hscan_iter('h', count=2)) == sorted(client.hgetall('h').items())
+    assert client.hdel('h', 1, 'missing') == 1
+    assert client.delete('h', 'missing') == 1
+    assert client.hlen('h') == 0
+
+def test_pipeline(client):
+    pipeline = client.pipeline(transaction=False)
+    for key in range(3):
+        pipeline.hsetnx('h', key, key)
+    pipeline.hsetnx('h', 0, 'again')
+    pipeline.hlen('h')
+    assert [bool(result) for result in pipeline.execute()] == [True, True, True, False, True]
+    assert pipeline.execute() == []
+
+def test_stream(client):
+    assert client.xread({'log': 0}) == []
+    first = client.xadd('log', {'line': 'first', 'levelno': 10})
+    client.xadd('log', {'line': 'second', 'levelno': 20})
+    (stream, messages), = client.xread({'log': 0})
+    assert stream == b'log'
+    assert [obj for identifier, obj in messages] == [{b'line': b'first', b'levelno': b'10'}, {b'line': b'second', b'levelno': b'20'}]
+    assert [obj[b'line'] for identifier, obj in client.xread({'log': first})[0][1]] == [b'second']
+    assert client.xread({'log': '$'}, block=10) in ([], None)
+    threading.Timer(0.05, client.xadd, ('log', {'line': 'third'})).start()
+    assert client.xread({'log': '$'}, block=5000)[0][1][0][1] == {b'line': b'third'}
+
+def test_hscan_match(client):
+    client.hset('h', mapping={'game:1': 1, 'game:2': 2, 'other': 3})
+    assert sorted(client.hscan_iter('h', match='game:*', count=1)) == [(b'game:1', b'1'), (b'game:2', b'2')]
+    assert sorted(client.hscan_iter('h', match='?ther')) == [(b'other', b'3')]
+
+def test_stream_trimming(client):
+    for index in range(5):
+        client.xadd('log', {'index': index}, maxlen=3, approximate=False)
+        client.xadd('other', {'index': index})
+    (stream, messages), = client.xread({'log': 0})
+    assert [obj[b'index'] for identifier, obj in messages] == [b'2', b'3', b'4']
+
+def test_pipeline_errors_dont_undo_other_commands(sqlite):
+    client = storage.get_client()
+    pipeline = client.pipeline()
+    pipeline.hsetnx('h', 1, 'one').xread({'log': 'invalid'}).hsetnx('h', 2, 'two')
+    with pytest.raises(ValueError):
+        pipeline.execute()
+    assert client.hlen('h') == 2
+    pipeline.hsetnx('h', 3, 'three').xread({'log': 'invalid'})
+    added, error = pipeline.execute(raise_on_error=False)
+    assert added == 1 and isinstance(error, ValueError)
+
+def write_games(first):
+    datastore('load', [{'id': game_id} for game_id in range(first, first+100)])
+
+def test_concurrent_writers(client):
+    storage.get_client().ping() # opened by the parent; each process must open its own
+    with multiprocessing.get_context('fork').Pool(4) as pool:
+        pool.map(write_games, [0, 50, 100, 150, 200, 250, 300, 350])
+    assert storage.get_client().hlen('load') == 450
+
+def test_threads_get_own_connections(tmpdir):
+    client = SQLiteClient(str(tmpdir / 'db.sqlite'))
+    threads = [threading.Thread(target=client.hsetnx, args=('h', key, key)) for key in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert client.hlen('h') == 8
@@ -1,26 +1,124 @@
-import os
-import subprocess
-import shutil
-import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
+from click.testing import CliRunner
 import pytest
-import psutil
+from redis.exceptions import ConnectionError
 
 from fafalytics import storage
+from fafalytics.manyfiles import datastore
 
 def test_storage(redis):
     storage.is_alive()
 
 @pytest.fixture
-def redis(tmpdir):
-    expected_children = psutil.Process().children()
-    assert shutil.which(storage.REDIS_BINARY) is not None, \
-        "can't find %S in PATH; apt install redis-server?" % REDIS_BINARY
-    print(tmpdir)
+def store(tmpdir):
     storage.configure(tmpdir)
-    os.chdir(tmpdir)
-    storage.start_store()
-    yield
-    storage.get_client.cache_clear()
+    yield tmpdir
+    if storage.is_running():
+        storage.stop_store()
+
+def restart(**kwargs):
+    storage.stop_store()
+    storage.start_store(**kwargs)
+
+@pytest.mark.parametrize('persistence', ['rdb', 'aof'])
+def test_persistence_survives_restart(store, persistence):
+    storage.start_store(persistence)
+    storage.get_client().hset('load', 1, 'game')
+    restart(persistence=persistence)
+    assert storage.get_client().hget('load', 1) == b'game'
+    storage.get_client().hset('load', 2, 'game')
+    restart(persistence=persistence)
+    assert storage.get_client().hlen('load') == 2
+
+def test_no_persistence(store):
+    storage.start_store('none')
+    storage.get_client().hset('load', 1, 'game')
+    restart(persistence='none')
+    assert storage.get_client().hlen('load') == 0
+    assert not store.listdir('*.rdb')
+
+def test_persistence_is_kept_until_changed(store):
+    storage.start_store('aof')
+    storage.get_client().hset('load', 1, 'game')
+    restart()
+    assert storage.get_client().config_get('appendonly') == {'appendonly': 'yes'}
+    storage.save_store()
+    storage.restore_store()
+    assert storage.get_client().config_get('appendonly') == {'appendonly': 'yes'}
+    assert storage.get_client().hkeys('load') == [b'1']
+    restart(persistence='rdb')
+    assert storage.get_client().config_get('appendonly') == {'appendonly': 'no'}
+
+@pytest.mark.parametrize('persistence', ['rdb', 'aof'])
+def test_flush(store, persistence):
+    storage.start_store(persistence, shards=2)
+    storage.get_client().hset('load', 1, 'game')
+    with pytest.raises(storage.UnexpectedRunning):
+        storage.flush_store()
     storage.stop_store()
-    assert psutil.Process().children() == expected_children, "unexpected child processes; leaking redis instances?"
+    storage.flush_store()
+    storage.start_store()
+    assert storage.get_client().hlen('load') == 0
+
+def test_restart_flush(client):
+    client.hset('load', 1, 'game')
+    assert CliRunner().invoke(storage.datastore, ['restart']).exit_code == 0
+    assert storage.get_client().hlen('load') == 1
+    result = CliRunner().invoke(storage.datastore, ['restart', '--flush'])
+    assert result.exit_code == 0, result.output
+    assert storage.get_client().hlen('load') == 0
+
+def test_save_and_restore(store):
+    storage.start_store('none')
+    storage.get_client().hset('load', 1, 'game')
+    storage.save_store(str(store / 'saved.rdb'))
+    storage.get_client().hset('load', 2, 'game')
+    restart(persistence='none')
+    # start loads the last snapshot
+    assert storage.get_client().hkeys('load') == [b'1']
+    storage.get_client().hset('load', 3, 'game')
+    storage.save_store()
+    storage.restore_store(str(store / 'saved.rdb'), persistence='aof')
+    assert storage.get_client().hkeys('load') == [b'1']
+    storage.get_client().hset('load', 4, 'game')
+    storage.restore_store(persistence='aof')
+    assert storage.get_client().hkeys('load') == [b'1']
+
+def test_maxmemory(store):
+    storage.start_store(maxmemory='10mb')
+    assert storage.get_client().config_get('maxmemory') == {'maxmemory': str(10 * 2**20)}
+    with pytest.raises(storage.NotRunning):
+        restart(maxmemory='lots')
+
+def test_sqlite_save_and_restore(sqlite, tmpdir):
+    client = storage.get_client()
+    client.hset('load', 1, 'game')
+    storage.save_store(str(tmpdir / 'saved.sqlite'))
+    client.hset('load', 2, 'game')
+    storage.restore_store(str(tmpdir / 'saved.sqlite'))
+    assert client.hkeys('load') == [b'1']
+
+THREADS = 32
+
+def write_and_read(first):
+    games = [{'id': game_id, 'thread': first} for game_id in range(first, first+100)]
+    assert datastore('load', games) == {'new': 100, 'existing': 0}
+    values = storage.get_client().hmget('load', [game['id'] for game in games])
+    return [storage.get_codec().decode(value) for value in values] == games
+
+def test_threads_share_the_client(client):
+    # fewer connections than threads; the first get_client() is on a worker thread
+    storage.configure(storage.settings.tmpdir, storage.settings.backend, pool_size=4)
+    with ThreadPoolExecutor(THREADS) as executor:
+        assert all(executor.map(write_and_read, range(0, THREADS*100, 100)))
+    assert storage.get_client().hlen('load') == THREADS * 100
+
+def test_pool_timeout(redis):
+    storage.configure(storage.settings.tmpdir, pool_size=1, pool_timeout=0.1)
+    pool = storage.get_client().connection_pool
+    connection = pool.get_connection()
+    with ThreadPoolExecutor(1) as executor, pytest.raises(ConnectionError):
+        executor.submit(storage.get_client().ping).result()
+    pool.release(connection)
+    assert storage.get_client().ping()
@@ -0,0 +1,12 @@
+from fafalytics import units
+
+def test_id_by_categories():
+    factories = units.id_by_categories('factory tech1 land')
+    assert factories == {'uab0101', 'ueb0101', 'urb0101', 'xnb0101', 'xsb0101'}
+    assert units.id_by_categories('factory -tech2 -tech3 -experimental land') == factories
+    assert units.id_by_categories('no_such_category') == frozenset()
+
+def test_precompiled_index_is_current():
+    # regenerate with `python -m fafalytics.units` if this fails
+    with open(units.INDEX_MODULE) as handle:
+        assert handle.read() == units.CategoryIndex.from_json(units._UNITS).to_module()
@@ -1,3 +1,125 @@
+import http.server
+import json
+import math
+import threading
+import time
+import urllib.parse
+
 import py
 
 testdata = py.path.local(__file__).dirpath() / 'testdata'
+
+class FakeHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    def respond(self, status, body=b'', headers=()):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    def do_GET(self):
+        key = self.server.request_key(self)
+        status = self.server.take_failure(key)
+        time.sleep(self.server.latency)
+        if status is not None:
+            self.respond(status, headers=[('Retry-After', '0')])
+            return
+        self.serve(key)
+    def log_message(self, *args):
+        pass
+
+class FakeServer(http.server.ThreadingHTTPServer):
+    """Serves on localhost from a thread; failures maps request keys to a list
+    of statuses to respond with before succeeding"""
+    daemon_threads = True
+    handler_class = FakeHandler
+    def __init__(self, latency=0):
+        super().__init__(('127.0.0.1', 0), self.handler_class)
+        self.latency = latency
+        self.failures = {}
+        self.requests = []
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+    def take_failure(self, key):
+        with self.lock:
+            self.requests.append(key)
+            failures = self.failures.get(key)
+            return failures.pop(0) if failures else None
+    @property
+    def url(self):
+        return 'http://%s:%d' % self.server_address
+    def __enter__(self):
+        self.thread.start()
+        return self
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+class FakeAPIHandler(FakeHandler):
+    def serve(self, page_number):
+        server = self.server
+        page_size = int(self.query['page[size]'][0])
+        first = (page_number-1) * page_size
+        ids = range(first, min(first+page_size, server.total_records))
+        body = json.dumps({
+            'data': [{'type': 'game', 'id': str(game_id), 'attributes': {}, 'relationships': {}} for game_id in ids],
+            'included': [],
+            'meta': {'page': {'number': page_number, 'totalPages': math.ceil(server.total_records / page_size),
+                              'totalRecords': server.total_records}},
+        }).encode()
+        self.respond(200, body, [('Content-Type', 'application/json')])
+
+class FakeAPI(FakeServer):
+    "A stand-in for api.faforever.com's /data/game; requests are keyed by page number"
+    handler_class = FakeAPIHandler
+    def __init__(self, total_records, latency=0):
+        super().__init__(latency)
+        self.total_records = total_records
+    def request_key(self, handler):
+        handler.query = urllib.parse.parse_qs(urllib.parse.urlparse(handler.path).query)
+        return int(handler.query['page[number]'][0])
+
+class FakeContentHandler(FakeHandler):
+    def serve(self, path):
+        server = self.server
+        if path not in server.files:
+            self.respond(404)
+            return
+        body = server.files[path]
+        status, headers, start = 200, [], 0
+        if 'Range' in self.headers:
+            start = int(self.headers['Range'].split('=')[1].rstrip('-'))
+            if start >= len(body):
+                self.respond(416, headers=[('Content-Range', 'bytes */%d' % len(body))])
+                return
+            status, headers = 206, [('Content-Range', 'bytes %d-%d/%d' % (start, len(body)-1, len(body)))]
+        body = body[start:]
+        truncate = server.truncations.pop(path, None)
+        if truncate is None:
+            self.respond(status, body, headers)
+            return
+        # promise the whole body but hang up midway
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body[:truncate])
+        self.close_connection = True
+
+class FakeContent(FakeServer):
+    """A stand-in for content.faforever.com serving files (a dict of paths to
+    bytes) with Range support; truncations maps paths to a number of bytes to
+    send before dropping the connection, once. Requests are keyed by path"""
+    handler_class = FakeContentHandler
+    def __init__(self, files, latency=0):
+        super().__init__(latency)
+        self.files = files
+        self.truncations = {}
+        self.ranges = []
+    def request_key(self, handler):
+        if 'Range' in handler.headers:
+            with self.lock:
+                self.ranges.append((handler.path, handler.headers['Range']))
+        return handler.path